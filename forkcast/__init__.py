@@ -20,6 +20,9 @@ from flask import Flask
 import os
 
 from .config import config
+from .models import release_db_connection
+from .migrations import check_schema
+from .commands import register_commands, schema_check_deferred
 
 
 def create_app(config_name='default'):
@@ -72,6 +75,18 @@ def create_app(config_name='default'):
     app.register_blueprint(notifications_bp)
     app.register_blueprint(dashboard_bp)
     
+    # Return the request-scoped database connection to the pool
+    app.teardown_appcontext(release_db_connection)
+    
+    # CLI commands (flask migrate, flask backfill-meal-slots, ...)
+    register_commands(app)
+    
+    # Fail fast on schema drift instead of erroring on the first request.
+    # Only `flask migrate`, which brings the schema up to date, runs on an
+    # outdated schema (see commands.schema_check_deferred).
+    if app.config['SCHEMA_CHECK'] and not schema_check_deferred():
+        check_schema()
+    
     # Error handlers
     @app.errorhandler(404)
     def page_not_found(e):
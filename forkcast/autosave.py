@@ -0,0 +1,204 @@
+"""
+Autosave Buffer - Write-behind queue for weekly calendar autosaves.
+
+The calendar page autosaves the whole week on every change, so a burst of
+drags produces a burst of full-document upserts. Saves are instead kept in
+memory per (user, week); rapid successive saves overwrite each other and
+only the latest document is written, once the week has been quiet for
+AUTOSAVE_WINDOW seconds (or AUTOSAVE_MAX_DELAY seconds after its first
+unsaved change). Everything due at the same time is written in one batched
+statement.
+
+Reads must never see stale data: any request from a user with pending (or
+in-flight) saves flushes them first - see flush_user().
+
+Each queued save is assigned its updated_at when it is queued, returned to
+the client right away and written with the document, so the client's
+PATCH requests keep their conflict check (the PATCH flushes the queue
+first and then finds exactly that updated_at).
+
+The buffer lives in process memory, so it is only safe when the app is
+served by a single process: with several workers, flush-on-read only
+drains the current worker's buffer (another worker may serve a stale
+week), and saves still queued when a process dies are lost although the
+client was told they succeeded. Buffering is therefore off by default
+(AUTOSAVE_WINDOW=0 writes through directly).
+
+This module handles:
+    - Queueing and coalescing week saves
+    - Background flushing of due saves in one batched upsert
+    - Flush-on-read and flush-on-exit
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2.extras import Json, execute_values
+
+from .config import Config
+from .models import get_db_cursor
+from .meal_slots import sync_weeks_slots
+
+
+class AutosaveBuffer:
+    """
+    Coalescing write-behind buffer of weekly calendar documents.
+
+    Args:
+        window: Seconds a week must stay unchanged before it is written
+        max_delay: Upper bound in seconds between a week's first unsaved
+            change and its write, so continuous editing still persists
+    """
+
+    def __init__(self, window: float, max_delay: float):
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        # (user_id, week_start) -> (meals, updated_at, first_queued_at, last_queued_at)
+        self._pending: Dict[Tuple[int, str], Tuple[dict, datetime, float, float]] = {}
+        # User IDs whose saves have been taken off the queue but not committed
+        self._inflight: Dict[int, int] = {}
+        self._cond = threading.Condition()
+        # Held while a batch is taken off the queue and written, so a
+        # flush-on-read waits for a background write that is in progress
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def put(self, user_id: int, week_start: str, meals: dict) -> datetime:
+        """
+        Queue a week's document, replacing any unsaved earlier version.
+
+        Returns:
+            The updated_at the row will have once this document is written
+        """
+        key = (user_id, str(week_start))
+        now = time.monotonic()
+        updated_at = datetime.now()
+        with self._cond:
+            previous = self._pending.get(key)
+            first_queued_at = previous[2] if previous else now
+            self._pending[key] = (meals, updated_at, first_queued_at, now)
+            self._ensure_thread()
+            self._cond.notify()
+        return updated_at
+
+    def has_pending(self, user_id: int) -> bool:
+        """Whether the user has saves that are queued or being written."""
+        with self._cond:
+            return user_id in self._inflight or any(key[0] == user_id for key in self._pending)
+
+    def flush_user(self, user_id: int) -> int:
+        """
+        Write the user's queued saves now (flush-on-read).
+
+        Also waits for a background write of the user's saves that is
+        already in progress.
+
+        Returns:
+            Number of weeks written by this call
+        """
+        if not self.has_pending(user_id):
+            return 0
+        return self._flush(lambda key: key[0] == user_id)
+
+    def flush_all(self) -> int:
+        """Write every queued save now. Returns the number of weeks written."""
+        return self._flush(lambda key: True)
+
+    # ---------- internals ----------
+
+    def _flush(self, select) -> int:
+        with self._flush_lock:
+            with self._cond:
+                batch = self._take([key for key in self._pending if select(key)])
+            return self._write(batch)
+
+    def _take(self, keys: List[Tuple[int, str]]) -> Dict[Tuple[int, str], tuple]:
+        """Remove entries from the queue and mark their users in flight (lock held)."""
+        batch = {key: self._pending.pop(key) for key in keys}
+        for user_id, _ in batch:
+            self._inflight[user_id] = self._inflight.get(user_id, 0) + 1
+        return batch
+
+    def _write(self, batch: Dict[Tuple[int, str], tuple]) -> int:
+        """Upsert a batch of documents in one statement and sync meal_slots."""
+        if not batch:
+            return 0
+        try:
+            with get_db_cursor(commit=True) as cur:
+                execute_values(cur, '''
+                    INSERT INTO weekly_calendar_data (user_id, week_start_date, meals, updated_at)
+                    VALUES %s
+                    ON CONFLICT (user_id, week_start_date)
+                    DO UPDATE SET meals = EXCLUDED.meals, updated_at = EXCLUDED.updated_at
+                ''', [(user_id, week_start, Json(meals), updated_at)
+                      for (user_id, week_start), (meals, updated_at, _, _) in batch.items()],
+                    template='(%s, %s::date, %s, %s)')
+                sync_weeks_slots(cur, batch.keys())
+        except Exception:
+            # Put the documents back unless a newer save superseded them
+            with self._cond:
+                for key, entry in batch.items():
+                    self._pending.setdefault(key, entry)
+                self._cond.notify()
+            raise
+        finally:
+            with self._cond:
+                for user_id, _ in batch:
+                    self._inflight[user_id] -= 1
+                    if not self._inflight[user_id]:
+                        del self._inflight[user_id]
+        return len(batch)
+
+    def _next_deadline(self) -> Optional[float]:
+        """Earliest time a queued week becomes due (lock held)."""
+        return min((min(last + self.window, first + self.max_delay)
+                    for _, _, first, last in self._pending.values()), default=None)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='autosave-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Background loop: sleep until the next week is due, then write all due weeks."""
+        while True:
+            with self._cond:
+                deadline = self._next_deadline()
+                while deadline is None or deadline > time.monotonic():
+                    self._cond.wait(None if deadline is None else deadline - time.monotonic())
+                    deadline = self._next_deadline()
+
+            now = time.monotonic()
+            try:
+                self._flush(lambda key: key in self._pending and min(
+                    self._pending[key][3] + self.window,
+                    self._pending[key][2] + self.max_delay) <= now)
+            except Exception as e:
+                print(f"Autosave flush failed: {e}")
+                time.sleep(min(self.window, 5) or 1)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_autosave_buffer() -> Optional[AutosaveBuffer]:
+    """Get the process-wide autosave buffer (None when buffering is disabled)."""
+    global _buffer
+    if Config.AUTOSAVE_WINDOW <= 0:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AutosaveBuffer(Config.AUTOSAVE_WINDOW, Config.AUTOSAVE_MAX_DELAY)
+                atexit.register(_buffer.flush_all)
+    return _buffer
+
+
+def flush_user_autosaves(user_id: Optional[int]) -> None:
+    """Write the user's queued calendar saves, if any, before reading."""
+    if user_id is not None and _buffer is not None:
+        _buffer.flush_user(user_id)
@@ -12,11 +12,18 @@ All routes are prefixed with /api when registered.
 from flask import Blueprint, request, redirect, url_for, flash, session, jsonify, current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
+import math
 import os
 
 from ..models import get_db_cursor
 from ..helpers import login_required, allowed_file
-from ..ingredient_parser import parse_ingredient, estimate_grams, extract_food_name
+from ..ingredient_parser import parse_ingredients_batch, UNIT_CODES
+from ..recipe_ingredients import save_recipe_ingredients, copy_recipe_ingredients
+from ..recipe_nutrition import save_recipe_nutrition
+from ..meal_slots import fetch_recipe_days, refresh_daily_nutrition
+from ..recipe_ratings import save_recipe_rating, USER_RATING_SQL, RECIPE_REVIEWS_SQL, MY_RECIPE_REVIEWS_SQL
+from ..recipe_feed import fetch_public_feed, feed_page_size, parse_feed_filters, parse_feed_sort
+from ..recipe_fields import CARD_FIELDS, DETAIL_FIELDS, parse_fields, recipe_select_sql
 from .notifications import create_review_notification
 
 # Create the blueprint
@@ -26,6 +33,12 @@ api_bp = Blueprint(
     url_prefix='/api'
 )
 
+# Whether a user already forked a recipe (shared with query_plans.HOT_QUERIES)
+EXISTING_FORK_SQL = '''
+    SELECT id FROM recipes 
+    WHERE user_id = %(user_id)s AND forked_from_id = %(recipe_id)s
+'''
+
 
 # ==================== RECIPE ENDPOINTS ====================
 
@@ -37,33 +50,37 @@ def get_recipes():
     
     Query params:
         type: 'my' for user's recipes, 'all' for public recipes (default)
+        fields: Shape ('card', 'detail') and/or field names, comma-separated (default 'card')
+        cursor: For 'all', next_cursor of the previous page
+        limit: For 'all', page size (capped at RECIPE_FEED_MAX_PAGE_SIZE)
+        sort, q, category, cuisine, difficulty, max_time: For 'all', feed
+            order, search and filters (see recipes.feed_page)
+    
+    Public recipes are returned one page at a time, newest (or most
+    popular) first, with the cursor of the next page (null on the last page).
     """
     recipe_type = request.args.get('type', 'all')
+    try:
+        fields = parse_fields(request.args.get('fields'), CARD_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    if recipe_type != 'my':
+        try:
+            sort = parse_feed_sort(request.args.get('sort'))
+            filters = parse_feed_filters(request.args)
+            with get_db_cursor() as cur:
+                recipes, next_cursor = fetch_public_feed(cur, feed_page_size(request.args.get('limit')),
+                                                         request.args.get('cursor'), fields, sort, filters)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, 'recipes': recipes, 'next_cursor': next_cursor})
     
     with get_db_cursor() as cur:
-        if recipe_type == 'my':
-            cur.execute('''
-                SELECT r.*, r.calories_per_serving as calories,
-                       COALESCE(AVG(rr.rating), 0) as avg_rating,
-                       COUNT(DISTINCT rr.id) as rating_count
-                FROM recipes r
-                LEFT JOIN recipe_ratings rr ON r.id = rr.recipe_id
-                WHERE r.user_id = %s
-                GROUP BY r.id
-                ORDER BY r.created_at DESC
-            ''', (session['user_id'],))
-        else:
-            cur.execute('''
-                SELECT r.*, r.calories_per_serving as calories, u.username, u.full_name, u.profile_image,
-                       COALESCE(AVG(rr.rating), 0) as avg_rating,
-                       COUNT(DISTINCT rr.id) as rating_count
-                FROM recipes r
-                JOIN users u ON r.user_id = u.id
-                LEFT JOIN recipe_ratings rr ON r.id = rr.recipe_id
-                WHERE r.is_public = true
-                GROUP BY r.id, u.username, u.full_name, u.profile_image
-                ORDER BY r.created_at DESC
-            ''')
+        cur.execute(recipe_select_sql(fields) + '''
+            WHERE r.user_id = %s
+            ORDER BY r.created_at DESC
+        ''', (session['user_id'],))
         recipes = cur.fetchall()
     
     return jsonify({'success': True, 'recipes': recipes})
@@ -72,25 +89,20 @@ def get_recipes():
 @api_bp.route('/recipes/<int:recipe_id>', methods=['GET'])
 @login_required
 def get_recipe(recipe_id):
-    """Get single recipe by ID."""
+    """
+    Get single recipe by ID.
+    
+    Query params:
+        fields: Shape ('card', 'detail') and/or field names, comma-separated (default 'detail')
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), DETAIL_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT r.*, r.calories_per_serving as calories, u.username, u.full_name, u.profile_image,
-                   r.forked_from_id, r.original_author_id,
-                   COALESCE(AVG(rr.rating), 0) as avg_rating,
-                   COUNT(DISTINCT rr.id) as rating_count,
-                   orig.title as original_title,
-                   orig.is_public as original_is_public,
-                   orig_user.username as original_author_username,
-                   orig_user.full_name as original_author_name
-            FROM recipes r
-            JOIN users u ON r.user_id = u.id
-            LEFT JOIN recipe_ratings rr ON r.id = rr.recipe_id
-            LEFT JOIN recipes orig ON r.forked_from_id = orig.id
-            LEFT JOIN users orig_user ON r.original_author_id = orig_user.id
+        cur.execute(recipe_select_sql(fields) + '''
             WHERE r.id = %s
-            GROUP BY r.id, u.username, u.full_name, u.profile_image, 
-                     orig.title, orig.is_public, orig_user.username, orig_user.full_name
         ''', (recipe_id,))
         recipe_row = cur.fetchone()
         
@@ -113,8 +125,7 @@ def get_recipe(recipe_id):
         if recipe.get('rating_count') is not None:
             recipe['rating_count'] = int(recipe['rating_count'])
         
-        cur.execute('SELECT rating, review FROM recipe_ratings WHERE recipe_id = %s AND user_id = %s', 
-                    (recipe_id, session['user_id']))
+        cur.execute(USER_RATING_SQL, {'recipe_id': recipe_id, 'user_id': session['user_id']})
         user_rating_row = cur.fetchone()
         user_rating = dict(user_rating_row) if user_rating_row else None
     
@@ -177,6 +188,8 @@ def create_recipe():
                   prep_time, cook_time, servings, calories, category, cuisine, difficulty, 
                   tags, is_public, image_url))
             recipe_id = cur.fetchone()['id']
+            save_recipe_ingredients(cur, recipe_id, ingredients)
+            save_recipe_nutrition(cur, recipe_id)
         
         if is_ajax:
             return jsonify({'success': True, 'message': 'Recipe created successfully!', 'recipe_id': recipe_id})
@@ -254,6 +267,8 @@ def update_recipe(recipe_id):
                 WHERE id = %s
             ''', (title, description, ingredients, instructions, prep_time, cook_time,
                   servings, calories, category, cuisine, difficulty, tags, is_public, image_url, recipe_id))
+            save_recipe_ingredients(cur, recipe_id, ingredients)
+            save_recipe_nutrition(cur, recipe_id)
         
         if is_ajax:
             return jsonify({'success': True, 'message': 'Recipe updated successfully!'})
@@ -289,7 +304,9 @@ def delete_recipe(recipe_id):
                 os.remove(image_path)
         
         with get_db_cursor(commit=True) as cur:
+            planned_days = fetch_recipe_days(cur, [recipe_id])
             cur.execute('DELETE FROM recipes WHERE id = %s', (recipe_id,))
+            refresh_daily_nutrition(cur, planned_days)
         
         return jsonify({'success': True, 'message': f'Recipe "{recipe["title"]}" deleted successfully!'})
         
@@ -323,10 +340,7 @@ def fork_recipe(recipe_id):
     
     # Check if user already forked this recipe
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT id FROM recipes 
-            WHERE user_id = %s AND forked_from_id = %s
-        ''', (session['user_id'], recipe_id))
+        cur.execute(EXISTING_FORK_SQL, {'user_id': session['user_id'], 'recipe_id': recipe_id})
         existing_fork = cur.fetchone()
     
     if existing_fork:
@@ -368,6 +382,8 @@ def fork_recipe(recipe_id):
                 original['user_id']  # original_author_id
             ))
             new_recipe_id = cur.fetchone()['id']
+            copy_recipe_ingredients(cur, recipe_id, new_recipe_id)
+            save_recipe_nutrition(cur, new_recipe_id)
         
         author_name = original['author_name'] or original['author_username']
         return jsonify({
@@ -424,14 +440,7 @@ def rate_recipe(recipe_id):
     
     try:
         with get_db_cursor(commit=True) as cur:
-            cur.execute('''
-                INSERT INTO recipe_ratings (recipe_id, user_id, rating, review)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (recipe_id, user_id) 
-                DO UPDATE SET rating = EXCLUDED.rating, 
-                             review = EXCLUDED.review,
-                             updated_at = CURRENT_TIMESTAMP
-            ''', (recipe_id, session['user_id'], rating, review))
+            result = save_recipe_rating(cur, recipe_id, session['user_id'], rating, review)
         
         # Get recipe title for notification
         with get_db_cursor() as cur:
@@ -452,15 +461,6 @@ def rate_recipe(recipe_id):
         except Exception as notif_error:
             print(f"Failed to create notification: {notif_error}")
         
-        with get_db_cursor() as cur:
-            cur.execute('''
-                SELECT COALESCE(AVG(rating), 0) as avg_rating,
-                       COUNT(*) as rating_count
-                FROM recipe_ratings
-                WHERE recipe_id = %s
-            ''', (recipe_id,))
-            result = cur.fetchone()
-        
         if is_ajax:
             return jsonify({
                 'success': True, 
@@ -487,14 +487,7 @@ def rate_recipe(recipe_id):
 def get_recipe_reviews(recipe_id):
     """Get all reviews for a recipe."""
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT rr.id, rr.rating, rr.review, rr.created_at, rr.updated_at,
-                   u.id as user_id, u.username, u.full_name, u.profile_image
-            FROM recipe_ratings rr
-            JOIN users u ON rr.user_id = u.id
-            WHERE rr.recipe_id = %s
-            ORDER BY rr.created_at DESC
-        ''', (recipe_id,))
+        cur.execute(RECIPE_REVIEWS_SQL, {'recipe_id': recipe_id})
         reviews = cur.fetchall()
     
     result = []
@@ -514,18 +507,7 @@ def get_recipe_reviews(recipe_id):
 def get_my_recipe_reviews():
     """Get all reviews for the current user's recipes."""
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT rr.id, rr.rating, rr.review, rr.created_at, rr.updated_at,
-                   rr.recipe_id,
-                   r.title as recipe_title, r.image_url as recipe_image,
-                   u.id as reviewer_id, u.username as reviewer_username, 
-                   u.full_name as reviewer_name, u.profile_image as reviewer_image
-            FROM recipe_ratings rr
-            JOIN recipes r ON rr.recipe_id = r.id
-            JOIN users u ON rr.user_id = u.id
-            WHERE r.user_id = %s
-            ORDER BY rr.created_at DESC
-        ''', (session['user_id'],))
+        cur.execute(MY_RECIPE_REVIEWS_SQL, {'user_id': session['user_id']})
         reviews = cur.fetchall()
     
     result = []
@@ -542,17 +524,29 @@ def get_my_recipe_reviews():
 
 # ==================== RECIPES LIST FOR CALENDAR ====================
 
+# Fields the meal planner's recipe picker shows
+PICKER_FIELDS = ('id', 'title', 'prep_time', 'cook_time', 'category', 'calories_per_serving', 'image_url')
+
+
 @api_bp.route('/recipes/list', methods=['GET'])
 @login_required
 def get_recipes_for_calendar():
-    """Get all recipes for the meal planner (user's own + public recipes)."""
+    """
+    Get all recipes for the meal planner (user's own + public recipes).
+    
+    Query params:
+        search: Filter on title or category
+        fields: Shape ('card', 'detail') and/or field names, comma-separated
+                (default: the fields the meal planner's recipe picker shows)
+    """
     user_id = session['user_id']
     search = request.args.get('search', '').strip()
+    try:
+        fields = parse_fields(request.args.get('fields'), PICKER_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    query = '''
-        SELECT DISTINCT r.id, r.title, r.description, r.prep_time, r.cook_time, 
-               r.category, r.calories_per_serving, r.image_url
-        FROM recipes r
+    query = recipe_select_sql(fields) + '''
         WHERE (r.user_id = %s OR r.is_public = true)
     '''
     params = [user_id]
@@ -579,9 +573,14 @@ def parse_ingredients_api():
     """
     Parse ingredient strings and return structured data with gram estimates.
     
+    Accepts up to MAX_BATCH_LINES (PARSE_BATCH_MAX_LINES, default 5000)
+    lines per request; they are parsed in one batch.
+    
     Request body:
         {
-            "ingredients": ["2 cups flour", "1/2 tsp salt", ...]
+            "ingredients": ["2 cups flour", "1/2 tsp salt", ...],
+            "scale": 1.5,        (optional) factor (> 0) applied to every quantity
+            "columnar": false    (optional) return columns instead of rows
         }
     
     Returns:
@@ -599,26 +598,66 @@ def parse_ingredients_api():
                 ...
             ]
         }
+        
+        or, with "columnar": true, equally long lists
+        {
+            "success": true,
+            "columns": {"index": [...], "original": [...], "quantity": [...],
+                        "unitCode": [...], "name": [...], "foodName": [...],
+                        "gramsEstimate": [...]},
+            "units": ["", "cup", ...]    (unit of each unitCode)
+        }
     """
     data = request.get_json()
     ingredients = data.get('ingredients', [])
     
     if not ingredients:
         return jsonify({'success': False, 'message': 'No ingredients provided'})
+    if not isinstance(ingredients, list) or not all(isinstance(line, str) for line in ingredients):
+        return jsonify({'success': False, 'message': 'ingredients must be a list of strings'}), 400
+    
+    try:
+        scale = float(data.get('scale', 1))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'scale must be a number'}), 400
+    if not math.isfinite(scale) or scale <= 0:
+        return jsonify({'success': False, 'message': 'scale must be a finite number greater than 0'}), 400
+    
+    try:
+        batch = parse_ingredients_batch(ingredients, scale)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    units = [UNIT_CODES[code] for code in batch['unit_code'].tolist()]
     
-    parsed_results = []
-    for ingredient_text in ingredients:
-        parsed = parse_ingredient(ingredient_text)
-        if parsed:
-            result = {
-                'original': parsed['original'],
-                'quantity': parsed['quantity'],
-                'unit': parsed['unit'],
-                'name': parsed['name'],
-                'foodName': extract_food_name(parsed),
-                'gramsEstimate': estimate_grams(parsed)
-            }
-            parsed_results.append(result)
+    if data.get('columnar'):
+        return jsonify({
+            'success': True,
+            'columns': {
+                'index': batch['index'].tolist(),
+                'original': batch['original'],
+                'quantity': batch['quantity'].tolist(),
+                'unitCode': batch['unit_code'].tolist(),
+                'name': batch['name'],
+                'foodName': batch['food_name'],
+                'gramsEstimate': batch['grams'].tolist()
+            },
+            'units': list(UNIT_CODES)
+        })
+    
+    parsed_results = [
+        {
+            'original': original,
+            'quantity': quantity,
+            'unit': unit,
+            'name': name,
+            'foodName': food_name,
+            'gramsEstimate': grams
+        }
+        for original, quantity, unit, name, food_name, grams in zip(
+            batch['original'], batch['quantity'].tolist(), units,
+            batch['name'], batch['food_name'], batch['grams'].tolist())
+    ]
     
     return jsonify({
         'success': True,
@@ -4,14 +4,19 @@ Calendar Blueprint - Meal planning calendar features.
 This blueprint handles:
     - Calendar page view
     - Meal plans CRUD operations
-    - Weekly calendar data (auto-save)
+    - Weekly calendar data (auto-save, slot-level PATCH)
 """
 
 import json
+from datetime import date
 from flask import Blueprint, render_template, request, jsonify, session
 
 from ..helpers import login_required, get_current_user
 from ..models import get_db_cursor
+from ..autosave import get_autosave_buffer, flush_user_autosaves
+from ..meal_slots import (
+    sync_week_slots, remove_meal_from_slot, parse_slot_operations, apply_slot_operations
+)
 
 # Create the blueprint
 calendar_bp = Blueprint(
@@ -21,6 +26,25 @@ calendar_bp = Blueprint(
     url_prefix='/calendar'
 )
 
+# Saved meal plans, most recently updated first (shared with query_plans.HOT_QUERIES)
+MEAL_PLANS_SQL = '''
+    SELECT id, name, description, week_start_date, created_at, updated_at
+    FROM meal_plans 
+    WHERE user_id = %(user_id)s 
+    ORDER BY updated_at DESC
+'''
+
+
+@calendar_bp.before_app_request
+def flush_pending_autosaves():
+    """
+    Flush-on-read: write the user's buffered calendar saves before any
+    request other than the autosave itself, so no page or API sees a
+    stale calendar.
+    """
+    if request.endpoint != 'calendar.save_week_calendar':
+        flush_user_autosaves(session.get('user_id'))
+
 
 @calendar_bp.route('/')
 @login_required
@@ -89,12 +113,7 @@ def get_meal_plans():
     """Get all saved meal plans for the logged-in user."""
     user_id = session['user_id']
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT id, name, description, week_start_date, created_at, updated_at
-            FROM meal_plans 
-            WHERE user_id = %s 
-            ORDER BY updated_at DESC
-        ''', (user_id,))
+        cur.execute(MEAL_PLANS_SQL, {'user_id': user_id})
         plans = cur.fetchall()
     
     result = []
@@ -199,24 +218,44 @@ def get_week_calendar(week_start):
     user_id = session['user_id']
     with get_db_cursor() as cur:
         cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
+            SELECT meals, updated_at FROM weekly_calendar_data 
             WHERE user_id = %s AND week_start_date = %s
         ''', (user_id, week_start))
         result = cur.fetchone()
     
     if result:
-        return jsonify({'success': True, 'meals': result['meals'] or {}})
-    return jsonify({'success': True, 'meals': {}})
+        return jsonify({
+            'success': True,
+            'meals': result['meals'] or {},
+            'updated_at': result['updated_at'].isoformat()
+        })
+    return jsonify({'success': True, 'meals': {}, 'updated_at': None})
 
 
 @calendar_bp.route('/api/week/<week_start>', methods=['POST'])
 @login_required
 def save_week_calendar(week_start):
-    """Auto-save calendar data for a specific week (upsert)."""
+    """
+    Auto-save calendar data for a specific week (upsert).
+    
+    With autosave buffering enabled the week is queued and written in the
+    background (coalescing rapid saves); the response then carries the
+    updated_at the row will be written with, so the client's next PATCH
+    is still checked against it.
+    """
     data = request.get_json()
     user_id = session['user_id']
     meals = data.get('meals', {})
     
+    buffer = get_autosave_buffer()
+    if buffer:
+        try:
+            week_start = date.fromisoformat(week_start).isoformat()
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid week start date'}), 400
+        updated_at = buffer.put(user_id, week_start, meals)
+        return jsonify({'success': True, 'queued': True, 'updated_at': updated_at.isoformat()})
+    
     with get_db_cursor(commit=True) as cur:
         # Upsert: Insert or update on conflict
         cur.execute('''
@@ -224,9 +263,61 @@ def save_week_calendar(week_start):
             VALUES (%s, %s, %s)
             ON CONFLICT (user_id, week_start_date) 
             DO UPDATE SET meals = %s, updated_at = CURRENT_TIMESTAMP
+            RETURNING updated_at
         ''', (user_id, week_start, json.dumps(meals), json.dumps(meals)))
+        updated_at = cur.fetchone()['updated_at']
+        sync_week_slots(cur, user_id, week_start)
     
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'updated_at': updated_at.isoformat()})
+
+
+@calendar_bp.route('/api/week/<week_start>', methods=['PATCH'])
+@login_required
+def patch_week_calendar(week_start):
+    """
+    Apply slot-level operations to a week's calendar.
+    
+    Request body:
+        operations: List of add / remove / set_servings / move operations
+            (see meal_slots.parse_slot_operations)
+        updated_at: Optional updated_at from the last read or write; if the
+            week changed since, nothing is applied and 409 is returned
+            with the current meals so the client can reload
+    """
+    data = request.get_json() or {}
+    user_id = session['user_id']
+    expected_updated_at = data.get('updated_at')
+    
+    try:
+        operations = parse_slot_operations(data.get('operations'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    with get_db_cursor(commit=True) as cur:
+        if not expected_updated_at:
+            # No version to check against - make sure the week exists
+            cur.execute('''
+                INSERT INTO weekly_calendar_data (user_id, week_start_date, meals)
+                VALUES (%s, %s, '{}')
+                ON CONFLICT (user_id, week_start_date) DO NOTHING
+            ''', (user_id, week_start))
+        
+        result = apply_slot_operations(cur, user_id, week_start, operations, expected_updated_at)
+        if result:
+            return jsonify({'success': True, 'updated_at': result['updated_at'].isoformat()})
+        
+        cur.execute('''
+            SELECT meals, updated_at FROM weekly_calendar_data 
+            WHERE user_id = %s AND week_start_date = %s
+        ''', (user_id, week_start))
+        current = cur.fetchone()
+    
+    return jsonify({
+        'success': False,
+        'error': 'Calendar was modified in another session',
+        'meals': current['meals'] if current else {},
+        'updated_at': current['updated_at'].isoformat() if current else None
+    }), 409
 
 
 @calendar_bp.route('/api/week/<week_start>/slot', methods=['DELETE'])
@@ -241,22 +332,13 @@ def delete_calendar_slot(week_start):
         return jsonify({'error': 'slot_key is required'}), 400
     
     with get_db_cursor(commit=True) as cur:
-        # Get current meals
         cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
-        
-        if result and result['meals']:
-            meals = result['meals']
-            if slot_key in meals:
-                del meals[slot_key]
-                cur.execute('''
-                    UPDATE weekly_calendar_data 
-                    SET meals = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE user_id = %s AND week_start_date = %s
-                ''', (json.dumps(meals), user_id, week_start))
+            UPDATE weekly_calendar_data 
+            SET meals = meals - %s, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s AND week_start_date = %s AND meals ? %s
+        ''', (slot_key, user_id, week_start, slot_key))
+        if cur.rowcount:
+            sync_week_slots(cur, user_id, week_start)
     
     return jsonify({'success': True})
 
@@ -265,8 +347,6 @@ def delete_calendar_slot(week_start):
 @login_required
 def remove_recipe_from_calendar():
     """Delete a specific recipe from today's meal slot."""
-    from datetime import date, timedelta
-    
     data = request.get_json()
     user_id = session['user_id']
     recipe_id = data.get('recipe_id')
@@ -283,51 +363,10 @@ def remove_recipe_from_calendar():
         target_date = date.today()
     
     with get_db_cursor(commit=True) as cur:
-        # Find all weeks for this user and check which one contains the target date
-        cur.execute('''
-            SELECT week_start_date, meals FROM weekly_calendar_data 
-            WHERE user_id = %s
-            ORDER BY week_start_date DESC
-        ''', (user_id,))
-        all_weeks = cur.fetchall()
-        
-        for week in all_weeks:
-            week_start = week['week_start_date']
-            week_end = week_start + timedelta(days=6)
-            
-            # Check if target date falls within this week
-            if week_start <= target_date <= week_end:
-                meals = week['meals']
-                if not meals:
-                    continue
-                
-                # Calculate day index (0=Sunday for the week)
-                # Python weekday(): 0=Monday, 6=Sunday
-                # Convert to: 0=Sunday, 6=Saturday using (weekday + 1) % 7
-                day_index = (target_date.weekday() + 1) % 7
-                slot_key = f"{day_index}-{meal_type}"
-                
-                if slot_key in meals and isinstance(meals[slot_key], list):
-                    # Remove the specific recipe from the array
-                    original_length = len(meals[slot_key])
-                    meals[slot_key] = [meal for meal in meals[slot_key] 
-                                       if meal.get('recipeId') != recipe_id]
-                    
-                    # Check if anything was removed
-                    if len(meals[slot_key]) < original_length:
-                        # If the array is now empty, remove the slot entirely
-                        if len(meals[slot_key]) == 0:
-                            del meals[slot_key]
-                        
-                        # Update the database
-                        cur.execute('''
-                            UPDATE weekly_calendar_data 
-                            SET meals = %s, updated_at = CURRENT_TIMESTAMP
-                            WHERE user_id = %s AND week_start_date = %s
-                        ''', (json.dumps(meals), user_id, week_start))
-                        
-                        return jsonify({'success': True, 'message': 'Recipe removed from calendar'})
+        removed = remove_meal_from_slot(cur, user_id, target_date, meal_type, recipe_id)
     
+    if removed:
+        return jsonify({'success': True, 'message': 'Recipe removed from calendar'})
     return jsonify({'success': False, 'error': 'Recipe not found in calendar'})
 
 
@@ -3,6 +3,7 @@ Dashboard Blueprint - Personalized user dashboard.
 
 This blueprint handles:
     - Dashboard page rendering
+    - Aggregated dashboard summary API (all widgets in one call)
     - Dashboard statistics API
     - Nutrition overview API
     - Recent meals API
@@ -18,6 +19,10 @@ from flask import (
 
 from ..models import get_db_cursor
 from ..helpers import login_required, get_current_user
+from ..meal_slots import (
+    DEFAULT_RECIPE_IMAGE, get_week_start, fetch_planned_meals, meal_calories, meal_nutrition,
+    fetch_daily_nutrition, fetch_calorie_adherence
+)
 
 # Create the blueprint
 dashboard_bp = Blueprint(
@@ -26,6 +31,18 @@ dashboard_bp = Blueprint(
     template_folder='../templates'
 )
 
+# Number of days checked by the "Stay Within Calorie Budget" goal by default
+BUDGET_WINDOW_DAYS = 14
+MAX_BUDGET_WINDOW_DAYS = 365
+
+# A user's recipe counts, in total and this month (shared with query_plans.HOT_QUERIES)
+RECIPE_COUNTS_SQL = '''
+    SELECT COUNT(*) as saved_recipes,
+           COUNT(*) FILTER (WHERE created_at >= %(month_start)s) as new_recipes
+    FROM recipes 
+    WHERE user_id = %(user_id)s
+'''
+
 
 @dashboard_bp.route('/dashboard')
 @login_required
@@ -35,551 +52,311 @@ def dashboard():
     return render_template('dashboard.html', user=user)
 
 
+@dashboard_bp.route('/api/dashboard/summary')
+@login_required
+def get_dashboard_summary():
+    """
+    Get every dashboard widget in one response.
+    
+    Goals, the calendar weeks and their recipes are loaded once and all
+    widgets are computed from that shared snapshot.
+    
+    Query params:
+        period: Nutrition overview period ('today', 'week', 'month', 'year')
+        budget_days: Calorie budget window in days (default 14, max 365)
+    """
+    period = request.args.get('period', 'today')
+    
+    with get_db_cursor() as cur:
+        snapshot = _load_snapshot(cur, session['user_id'], _get_budget_days(), period)
+    
+    return jsonify({
+        'success': True,
+        'stats': _compute_stats(snapshot),
+        'nutrition': _compute_nutrition_overview(snapshot, period),
+        'recent_meals': _compute_recent_meals(snapshot),
+        'upcoming_meals': _compute_upcoming_meals(snapshot),
+        'goals': _compute_goals_progress(snapshot),
+        'weekly_trend': _compute_weekly_trend(snapshot)
+    })
+
+
 @dashboard_bp.route('/api/dashboard/stats')
 @login_required
 def get_dashboard_stats():
     """Get dashboard statistics including calories, meals, recipes, and streak."""
-    user_id = session['user_id']
-    today = date.today()
-    
     with get_db_cursor() as cur:
-        # Get today's calorie data from calorie tracker
-        days_since_sunday = (today.weekday() + 1) % 7
-        week_start = today - timedelta(days=days_since_sunday)
-        day_index = (today.weekday() + 1) % 7
-        
-        # Get user's calorie goal
-        cur.execute('''
-            SELECT calorie_goal FROM user_nutrition_goals 
-            WHERE user_id = %s
-        ''', (user_id,))
-        goal_result = cur.fetchone()
-        calorie_goal = goal_result['calorie_goal'] if goal_result else 2000
-        
-        # Get today's meals and calculate calories
-        cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        calendar_result = cur.fetchone()
-        
-        today_calories = 0
-        if calendar_result and calendar_result['meals']:
-            meals = calendar_result['meals']
-            meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
-            
-            for meal_type in meal_types:
-                slot_key = f"{day_index}-{meal_type}"
-                if slot_key in meals and meals[slot_key]:
-                    meal_info = meals[slot_key]
-                    meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                    
-                    for single_meal in meal_list:
-                        if isinstance(single_meal, dict):
-                            recipe_id = single_meal.get('recipeId')
-                            servings = single_meal.get('servings', 1)
-                            if recipe_id:
-                                cur.execute('''
-                                    SELECT calories_per_serving 
-                                    FROM recipes WHERE id = %s
-                                ''', (recipe_id,))
-                                recipe = cur.fetchone()
-                                if recipe:
-                                    today_calories += (recipe['calories_per_serving'] or 0) * servings
-        
-        # Get weekly meals count
-        weekly_meals_count = 0
-        week_end = week_start + timedelta(days=6)
-        
-        if calendar_result and calendar_result['meals']:
-            meals = calendar_result['meals']
-            for day in range(7):
-                for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                    slot_key = f"{day}-{meal_type}"
-                    if slot_key in meals and meals[slot_key]:
-                        meal_info = meals[slot_key]
-                        if isinstance(meal_info, list):
-                            weekly_meals_count += len(meal_info)
-                        else:
-                            weekly_meals_count += 1
-        
-        # Get saved recipes count
-        cur.execute('''
-            SELECT COUNT(*) as count FROM recipes 
-            WHERE user_id = %s
-        ''', (user_id,))
-        saved_recipes = cur.fetchone()['count']
-        
-        return jsonify({
-            'success': True,
-            'today_calories': int(today_calories),
-            'calorie_goal': calorie_goal,
-            'weekly_meals': weekly_meals_count,
-            'saved_recipes': saved_recipes
-        })
+        snapshot = _load_snapshot(cur, session['user_id'])
+    return jsonify({'success': True, **_compute_stats(snapshot)})
 
 
 @dashboard_bp.route('/api/dashboard/nutrition-overview')
 @login_required
 def get_nutrition_overview():
     """Get nutrition overview data (protein, carbs, fats)."""
-    user_id = session['user_id']
     period = request.args.get('period', 'today')
-    today = date.today()
-    
     with get_db_cursor() as cur:
-        # Get user's nutrition goals
-        cur.execute('''
-            SELECT protein_goal, carbs_goal, fats_goal 
-            FROM user_nutrition_goals 
-            WHERE user_id = %s
-        ''', (user_id,))
-        goals = cur.fetchone()
-        
-        protein_goal = goals['protein_goal'] if goals else 150
-        carbs_goal = goals['carbs_goal'] if goals else 200
-        fats_goal = goals['fats_goal'] if goals else 67
-        
-        # Calculate actual consumption based on period
-        if period == 'today':
-            days_since_sunday = (today.weekday() + 1) % 7
-            week_start = today - timedelta(days=days_since_sunday)
-            day_index = (today.weekday() + 1) % 7
-            
-            cur.execute('''
-                SELECT meals FROM weekly_calendar_data 
-                WHERE user_id = %s AND week_start_date = %s
-            ''', (user_id, week_start))
-            result = cur.fetchone()
-            
-            total_calories = 0
-            if result and result['meals']:
-                meals = result['meals']
-                for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                    slot_key = f"{day_index}-{meal_type}"
-                    if slot_key in meals and meals[slot_key]:
-                        meal_info = meals[slot_key]
-                        meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                        
-                        for single_meal in meal_list:
-                            if isinstance(single_meal, dict):
-                                recipe_id = single_meal.get('recipeId')
-                                servings = single_meal.get('servings', 1)
-                                if recipe_id:
-                                    cur.execute('''
-                                        SELECT calories_per_serving 
-                                        FROM recipes WHERE id = %s
-                                    ''', (recipe_id,))
-                                    recipe = cur.fetchone()
-                                    if recipe:
-                                        total_calories += (recipe['calories_per_serving'] or 0) * servings
-            
-            # Estimate macros from calories (rough estimation)
-            protein_actual = int((total_calories * 0.30) / 4)
-            carbs_actual = int((total_calories * 0.40) / 4)
-            fats_actual = int((total_calories * 0.30) / 9)
-        
-        elif period == 'week':
-            # Calculate weekly averages
-            days_since_sunday = (today.weekday() + 1) % 7
-            week_start = today - timedelta(days=days_since_sunday)
-            
-            cur.execute('''
-                SELECT meals FROM weekly_calendar_data 
-                WHERE user_id = %s AND week_start_date = %s
-            ''', (user_id, week_start))
-            result = cur.fetchone()
-            
-            total_calories = 0
-            days_with_data = 0
-            
-            if result and result['meals']:
-                meals = result['meals']
-                for day in range(7):
-                    day_calories = 0
-                    has_meals = False
-                    
-                    for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                        slot_key = f"{day}-{meal_type}"
-                        if slot_key in meals and meals[slot_key]:
-                            meal_info = meals[slot_key]
-                            meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                            
-                            for single_meal in meal_list:
-                                if isinstance(single_meal, dict):
-                                    recipe_id = single_meal.get('recipeId')
-                                    servings = single_meal.get('servings', 1)
-                                    if recipe_id:
-                                        cur.execute('''
-                                            SELECT calories_per_serving 
-                                            FROM recipes WHERE id = %s
-                                        ''', (recipe_id,))
-                                        recipe = cur.fetchone()
-                                        if recipe:
-                                            day_calories += (recipe['calories_per_serving'] or 0) * servings
-                                            has_meals = True
-                    
-                    if has_meals:
-                        total_calories += day_calories
-                        days_with_data += 1
-            
-            avg_calories = total_calories / days_with_data if days_with_data > 0 else 0
-            protein_actual = int((avg_calories * 0.30) / 4)
-            carbs_actual = int((avg_calories * 0.40) / 4)
-            fats_actual = int((avg_calories * 0.30) / 9)
-        
-        else:  # month
-            protein_actual = int(protein_goal * 0.75)
-            carbs_actual = int(carbs_goal * 0.70)
-            fats_actual = int(fats_goal * 0.80)
-        
-        return jsonify({
-            'success': True,
-            'protein': {'actual': protein_actual, 'goal': protein_goal},
-            'carbs': {'actual': carbs_actual, 'goal': carbs_goal},
-            'fats': {'actual': fats_actual, 'goal': fats_goal}
-        })
+        snapshot = _load_snapshot(cur, session['user_id'], period=period)
+    return jsonify({'success': True, **_compute_nutrition_overview(snapshot, period)})
 
 
 @dashboard_bp.route('/api/dashboard/recent-meals')
 @login_required
 def get_recent_meals():
     """Get today's meals only."""
-    user_id = session['user_id']
-    today = date.today()
-    recent_meals = []
-    
     with get_db_cursor() as cur:
-        # Only check today
-        days_since_sunday = (today.weekday() + 1) % 7
-        week_start = today - timedelta(days=days_since_sunday)
-        day_index = (today.weekday() + 1) % 7
-        
-        cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
-        
-        if result and result['meals']:
-            meals = result['meals']
-            for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                slot_key = f"{day_index}-{meal_type}"
-                if slot_key in meals and meals[slot_key]:
-                    meal_info = meals[slot_key]
-                    meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                    
-                    for single_meal in meal_list:
-                        if isinstance(single_meal, dict):
-                            recipe_id = single_meal.get('recipeId')
-                            servings = single_meal.get('servings', 1)
-                            if recipe_id:
-                                cur.execute('''
-                                    SELECT id, title, calories_per_serving 
-                                    FROM recipes WHERE id = %s
-                                ''', (recipe_id,))
-                                recipe = cur.fetchone()
-                                if recipe:
-                                    total_calories = (recipe['calories_per_serving'] or 0) * servings
-                                
-                                    # Get recipe image
-                                    cur.execute('''
-                                        SELECT image_url FROM recipes WHERE id = %s
-                                    ''', (recipe_id,))
-                                    img_result = cur.fetchone()
-                                    image_url = img_result['image_url'] if img_result and img_result['image_url'] else '/static/images/default-recipe.svg'
-                                    
-                                    recent_meals.append({
-                                        'title': recipe['title'],
-                                        'meal_type': meal_type.capitalize(),
-                                        'calories': int(total_calories),
-                                        'date': 'Today',
-                                        'image_url': image_url
-                                    })
-    
-    return jsonify({
-        'success': True,
-        'meals': recent_meals
-    })
+        snapshot = _load_snapshot(cur, session['user_id'])
+    return jsonify({'success': True, 'meals': _compute_recent_meals(snapshot)})
 
 
 @dashboard_bp.route('/api/dashboard/upcoming-meals')
 @login_required
 def get_upcoming_meals():
     """Get upcoming meals for tomorrow."""
-    user_id = session['user_id']
-    tomorrow = date.today() + timedelta(days=1)
-    upcoming_meals = []
-    
     with get_db_cursor() as cur:
-        days_since_sunday = (tomorrow.weekday() + 1) % 7
-        week_start = tomorrow - timedelta(days=days_since_sunday)
-        day_index = (tomorrow.weekday() + 1) % 7
-        
-        cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
-        
-        if result and result['meals']:
-            meals = result['meals']
-            for meal_type in ['breakfast', 'lunch', 'dinner']:
-                slot_key = f"{day_index}-{meal_type}"
-                if slot_key in meals and meals[slot_key]:
-                    meal_info = meals[slot_key]
-                    meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                    
-                    for single_meal in meal_list[:1]:  # Just first meal per type
-                        if isinstance(single_meal, dict):
-                            recipe_id = single_meal.get('recipeId')
-                            servings = single_meal.get('servings', 1)
-                            if recipe_id:
-                                cur.execute('''
-                                    SELECT id, title, calories_per_serving 
-                                    FROM recipes WHERE id = %s
-                                ''', (recipe_id,))
-                                recipe = cur.fetchone()
-                                if recipe:
-                                    total_calories = (recipe['calories_per_serving'] or 0) * servings
-                                    protein = int((total_calories * 0.30) / 4)
-                                    
-                                    # Get recipe image
-                                    cur.execute('''
-                                        SELECT image_url FROM recipes WHERE id = %s
-                                    ''', (recipe_id,))
-                                    img_result = cur.fetchone()
-                                    image_url = img_result['image_url'] if img_result and img_result['image_url'] else '/static/images/default-recipe.svg'
-                                    
-                                    upcoming_meals.append({
-                                        'title': recipe['title'],
-                                        'meal_type': meal_type.capitalize(),
-                                        'calories': int(total_calories),
-                                        'protein': protein,
-                                        'image_url': image_url
-                                    })
-    
-    return jsonify({
-        'success': True,
-        'meals': upcoming_meals
-    })
+        snapshot = _load_snapshot(cur, session['user_id'])
+    return jsonify({'success': True, 'meals': _compute_upcoming_meals(snapshot)})
 
 
 @dashboard_bp.route('/api/dashboard/goals-progress')
 @login_required
 def get_goals_progress():
-    """Get user's goals progress."""
-    user_id = session['user_id']
-    today = date.today()
+    """
+    Get user's goals progress.
     
+    Query params:
+        budget_days: Calorie budget window in days (default 14, max 365)
+    """
     with get_db_cursor() as cur:
-        # Get user's nutrition goals
-        cur.execute('''
-            SELECT protein_goal FROM user_nutrition_goals 
-            WHERE user_id = %s
-        ''', (user_id,))
-        goals = cur.fetchone()
-        protein_goal = goals['protein_goal'] if goals else 150
-        
-        # Weekly meal planning progress
-        days_since_sunday = (today.weekday() + 1) % 7
-        week_start = today - timedelta(days=days_since_sunday)
-        
-        cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
-        
-        days_planned = 0
-        if result and result['meals']:
-            meals = result['meals']
-            for day in range(7):
-                day_has_meal = False
-                for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                    slot_key = f"{day}-{meal_type}"
-                    if slot_key in meals and meals[slot_key]:
-                        day_has_meal = True
-                        break
-                if day_has_meal:
-                    days_planned += 1
-        
-        # Today's protein progress
-        day_index = (today.weekday() + 1) % 7
-        total_protein = 0
-        
-        if result and result['meals']:
-            meals = result['meals']
-            for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                slot_key = f"{day_index}-{meal_type}"
-                if slot_key in meals and meals[slot_key]:
-                    meal_info = meals[slot_key]
-                    meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                    
-                    for single_meal in meal_list:
-                        if isinstance(single_meal, dict):
-                            recipe_id = single_meal.get('recipeId')
-                            servings = single_meal.get('servings', 1)
-                            if recipe_id:
-                                cur.execute('''
-                                    SELECT calories_per_serving 
-                                    FROM recipes WHERE id = %s
-                                ''', (recipe_id,))
-                                recipe = cur.fetchone()
-                                if recipe:
-                                    total_calories = (recipe['calories_per_serving'] or 0) * servings
-                                    # Estimate protein (30% of calories / 4 cal per gram)
-                                    total_protein += int((total_calories * 0.30) / 4)
-        
-        # New recipes this month (simplified - count recent recipes)
-        cur.execute('''
-            SELECT COUNT(*) as count FROM recipes 
-            WHERE user_id = %s 
-            AND created_at >= %s
-        ''', (user_id, today.replace(day=1)))
-        new_recipes_result = cur.fetchone()
-        new_recipes = new_recipes_result['count'] if new_recipes_result else 0
-        
-        # Calorie budget adherence (last 14 days)
-        cur.execute('''
-            SELECT calorie_goal FROM user_nutrition_goals 
-            WHERE user_id = %s
-        ''', (user_id,))
-        goal_result = cur.fetchone()
-        calorie_goal = goal_result['calorie_goal'] if goal_result else 2000
-        
-        days_within_budget = 0
-        for days_ago in range(14):
-            check_date = today - timedelta(days=days_ago)
-            days_since_sunday = (check_date.weekday() + 1) % 7
-            check_week_start = check_date - timedelta(days=days_since_sunday)
-            day_idx = (check_date.weekday() + 1) % 7
-            
-            cur.execute('''
-                SELECT meals FROM weekly_calendar_data 
-                WHERE user_id = %s AND week_start_date = %s
-            ''', (user_id, check_week_start))
-            day_result = cur.fetchone()
-            
-            day_calories = 0
-            if day_result and day_result['meals']:
-                day_meals = day_result['meals']
-                for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                    slot_key = f"{day_idx}-{meal_type}"
-                    if slot_key in day_meals and day_meals[slot_key]:
-                        meal_info = day_meals[slot_key]
-                        meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                        
-                        for single_meal in meal_list:
-                            if isinstance(single_meal, dict):
-                                recipe_id = single_meal.get('recipeId')
-                                servings = single_meal.get('servings', 1)
-                                if recipe_id:
-                                    cur.execute('''
-                                        SELECT calories_per_serving 
-                                        FROM recipes WHERE id = %s
-                                    ''', (recipe_id,))
-                                    recipe = cur.fetchone()
-                                    if recipe:
-                                        day_calories += (recipe['calories_per_serving'] or 0) * servings
-            
-            if day_calories > 0 and day_calories <= calorie_goal * 1.1:  # Within 110% of goal
-                days_within_budget += 1
-        
-        return jsonify({
-            'success': True,
-            'goals': [
-                {
-                    'name': 'Weekly Meal Planning',
-                    'current': days_planned,
-                    'target': 7,
-                    'unit': 'days'
-                },
-                {
-                    'name': f'Daily Protein Goal ({protein_goal}g)',
-                    'current': total_protein,
-                    'target': protein_goal,
-                    'unit': 'g'
-                },
-                {
-                    'name': 'Try New Recipes',
-                    'current': min(new_recipes, 5),
-                    'target': 5,
-                    'unit': 'this month'
-                },
-                {
-                    'name': 'Stay Within Calorie Budget',
-                    'current': days_within_budget,
-                    'target': 14,
-                    'unit': 'days'
-                }
-            ]
-        })
+        snapshot = _load_snapshot(cur, session['user_id'], _get_budget_days())
+    return jsonify({'success': True, 'goals': _compute_goals_progress(snapshot)})
 
 
 @dashboard_bp.route('/api/dashboard/weekly-trend')
 @login_required
 def get_weekly_trend():
     """Get weekly calorie trend for chart."""
-    user_id = session['user_id']
+    with get_db_cursor() as cur:
+        snapshot = _load_snapshot(cur, session['user_id'])
+    return jsonify({'success': True, 'data': _compute_weekly_trend(snapshot)})
+
+
+# ==================== SNAPSHOT ====================
+
+def _load_snapshot(cur, user_id, budget_days=BUDGET_WINDOW_DAYS, period='today'):
+    """
+    Load everything the dashboard widgets need with a fixed number of queries.
+    
+    Loads the planned meals from the start of the current week through
+    tomorrow (which falls in next week on Saturdays), and the daily
+    nutrition rollup over the same range - extended back to the start of
+    the month or year for those nutrition periods - in one range scan.
+    Calorie budget adherence over ``budget_days`` is computed in SQL, so
+    the window length does not add queries.
+    
+    Returns:
+        dict with keys: today, week_start, goals, meals, daily_calories,
+        daily_nutrition, budget, saved_recipes, new_recipes
+    """
     today = date.today()
-    days_since_sunday = (today.weekday() + 1) % 7
-    week_start = today - timedelta(days=days_since_sunday)
+    week_start = get_week_start(today)
+    range_end = max(week_start + timedelta(days=6), today + timedelta(days=1))
     
-    weekly_data = []
+    goals = _get_nutrition_goals(cur, user_id)
+    meals = fetch_planned_meals(cur, user_id, week_start, range_end)
+    # Days count as within budget up to 110% of the calorie goal
+    budget = fetch_calorie_adherence(cur, user_id, today, budget_days, goals['calorie_goal'] * 1.1)
+    budget['days'] = budget_days
+    
+    cur.execute(RECIPE_COUNTS_SQL, {'user_id': user_id, 'month_start': today.replace(day=1)})
+    counts = cur.fetchone()
+    
+    daily_nutrition = fetch_daily_nutrition(
+        cur, user_id, min(week_start, _period_start(today, week_start, period)), range_end)
+    
+    return {
+        'today': today,
+        'week_start': week_start,
+        'goals': goals,
+        'meals': meals,
+        'daily_calories': {day: totals['kcal'] for day, totals in daily_nutrition.items()},
+        'daily_nutrition': daily_nutrition,
+        'budget': budget,
+        'saved_recipes': counts['saved_recipes'],
+        'new_recipes': counts['new_recipes']
+    }
+
+
+def _meals_on(snapshot, day):
+    """Get the meals planned for a date."""
+    return [m for m in snapshot['meals'] if m['date'] == day]
+
+
+def _meals_this_week(snapshot):
+    """Get the meals planned for the current week."""
+    week_end = snapshot['week_start'] + timedelta(days=6)
+    return [m for m in snapshot['meals'] if m['date'] <= week_end]
+
+
+# ==================== WIDGETS ====================
+
+def _compute_stats(snapshot):
+    """Today's calories, meals planned this week, saved recipes and calorie budget streak."""
+    return {
+        'today_calories': int(snapshot['daily_calories'].get(snapshot['today'], 0)),
+        'calorie_goal': snapshot['goals']['calorie_goal'],
+        'weekly_meals': len(_meals_this_week(snapshot)),
+        'saved_recipes': snapshot['saved_recipes'],
+        'streak': snapshot['budget']['current_streak']
+    }
+
+
+def _compute_nutrition_overview(snapshot, period):
+    """
+    Actual vs goal protein, carbs and fats for 'today', 'week', 'month' or 'year'.
+    
+    Week, month and year are averages over the days with planned meals
+    (the month and year up to today).
+    """
+    goals = snapshot['goals']
+    protein_goal = goals['protein_goal']
+    carbs_goal = goals['carbs_goal']
+    fats_goal = goals['fats_goal']
+    
+    today = snapshot['today']
+    start = _period_start(today, snapshot['week_start'], period)
+    end = start + timedelta(days=6) if period == 'week' else today
+    day_totals = [totals for day, totals in snapshot['daily_nutrition'].items() if start <= day <= end]
+    
+    protein_actual, carbs_actual, fats_actual = (
+        int(sum(totals[nutrient] for totals in day_totals) / len(day_totals)) if day_totals else 0
+        for nutrient in ('protein', 'carbs', 'fat')
+    )
+    
+    return {
+        'protein': {'actual': protein_actual, 'goal': protein_goal},
+        'carbs': {'actual': carbs_actual, 'goal': carbs_goal},
+        'fats': {'actual': fats_actual, 'goal': fats_goal}
+    }
+
+
+def _compute_recent_meals(snapshot):
+    """Today's meals."""
+    return [{
+        'title': m['recipe']['title'],
+        'meal_type': m['meal_type'].capitalize(),
+        'calories': int(meal_calories(m)),
+        'date': 'Today',
+        'image_url': m['recipe']['image_url'] or DEFAULT_RECIPE_IMAGE
+    } for m in _meals_on(snapshot, snapshot['today'])]
+
+
+def _compute_upcoming_meals(snapshot):
+    """Tomorrow's breakfast, lunch and dinner (first meal per slot)."""
+    upcoming_meals = []
+    for m in _meals_on(snapshot, snapshot['today'] + timedelta(days=1)):
+        if m['meal_type'] == 'snack' or m['position'] > 0:
+            continue
+        nutrition = meal_nutrition(m)
+        upcoming_meals.append({
+            'title': m['recipe']['title'],
+            'meal_type': m['meal_type'].capitalize(),
+            'calories': int(nutrition['kcal']),
+            'protein': int(nutrition['protein']),
+            'image_url': m['recipe']['image_url'] or DEFAULT_RECIPE_IMAGE
+        })
+    return upcoming_meals
+
+
+def _compute_goals_progress(snapshot):
+    """Meal planning, protein, new recipe and calorie budget goals."""
+    today = snapshot['today']
+    protein_goal = snapshot['goals']['protein_goal']
+    
+    # Weekly meal planning progress
+    days_planned = len({m['date'] for m in _meals_this_week(snapshot)})
+    
+    # Today's protein progress
+    total_protein = int(snapshot['daily_nutrition'].get(today, {}).get('protein', 0))
+    
+    return [
+        {
+            'name': 'Weekly Meal Planning',
+            'current': days_planned,
+            'target': 7,
+            'unit': 'days'
+        },
+        {
+            'name': f'Daily Protein Goal ({protein_goal}g)',
+            'current': total_protein,
+            'target': protein_goal,
+            'unit': 'g'
+        },
+        {
+            'name': 'Try New Recipes',
+            'current': min(snapshot['new_recipes'], 5),
+            'target': 5,
+            'unit': 'this month'
+        },
+        {
+            'name': 'Stay Within Calorie Budget',
+            'current': snapshot['budget']['days_within_budget'],
+            'target': snapshot['budget']['days'],
+            'unit': 'days'
+        }
+    ]
+
+
+def _compute_weekly_trend(snapshot):
+    """Calories per day of the current week as a percentage of the goal."""
+    calorie_goal = snapshot['goals']['calorie_goal']
     day_names = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
     
-    with get_db_cursor() as cur:
-        # Get user's calorie goal for percentage calculation
-        cur.execute('''
-            SELECT calorie_goal FROM user_nutrition_goals 
-            WHERE user_id = %s
-        ''', (user_id,))
-        goal_result = cur.fetchone()
-        calorie_goal = goal_result['calorie_goal'] if goal_result else 2000
-        
-        cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
+    weekly_data = []
+    for day in range(7):
+        current_day = snapshot['week_start'] + timedelta(days=day)
+        day_calories = snapshot['daily_calories'].get(current_day, 0)
+        percentage = min(100, int((day_calories / calorie_goal) * 100)) if calorie_goal > 0 else 0
         
-        for day in range(7):
-            day_calories = 0
-            
-            if result and result['meals']:
-                meals = result['meals']
-                for meal_type in ['breakfast', 'lunch', 'dinner', 'snack']:
-                    slot_key = f"{day}-{meal_type}"
-                    if slot_key in meals and meals[slot_key]:
-                        meal_info = meals[slot_key]
-                        meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                        
-                        for single_meal in meal_list:
-                            if isinstance(single_meal, dict):
-                                recipe_id = single_meal.get('recipeId')
-                                servings = single_meal.get('servings', 1)
-                                if recipe_id:
-                                    cur.execute('''
-                                        SELECT calories_per_serving 
-                                        FROM recipes WHERE id = %s
-                                    ''', (recipe_id,))
-                                    recipe = cur.fetchone()
-                                    if recipe:
-                                        day_calories += (recipe['calories_per_serving'] or 0) * servings
-            
-            percentage = min(100, int((day_calories / calorie_goal) * 100)) if calorie_goal > 0 else 0
-            current_day = week_start + timedelta(days=day)
-            is_today = current_day == today
-            
-            weekly_data.append({
-                'day': day_names[day],
-                'percentage': percentage,
-                'calories': int(day_calories),
-                'is_today': is_today
-            })
-    
-    return jsonify({
-        'success': True,
-        'data': weekly_data
-    })
+        weekly_data.append({
+            'day': day_names[day],
+            'percentage': percentage,
+            'calories': int(day_calories),
+            'is_today': current_day == snapshot['today']
+        })
+    return weekly_data
+
+
+# ==================== HELPERS ====================
+
+def _period_start(today, week_start, period):
+    """First day of a nutrition overview period ('today', 'week', 'month', 'year')."""
+    if period == 'week':
+        return week_start
+    if period == 'month':
+        return today.replace(day=1)
+    if period == 'year':
+        return today.replace(month=1, day=1)
+    return today
+
+
+def _get_budget_days():
+    """Read the calorie budget window from the query string, clamped to 1..365 days."""
+    budget_days = request.args.get('budget_days', BUDGET_WINDOW_DAYS, type=int)
+    return max(1, min(budget_days, MAX_BUDGET_WINDOW_DAYS))
+
+
+def _get_nutrition_goals(cur, user_id):
+    """Get the user's nutrition goals, falling back to defaults."""
+    cur.execute('''
+        SELECT calorie_goal, protein_goal, carbs_goal, fats_goal
+        FROM user_nutrition_goals 
+        WHERE user_id = %s
+    ''', (user_id,))
+    goals = cur.fetchone()
+    return {
+        'calorie_goal': goals['calorie_goal'] if goals else 2000,
+        'protein_goal': goals['protein_goal'] if goals else 150,
+        'carbs_goal': goals['carbs_goal'] if goals else 200,
+        'fats_goal': goals['fats_goal'] if goals else 67
+    }
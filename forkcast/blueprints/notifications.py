@@ -24,6 +24,37 @@ notifications_bp = Blueprint(
     url_prefix='/notifications'
 )
 
+# Hot queries, shared with query_plans.HOT_QUERIES (named parameters)
+NOTIFICATION_LIST_SQL = '''
+    SELECT n.*, 
+           u.username as from_username, 
+           u.full_name as from_full_name,
+           u.profile_image as from_profile_image
+    FROM notifications n
+    LEFT JOIN users u ON n.from_user_id = u.id
+    WHERE n.user_id = %(user_id)s
+'''
+NOTIFICATION_LIST_UNREAD_SQL = ' AND n.is_read = FALSE'
+NOTIFICATION_LIST_PAGE_SQL = ' ORDER BY n.created_at DESC LIMIT %(limit)s OFFSET %(offset)s'
+
+UNREAD_COUNT_SQL = '''
+    SELECT COUNT(*) as count 
+    FROM notifications 
+    WHERE user_id = %(user_id)s AND is_read = FALSE
+'''
+
+TODAY_MEAL_REMINDERS_SQL = '''
+    SELECT COUNT(*) as count FROM notifications
+    WHERE user_id = %(user_id)s AND type = 'meal'
+      AND created_at >= %(today)s AND created_at < %(tomorrow)s
+'''
+
+MARK_ALL_READ_SQL = '''
+    UPDATE notifications 
+    SET is_read = TRUE
+    WHERE user_id = %(user_id)s AND is_read = FALSE
+'''
+
 
 @notifications_bp.route('/')
 @login_required
@@ -43,29 +74,20 @@ def get_notifications():
     limit = min(int(request.args.get('limit', 50)), 100)
     offset = int(request.args.get('offset', 0))
     
-    query = '''
-        SELECT n.*, 
-               u.username as from_username, 
-               u.full_name as from_full_name,
-               u.profile_image as from_profile_image
-        FROM notifications n
-        LEFT JOIN users u ON n.from_user_id = u.id
-        WHERE n.user_id = %s
-    '''
-    params = [user_id]
+    query = NOTIFICATION_LIST_SQL
+    params = {'user_id': user_id, 'limit': limit, 'offset': offset}
     
     if notification_type != 'all':
-        query += ' AND n.type = %s'
-        params.append(notification_type)
+        query += ' AND n.type = %(type)s'
+        params['type'] = notification_type
     
     if unread_only:
-        query += ' AND n.is_read = FALSE'
+        query += NOTIFICATION_LIST_UNREAD_SQL
     
-    query += ' ORDER BY n.created_at DESC LIMIT %s OFFSET %s'
-    params.extend([limit, offset])
+    query += NOTIFICATION_LIST_PAGE_SQL
     
     with get_db_cursor() as cur:
-        cur.execute(query, tuple(params))
+        cur.execute(query, params)
         notifications_list = cur.fetchall()
         
         # Convert to list of dicts with proper datetime formatting
@@ -104,11 +126,7 @@ def mark_all_notifications_read():
     """Mark all notifications as read."""
     user_id = session['user_id']
     with get_db_cursor(commit=True) as cur:
-        cur.execute('''
-            UPDATE notifications 
-            SET is_read = TRUE
-            WHERE user_id = %s AND is_read = FALSE
-        ''', (user_id,))
+        cur.execute(MARK_ALL_READ_SQL, {'user_id': user_id})
     return jsonify({'success': True})
 
 
@@ -144,11 +162,7 @@ def get_unread_count():
     """Get count of unread notifications."""
     user_id = session['user_id']
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT COUNT(*) as count 
-            FROM notifications 
-            WHERE user_id = %s AND is_read = FALSE
-        ''', (user_id,))
+        cur.execute(UNREAD_COUNT_SQL, {'user_id': user_id})
         result = cur.fetchone()
     return jsonify({'count': result['count'] if result else 0})
 
@@ -166,14 +180,12 @@ def get_notification_stats():
         total = cur.fetchone()['count']
         
         # Unread count
-        cur.execute('SELECT COUNT(*) as count FROM notifications WHERE user_id = %s AND is_read = FALSE', (user_id,))
+        cur.execute(UNREAD_COUNT_SQL, {'user_id': user_id})
         unread = cur.fetchone()['count']
         
-        # Today's meal reminders
-        cur.execute('''
-            SELECT COUNT(*) as count FROM notifications 
-            WHERE user_id = %s AND type = 'meal' AND DATE(created_at) = %s
-        ''', (user_id, today))
+        # Today's meal reminders (a created_at range, so the index applies)
+        cur.execute(TODAY_MEAL_REMINDERS_SQL,
+                    {'user_id': user_id, 'today': today, 'tomorrow': today + timedelta(days=1)})
         today_reminders = cur.fetchone()['count']
     
     return jsonify({
@@ -21,6 +21,8 @@ from werkzeug.utils import secure_filename
 
 from ..models import get_db_cursor
 from ..helpers import login_required, get_current_user, allowed_file
+from ..meal_slots import fetch_recipe_days, refresh_daily_nutrition
+from ..recipe_ratings import delete_user_ratings
 
 # Create the blueprint
 profile_bp = Blueprint(
@@ -259,13 +261,18 @@ def delete_account():
                 """, (table_name,))
                 return cur.fetchone()['exists']
             
-            # Delete user's ratings/reviews
+            # Delete user's ratings/reviews (and take them out of the
+            # rated recipes' averages)
             if table_exists('recipe_ratings'):
-                cur.execute('DELETE FROM recipe_ratings WHERE user_id = %s', (user_id,))
+                delete_user_ratings(cur, user_id)
             
-            # Delete user's recipes
+            # Delete user's recipes (and refresh the nutrition of other
+            # users' days that had them planned)
             if table_exists('recipes'):
+                cur.execute('SELECT id FROM recipes WHERE user_id = %s', (user_id,))
+                planned_days = fetch_recipe_days(cur, [row['id'] for row in cur.fetchall()])
                 cur.execute('DELETE FROM recipes WHERE user_id = %s', (user_id,))
+                refresh_daily_nutrition(cur, [(uid, day) for uid, day in planned_days if uid != user_id])
             
             # Delete calendar events if table exists
             if table_exists('calendar_events'):
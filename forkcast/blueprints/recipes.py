@@ -2,15 +2,17 @@
 Recipes Blueprint - Recipe viewing and management pages.
 
 This blueprint handles:
-    - Public recipe feed
+    - Public recipe feed (keyset-paginated, infinite scroll)
     - User's personal recipes page
     - Cooking mode page
 """
 
-from flask import Blueprint, render_template, session, abort
+from flask import Blueprint, render_template, request, jsonify, session, abort
 
 from ..models import get_db_cursor
 from ..helpers import login_required, get_current_user
+from ..recipe_feed import fetch_public_feed, feed_page_size, parse_feed_filters, parse_feed_sort
+from ..recipe_fields import CARD_FIELDS, recipe_select_sql
 
 # Create the blueprint
 recipes_bp = Blueprint(
@@ -25,32 +27,44 @@ recipes_bp = Blueprint(
 def recipes():
     """
     Public recipe feed page.
-    Shows all public recipes from all users.
+    Shows the first page of public recipes from all users; further pages
+    are loaded by infinite scroll from feed_page().
     """
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT r.*, r.calories_per_serving as calories, u.username, u.full_name, u.profile_image,
-                   r.forked_from_id, r.original_author_id,
-                   COALESCE(AVG(rr.rating), 0) as avg_rating,
-                   COUNT(DISTINCT rr.id) as rating_count,
-                   orig.title as original_title,
-                   orig.is_public as original_is_public,
-                   orig_user.username as original_author_username,
-                   orig_user.full_name as original_author_name
-            FROM recipes r
-            JOIN users u ON r.user_id = u.id
-            LEFT JOIN recipe_ratings rr ON r.id = rr.recipe_id
-            LEFT JOIN recipes orig ON r.forked_from_id = orig.id
-            LEFT JOIN users orig_user ON r.original_author_id = orig_user.id
-            WHERE r.is_public = true
-            GROUP BY r.id, u.username, u.full_name, u.profile_image,
-                     orig.title, orig.is_public, orig_user.username, orig_user.full_name
-            ORDER BY r.created_at DESC
-        ''')
-        all_recipes = cur.fetchall()
+        page, next_cursor = fetch_public_feed(cur, feed_page_size(None))
     
     user = get_current_user()
-    return render_template('recipe.html', user=user, recipes=all_recipes)
+    return render_template('recipe.html', user=user, recipes=page, next_cursor=next_cursor)
+
+
+@recipes_bp.route('/recipes/feed')
+@login_required
+def feed_page():
+    """
+    Next page of the public recipe feed as rendered cards (infinite scroll).
+    
+    Query params:
+        cursor: next_cursor of the previous page (None for the first page)
+        limit: Page size (capped at RECIPE_FEED_MAX_PAGE_SIZE)
+        sort: 'recent' (default) or 'popular'
+        q: Search term (title, description, ingredients, tags, author)
+        category, cuisine, difficulty: Exact (case-insensitive) filters
+        max_time: Maximum prep + cook time in minutes
+    """
+    try:
+        sort = parse_feed_sort(request.args.get('sort'))
+        filters = parse_feed_filters(request.args)
+        with get_db_cursor() as cur:
+            page, next_cursor = fetch_public_feed(cur, feed_page_size(request.args.get('limit')),
+                                                  request.args.get('cursor'), sort=sort, filters=filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'html': render_template('recipe_feed_cards.html', recipes=page),
+        'next_cursor': next_cursor
+    })
 
 
 @recipes_bp.route('/my-recipes')
@@ -61,21 +75,8 @@ def my_recipes():
     Shows recipes created by the logged-in user.
     """
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT r.*, r.calories_per_serving as calories,
-                   r.forked_from_id, r.original_author_id,
-                   COALESCE(AVG(rr.rating), 0) as avg_rating,
-                   COUNT(DISTINCT rr.id) as rating_count,
-                   orig.title as original_title,
-                   orig.is_public as original_is_public,
-                   orig_user.username as original_author_username,
-                   orig_user.full_name as original_author_name
-            FROM recipes r
-            LEFT JOIN recipe_ratings rr ON r.id = rr.recipe_id
-            LEFT JOIN recipes orig ON r.forked_from_id = orig.id
-            LEFT JOIN users orig_user ON r.original_author_id = orig_user.id
+        cur.execute(recipe_select_sql(CARD_FIELDS) + '''
             WHERE r.user_id = %s
-            GROUP BY r.id, orig.title, orig.is_public, orig_user.username, orig_user.full_name
             ORDER BY r.created_at DESC
         ''', (session['user_id'],))
         user_recipes = cur.fetchall()
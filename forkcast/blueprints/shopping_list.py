@@ -13,7 +13,9 @@ from datetime import date, timedelta
 
 from ..helpers import login_required, get_current_user
 from ..models import get_db_cursor
-from ..ingredient_parser import parse_ingredient, aggregate_ingredients, format_quantity
+from ..ingredient_parser import format_quantity
+from ..recipe_ingredients import fetch_aggregated_ingredients
+from ..meal_slots import get_week_start
 
 # Create the blueprint
 shopping_list_bp = Blueprint(
@@ -23,6 +25,23 @@ shopping_list_bp = Blueprint(
     url_prefix='/shopping-list'
 )
 
+# Hot queries, shared with query_plans.HOT_QUERIES (named parameters)
+SHOPPING_LIST_SQL = '''
+    SELECT * FROM shopping_list 
+    WHERE user_id = %(user_id)s 
+    ORDER BY is_checked, created_at DESC
+'''
+
+CLEAR_CHECKED_SQL = '''
+    DELETE FROM shopping_list 
+    WHERE user_id = %(user_id)s AND is_checked = TRUE
+'''
+
+CLEAR_GENERATED_SQL = '''
+    DELETE FROM shopping_list 
+    WHERE user_id = %(user_id)s AND source = 'auto'
+'''
+
 
 @shopping_list_bp.route('/')
 @login_required
@@ -38,11 +57,7 @@ def get_shopping_list():
     """Get shopping list items for the logged-in user."""
     user_id = session['user_id']
     with get_db_cursor() as cur:
-        cur.execute('''
-            SELECT * FROM shopping_list 
-            WHERE user_id = %s 
-            ORDER BY is_checked, created_at DESC
-        ''', (user_id,))
+        cur.execute(SHOPPING_LIST_SQL, {'user_id': user_id})
         items = cur.fetchall()
     return jsonify([dict(item) for item in items] if items else [])
 
@@ -102,10 +117,7 @@ def clear_checked_items():
     """Clear all checked items from shopping list."""
     user_id = session['user_id']
     with get_db_cursor(commit=True) as cur:
-        cur.execute('''
-            DELETE FROM shopping_list 
-            WHERE user_id = %s AND is_checked = TRUE
-        ''', (user_id,))
+        cur.execute(CLEAR_CHECKED_SQL, {'user_id': user_id})
     return jsonify({'success': True})
 
 
@@ -125,9 +137,7 @@ def generate_from_meal_plan():
     data = request.get_json() or {}
     
     # Get date range (default to current week)
-    today = date.today()
-    days_since_sunday = (today.weekday() + 1) % 7
-    week_start = today - timedelta(days=days_since_sunday)
+    week_start = get_week_start(date.today())
     
     # Option to clear existing auto-generated items
     clear_existing = data.get('clear_existing', True)
@@ -141,87 +151,42 @@ def generate_from_meal_plan():
     with get_db_cursor(commit=True) as cur:
         # Clear existing auto-generated items if requested
         if clear_existing:
-            cur.execute('''
-                DELETE FROM shopping_list 
-                WHERE user_id = %s AND source = 'auto'
-            ''', (user_id,))
+            cur.execute(CLEAR_GENERATED_SQL, {'user_id': user_id})
         
-        # Get all recipes from the weekly meal plan
+        # Total servings per recipe over the selected days and meal types,
+        # from an indexed range scan of the week's meal slots
+        selected_dates = [week_start + timedelta(days=int(day)) for day in selected_days]
         cur.execute('''
-            SELECT meals FROM weekly_calendar_data 
-            WHERE user_id = %s AND week_start_date = %s
-        ''', (user_id, week_start))
-        result = cur.fetchone()
-        
-        if not result or not result['meals']:
-            return jsonify({
-                'success': False,
-                'message': 'No meals planned for this week'
-            })
-        
-        meals = result['meals']
-        recipe_ids = set()
-        recipe_servings = {}
-        
-        # Extract recipe IDs and servings only from selected days and meal types
-        for day in selected_days:
-            for meal_type in selected_meals:
-                slot_key = f"{day}-{meal_type}"
-                if slot_key in meals and meals[slot_key]:
-                    meal_info = meals[slot_key]
-                    meal_list = meal_info if isinstance(meal_info, list) else [meal_info]
-                    
-                    for single_meal in meal_list:
-                        if isinstance(single_meal, dict):
-                            recipe_id = single_meal.get('recipeId')
-                            servings = single_meal.get('servings', 1)
-                            if recipe_id:
-                                recipe_ids.add(recipe_id)
-                                # Track total servings needed for each recipe
-                                if recipe_id in recipe_servings:
-                                    recipe_servings[recipe_id] += servings
-                                else:
-                                    recipe_servings[recipe_id] = servings
+            SELECT s.recipe_id, SUM(s.servings)::float AS servings
+            FROM meal_slots s
+            WHERE s.user_id = %s
+              AND s.date BETWEEN %s AND %s
+              AND s.date = ANY(%s::date[])
+              AND s.meal_type = ANY(%s)
+            GROUP BY s.recipe_id
+        ''', (user_id, week_start, week_start + timedelta(days=6), selected_dates, selected_meals))
+        recipe_servings = {row['recipe_id']: row['servings'] for row in cur.fetchall()}
+        recipe_ids = set(recipe_servings)
         
         if not recipe_ids:
+            cur.execute('''
+                SELECT EXISTS (
+                    SELECT 1 FROM meal_slots 
+                    WHERE user_id = %s AND date BETWEEN %s AND %s
+                ) AS has_meals
+            ''', (user_id, week_start, week_start + timedelta(days=6)))
+            if not cur.fetchone()['has_meals']:
+                return jsonify({
+                    'success': False,
+                    'message': 'No meals planned for this week'
+                })
             return jsonify({
                 'success': False,
                 'message': 'No recipes found in meal plan'
             })
         
-        # Fetch all recipes with their ingredients
-        placeholders = ','.join(['%s'] * len(recipe_ids))
-        cur.execute(f'''
-            SELECT id, title, ingredients, servings 
-            FROM recipes 
-            WHERE id IN ({placeholders})
-        ''', tuple(recipe_ids))
-        recipes = cur.fetchall()
-        
-        # Parse and aggregate ingredients
-        all_ingredients = []
-        
-        for recipe in recipes:
-            recipe_id = recipe['id']
-            ingredients_text = recipe['ingredients']
-            recipe_base_servings = recipe['servings'] or 1
-            total_servings_needed = recipe_servings.get(recipe_id, 1)
-            
-            # Calculate scaling factor
-            scale_factor = total_servings_needed / recipe_base_servings
-            
-            # Parse each ingredient line
-            for line in ingredients_text.split('\n'):
-                parsed = parse_ingredient(line)
-                if parsed:
-                    # Scale quantity based on servings needed
-                    parsed['quantity'] *= scale_factor
-                    parsed['recipe_id'] = recipe_id
-                    parsed['recipe_title'] = recipe['title']
-                    all_ingredients.append(parsed)
-        
-        # Aggregate ingredients
-        aggregated = aggregate_ingredients(all_ingredients)
+        # Sum the recipes' pre-parsed ingredients, scaled to the planned servings
+        aggregated = fetch_aggregated_ingredients(cur, recipe_servings)
         
         # Insert aggregated ingredients into shopping list
         items_added = 0
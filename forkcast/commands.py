@@ -0,0 +1,218 @@
+"""
+CLI Commands - Database management and maintenance commands for Forkcast.
+
+Registered on the app by create_app() and run with the Flask CLI:
+    flask --app app migrate [--check]
+    flask --app app backfill-meal-slots
+    flask --app app backfill-recipe-ingredients [--workers N] [--chunk-size N]
+    flask --app app benchmark-parser
+    flask --app app import-nutrients nutrients.csv
+    flask --app app backfill-recipe-nutrition
+    flask --app app reconcile-rating-stats
+    flask --app app check-query-plans [--users N] [--verbose]
+"""
+
+import functools
+import os
+
+import click
+from flask import current_app
+
+from .models import get_db_cursor
+from .migrations import apply_migrations, check_schema, schema_version, SchemaDriftError
+from .meal_slots import backfill_meal_slots
+from .recipe_ingredients import reparse_recipe_ingredients
+from .ingredient_parser import parse_cache_info
+from .parser_benchmark import benchmark_parsers
+from .nutrient_db import import_nutrient_dataset
+from .recipe_nutrition import backfill_recipe_nutrition
+from .recipe_ratings import reconcile_rating_stats
+from .query_plans import DEFAULT_PLAN_CHECK_USERS, seed_plan_dataset, explain_hot_queries
+from .config import Config
+
+
+def schema_check_deferred() -> bool:
+    """
+    Whether create_app() should leave the startup schema check to the CLI command.
+
+    WSGI servers and built-in commands such as `flask run` load the app
+    outside of / from inside a command, and are checked at startup. The
+    commands below load it while the CLI is still resolving which command
+    to run; they check the schema themselves (see requires_schema), all
+    except `migrate`, which is what brings an outdated schema up to date.
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.command, click.Group)
+
+
+def requires_schema(command):
+    """Make a CLI command verify the schema (like create_app() does) before it runs."""
+    callback = command.callback
+
+    @functools.wraps(callback)
+    def checked(*args, **kwargs):
+        if current_app.config['SCHEMA_CHECK']:
+            try:
+                check_schema()
+            except SchemaDriftError as e:
+                raise click.ClickException(str(e))
+        return callback(*args, **kwargs)
+
+    command.callback = checked
+    return command
+
+
+@click.command('migrate')
+@click.option('--check', is_flag=True, help='Only verify the schema is up to date (exit 1 on drift).')
+def migrate_command(check):
+    """Apply pending schema migrations (run once per deploy)."""
+    try:
+        if check:
+            check_schema()
+        else:
+            applied = apply_migrations(
+                progress=lambda migration: click.echo(f"  Applying {migration.version}: {migration.name}"))
+            click.echo(f"Applied {len(applied)} migration(s).")
+            check_schema()
+    except SchemaDriftError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Database schema is at version {schema_version()}.")
+
+
+@requires_schema
+@click.command('backfill-meal-slots')
+def backfill_meal_slots_command():
+    """Rebuild the meal_slots table from weekly_calendar_data (migration 5 does this on deploy)."""
+    with get_db_cursor(commit=True) as cur:
+        rows = backfill_meal_slots(cur)
+    click.echo(f"Backfilled {rows} meal slots.")
+
+
+@requires_schema
+@click.command('backfill-recipe-ingredients')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+              help='Parser processes (1 parses in the current process).')
+@click.option('--chunk-size', default=500, show_default=True,
+              help='Recipes per parse chunk and write batch.')
+def backfill_recipe_ingredients_command(workers, chunk_size):
+    """(Re-)parse every recipe's ingredient text into recipe_ingredients and recompute its nutrition."""
+    def report(stats):
+        click.echo(f"  {stats['recipes']}/{stats['total']} recipes, {stats['lines']} lines, "
+                   f"{stats['lines'] / max(stats['elapsed'], 1e-9):,.0f} lines/sec")
+    
+    stats = reparse_recipe_ingredients(workers=workers, chunk_size=max(chunk_size, 1), progress=report)
+    click.echo(f"Parsed ingredients of {stats['recipes']} recipes ({stats['lines']} lines) "
+               f"in {stats['elapsed']:.2f}s.")
+
+
+@requires_schema
+@click.command('benchmark-parser')
+@click.option('--lines', 'min_lines', default=100000, show_default=True,
+              help='Parse at least this many lines (the corpus is repeated as needed).')
+def benchmark_parser_command(min_lines):
+    """Compare parse_ingredient throughput with the previous parser on the recipes' ingredient lines."""
+    with get_db_cursor() as cur:
+        cur.execute('''
+            SELECT ingredients FROM recipes
+            WHERE ingredients IS NOT NULL AND ingredients <> ''
+        ''')
+        corpus = [line for row in cur.fetchall()
+                  for line in row['ingredients'].split('\n') if line.strip()]
+    if not corpus:
+        click.echo("No recipe ingredients to benchmark.")
+        return
+    
+    stats = benchmark_parsers(corpus, repeats=-(-min_lines // len(corpus)))
+    click.echo(f"Parsed {stats['lines']} lines ({len(set(corpus))} distinct) per parser:")
+    click.echo(f"  before (per-pattern parser):  {stats['reference']:>12,.0f} lines/sec")
+    click.echo(f"  after  (master regex):        {stats['current']:>12,.0f} lines/sec "
+               f"({stats['current'] / stats['reference']:.1f}x)")
+    click.echo(f"  after, with the parse cache:  {stats['current_cached']:>12,.0f} lines/sec "
+               f"({stats['current_cached'] / stats['reference']:.1f}x)")
+    if stats['mismatches']:
+        click.echo(f"Warning: the parsers disagree on {stats['mismatches']} distinct lines.")
+    cache = parse_cache_info()['parse']
+    click.echo(f"Parse cache: {cache['hits']} hits, {cache['misses']} misses, "
+               f"{cache['currsize']}/{cache['maxsize']} entries")
+
+
+@requires_schema
+@click.command('import-nutrients')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', default=None, help='Database file to write (default: NUTRIENT_DB_PATH).')
+def import_nutrients_command(source, output):
+    """
+    Import a nutrient CSV into the offline nutrient database.
+    
+    SOURCE needs the columns name, kcal, protein, carbs and fat, with
+    values per 100 g (e.g. exported from USDA FoodData Central).
+    """
+    output = output or Config.NUTRIENT_DB_PATH
+    try:
+        foods = import_nutrient_dataset(source, output)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Imported {foods} foods into {output}.")
+    click.echo("Run backfill-recipe-nutrition to recompute recipe nutrition with them.")
+
+
+@requires_schema
+@click.command('backfill-recipe-nutrition')
+def backfill_recipe_nutrition_command():
+    """Recompute recipe_nutrition for every recipe from recipe_ingredients."""
+    with get_db_cursor(commit=True) as cur:
+        recipes = backfill_recipe_nutrition(cur)
+    click.echo(f"Computed nutrition of {recipes} recipes.")
+
+
+@requires_schema
+@click.command('reconcile-rating-stats')
+def reconcile_rating_stats_command():
+    """Recompute every recipe's rating_sum / rating_count from recipe_ratings."""
+    with get_db_cursor(commit=True) as cur:
+        fixed = reconcile_rating_stats(cur)
+    click.echo(f"Reconciled rating aggregates ({fixed} recipes were out of date).")
+
+
+@requires_schema
+@click.command('check-query-plans')
+@click.option('--users', default=DEFAULT_PLAN_CHECK_USERS, show_default=True, type=click.IntRange(min=100),
+              help='Users to seed; other tables are sized per user.')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only failing ones.')
+def check_query_plans_command(users, verbose):
+    """
+    EXPLAIN the hot queries against a seeded dataset; fail on sequential scans.
+    
+    The dataset is inserted in a transaction that is rolled back, so run
+    this against a development or CI database.
+    """
+    with get_db_cursor() as cur:
+        try:
+            params = seed_plan_dataset(cur, users)
+            results = explain_hot_queries(cur, params)
+        finally:
+            cur.connection.rollback()
+    
+    failures = [result for result in results if result['seq_scans']]
+    for result in results:
+        if result['seq_scans']:
+            click.echo(f"FAIL  {result['name']}: seq scan on {', '.join(result['seq_scans'])}")
+        else:
+            click.echo(f"ok    {result['name']}")
+        if verbose or result['seq_scans']:
+            click.echo('      ' + result['plan'].replace('\n', '\n      '))
+    if failures:
+        raise click.ClickException(f"{len(failures)} of {len(results)} hot queries use a sequential scan.")
+    click.echo(f"All {len(results)} hot queries are index-driven.")
+
+
+def register_commands(app):
+    """Register CLI commands on the Flask app."""
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(backfill_meal_slots_command)
+    app.cli.add_command(backfill_recipe_ingredients_command)
+    app.cli.add_command(benchmark_parser_command)
+    app.cli.add_command(import_nutrients_command)
+    app.cli.add_command(backfill_recipe_nutrition_command)
+    app.cli.add_command(reconcile_rating_stats_command)
+    app.cli.add_command(check_query_plans_command)
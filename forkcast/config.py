@@ -26,6 +26,37 @@ class Config:
     DB_HOST = os.environ.get('DB_HOST', 'localhost')
     DB_PORT = os.environ.get('DB_PORT', '5432')
     
+    # Connection pool settings
+    DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+    
+    # Refuse to start unless the database schema matches the migrations (see migrations.py)
+    SCHEMA_CHECK = os.environ.get('SCHEMA_CHECK', 'true').lower() == 'true'
+    
+    # Calendar autosave buffering (0 writes every autosave through directly;
+    # only enable it when serving from a single process, see autosave.py)
+    AUTOSAVE_WINDOW = float(os.environ.get('AUTOSAVE_WINDOW', 0))  # seconds a week must be idle before it is written
+    AUTOSAVE_MAX_DELAY = float(os.environ.get('AUTOSAVE_MAX_DELAY', 10))  # max seconds a change stays unwritten
+    
+    # Ingredient parsing
+    INGREDIENT_CACHE_SIZE = int(os.environ.get('INGREDIENT_CACHE_SIZE', 8192))  # distinct lines memoized
+    PARSE_BATCH_MAX_LINES = int(os.environ.get('PARSE_BATCH_MAX_LINES', 5000))  # lines per /api/parse-ingredients request
+    
+    # Public recipe feed (keyset-paginated, see recipe_feed.py)
+    RECIPE_FEED_PAGE_SIZE = int(os.environ.get('RECIPE_FEED_PAGE_SIZE', 24))  # recipes per page by default
+    RECIPE_FEED_MAX_PAGE_SIZE = int(os.environ.get('RECIPE_FEED_MAX_PAGE_SIZE', 100))  # largest ?limit= honoured
+    
+    # Offline nutrient database (written by `flask import-nutrients`)
+    NUTRIENT_DB_PATH = os.environ.get('NUTRIENT_DB_PATH') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'data', 'nutrients.bin')
+    # Share of a recipe's ingredient weight that must be found in the nutrient
+    # database before its nutrition is derived from ingredients (see recipe_nutrition.py)
+    NUTRITION_MIN_MATCHED_RATIO = float(os.environ.get('NUTRITION_MIN_MATCHED_RATIO', 0.6))
+    
     # Upload settings - save to package's static folder so Flask can serve them
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB max file size
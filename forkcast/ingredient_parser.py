@@ -2,15 +2,21 @@
 Ingredient Parser - Parse and aggregate ingredients from recipes.
 
 This module handles:
-    - Parsing ingredient strings from recipes
+    - Parsing ingredient strings from recipes (memoized per line)
     - Extracting quantities, units, and ingredient names
     - Aggregating identical ingredients
     - Categorizing ingredients
+    - Batch parsing into NumPy columns (vectorized scaling and gram estimates)
 """
 
 import re
 from fractions import Fraction
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple, Optional
+
+import numpy as np
+
+from .config import Config
 
 
 # Common ingredient categories
@@ -93,6 +99,39 @@ UNIT_CONVERSIONS = {
 }
 
 
+# Unit to grams conversion (approximate) - for calorie calculations
+UNIT_TO_GRAMS = {
+    # Volume
+    'cup': 240, 'cups': 240, 'c': 240,
+    'tablespoon': 15, 'tablespoons': 15, 'tbsp': 15, 'tb': 15,
+    'teaspoon': 5, 'teaspoons': 5, 'tsp': 5, 't': 5,
+    'fluid ounce': 30, 'fluid ounces': 30, 'fl oz': 30, 'floz': 30,
+    'pint': 480, 'pints': 480, 'pt': 480,
+    'quart': 960, 'quarts': 960, 'qt': 960,
+    'gallon': 3840, 'gallons': 3840, 'gal': 3840,
+    'liter': 1000, 'liters': 1000, 'l': 1000,
+    'milliliter': 1, 'milliliters': 1, 'ml': 1,
+    
+    # Weight
+    'pound': 454, 'pounds': 454, 'lb': 454, 'lbs': 454,
+    'ounce': 28, 'ounces': 28, 'oz': 28,
+    'gram': 1, 'grams': 1, 'g': 1,
+    'kilogram': 1000, 'kilograms': 1000, 'kg': 1000,
+    
+    # Count (approximate estimates)
+    'piece': 50, 'pieces': 50, 'pc': 50,
+    'whole': 100, 'item': 50, 'items': 50,
+    'clove': 5, 'cloves': 5,
+    'slice': 30, 'slices': 30,
+    'can': 400, 'cans': 400,
+    'package': 250, 'packages': 250, 'pkg': 250,
+    'bunch': 100, 'bunches': 100,
+    
+    # Size descriptors
+    'small': 50, 'medium': 100, 'large': 150, 'extra-large': 200, 'xl': 200
+}
+
+
 def parse_fraction(text: str) -> float:
     """Parse a fraction or mixed number (e.g., '1 1/2', '3/4') to float."""
     text = text.strip()
@@ -134,9 +173,56 @@ SIZE_DESCRIPTORS = {
 ALL_UNITS = list(UNIT_CONVERSIONS.keys()) + list(SIZE_DESCRIPTORS.keys())
 
 
-def parse_ingredient(line: str) -> Dict[str, any]:
+# Alternation of all units, longest first so e.g. "tbsp" wins over "t"
+_UNIT_ALTERNATION = '|'.join(re.escape(unit) for unit in sorted(ALL_UNITS, key=len, reverse=True))
+
+# One pass over the quantity forms, tried in this order:
+#   direct  - weight/volume attached to a number ("100g", "250 ml")
+#   range   - "2-3 cups" (the average is used)
+#   mixed   - "1 1/2 cups"
+#   frac    - "1/2 cup"
+#   num     - "2 cups", "3 large"
+# Every branch ends in ".*$", so the first branch whose quantity prefix
+# matches is the one that wins.
+INGREDIENT_PATTERN = re.compile(r'''
+    ^(?:
+        (?P<direct_qty>\d+\.?\d*)\s*(?P<direct_unit>g|gram|grams|kg|ml|l|oz|lb|lbs)\b\s*(?P<direct_name>.*)
+      | (?P<range_low>\d+\.?\d*)\s*-\s*(?P<range_high>\d+\.?\d*)\s*(?P<range_unit>{units})?\s*(?P<range_name>.*)
+      | (?P<mixed_whole>\d+)\s+(?P<mixed_frac>\d+/\d+)\s*(?P<mixed_unit>{units})?\s*(?P<mixed_name>.*)
+      | (?P<frac>\d+/\d+)\s*(?P<frac_unit>{units})?\s*(?P<frac_name>.*)
+      | (?P<num>\d+\.?\d*)\s*(?P<num_unit>{units})?\s*(?P<num_name>.*)
+    )$
+'''.replace('{units}', _UNIT_ALTERNATION), re.IGNORECASE | re.VERBOSE)
+
+_PARENTHETICAL_PATTERN = re.compile(r'\([^)]*\)')
+
+_CATEGORY_DESCRIPTOR_PATTERN = re.compile(
+    r'\b(fresh|dried|chopped|diced|minced|sliced|crushed|grated|ground|whole|frozen|canned|organic|raw|cooked|boneless|skinless)\b'
+)
+
+
+class ParsedIngredient(NamedTuple):
+    """
+    One parsed ingredient line (see parse_ingredient).
+    
+    An immutable, slotted record: no per-instance dict is allocated, and
+    parsed results can be cached and shared safely. Use _replace() to
+    derive a changed copy and to_dict() for JSON responses.
+    """
+    quantity: float
+    unit: str
+    name: str
+    name_for_category: str
+    original: str
+    
+    def to_dict(self) -> Dict[str, any]:
+        """Serialize to a plain dict (keys are the field names)."""
+        return self._asdict()
+
+
+def parse_ingredient(line: str) -> Optional[ParsedIngredient]:
     """
-    Parse a single ingredient line using multiple pattern strategies.
+    Parse a single ingredient line with the precompiled INGREDIENT_PATTERN.
     
     Handles:
         - "2 cups flour"
@@ -146,13 +232,21 @@ def parse_ingredient(line: str) -> Dict[str, any]:
         - "100g chicken" (direct weight)
         - "3 large eggs"
     
+    Results are memoized per (stripped) line in a bounded LRU cache and
+    shared between callers, which is safe because they are immutable.
+    
     Returns:
-        dict with keys: quantity, unit, name, name_for_category, original
+        ParsedIngredient (None for a blank line)
     """
     line = line.strip()
     if not line:
         return None
-    
+    return _parse_ingredient_cached(line)
+
+
+@lru_cache(maxsize=Config.INGREDIENT_CACHE_SIZE)
+def _parse_ingredient_cached(line: str) -> ParsedIngredient:
+    """Parse a stripped, non-empty ingredient line (see parse_ingredient)."""
     original = line
     text = line.lower()
     
@@ -160,58 +254,33 @@ def parse_ingredient(line: str) -> Dict[str, any]:
     unit = ''
     name = ''
     
-    # Build unit pattern for regex
-    unit_pattern = '|'.join(sorted(ALL_UNITS, key=len, reverse=True))
-    
-    # Pattern 1: Direct weight/volume attached to number (e.g., "100g", "250ml")
-    direct_match = re.match(r'^(\d+\.?\d*)\s*(g|gram|grams|kg|ml|l|oz|lb|lbs)\b\s*(.*)$', text, re.IGNORECASE)
-    if direct_match:
-        quantity = float(direct_match.group(1))
-        unit = direct_match.group(2).lower()
-        name = direct_match.group(3).strip()
+    match = INGREDIENT_PATTERN.match(text)
+    if match is None:
+        # No quantity (e.g., "salt to taste", "fresh basil")
+        name = text
+    elif match.group('direct_qty') is not None:
+        quantity = float(match.group('direct_qty'))
+        unit = match.group('direct_unit').lower()
+        name = match.group('direct_name').strip()
         if name.startswith('of '):
             name = name[3:]
-    
-    # Pattern 2: Range with unit (e.g., "2-3 cups flour")
-    elif re.match(r'^\d+\.?\d*\s*-\s*\d+\.?\d*', text):
-        range_match = re.match(r'^(\d+\.?\d*)\s*-\s*(\d+\.?\d*)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
-        if range_match:
-            # Use average of range
-            low = float(range_match.group(1))
-            high = float(range_match.group(2))
-            quantity = (low + high) / 2
-            unit = (range_match.group(3) or '').lower()
-            name = (range_match.group(4) or '').strip()
-    
-    # Pattern 3: Mixed number with unit (e.g., "1 1/2 cups flour")
-    elif re.match(r'^\d+\s+\d+/\d+', text):
-        mixed_match = re.match(r'^(\d+)\s+(\d+/\d+)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
-        if mixed_match:
-            whole = float(mixed_match.group(1))
-            frac = float(Fraction(mixed_match.group(2)))
-            quantity = whole + frac
-            unit = (mixed_match.group(3) or '').lower()
-            name = (mixed_match.group(4) or '').strip()
-    
-    # Pattern 4: Fraction with unit (e.g., "1/2 cup flour")
-    elif re.match(r'^\d+/\d+', text):
-        frac_match = re.match(r'^(\d+/\d+)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
-        if frac_match:
-            quantity = float(Fraction(frac_match.group(1)))
-            unit = (frac_match.group(2) or '').lower()
-            name = (frac_match.group(3) or '').strip()
-    
-    # Pattern 5: Number with unit (e.g., "2 cups flour", "3 large eggs")
-    elif re.match(r'^\d+\.?\d*', text):
-        num_match = re.match(r'^(\d+\.?\d*)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
-        if num_match:
-            quantity = float(num_match.group(1))
-            unit = (num_match.group(2) or '').lower()
-            name = (num_match.group(3) or '').strip()
-    
-    # Pattern 6: No quantity (e.g., "salt to taste", "fresh basil")
+    elif match.group('range_low') is not None:
+        # Use average of range
+        quantity = (float(match.group('range_low')) + float(match.group('range_high'))) / 2
+        unit = (match.group('range_unit') or '').lower()
+        name = match.group('range_name').strip()
+    elif match.group('mixed_whole') is not None:
+        quantity = float(match.group('mixed_whole')) + float(Fraction(match.group('mixed_frac')))
+        unit = (match.group('mixed_unit') or '').lower()
+        name = match.group('mixed_name').strip()
+    elif match.group('frac') is not None:
+        quantity = float(Fraction(match.group('frac')))
+        unit = (match.group('frac_unit') or '').lower()
+        name = match.group('frac_name').strip()
     else:
-        name = text
+        quantity = float(match.group('num'))
+        unit = (match.group('num_unit') or '').lower()
+        name = match.group('num_name').strip()
     
     # Clean up the ingredient name
     if not name:
@@ -226,13 +295,10 @@ def parse_ingredient(line: str) -> Dict[str, any]:
         name = name.split(',')[0].strip()
     
     # Remove parenthetical notes
-    name = re.sub(r'\([^)]*\)', '', name).strip()
+    name = _PARENTHETICAL_PATTERN.sub('', name).strip()
     
     # Clean ingredient name for categorization (remove descriptors)
-    name_for_category = re.sub(
-        r'\b(fresh|dried|chopped|diced|minced|sliced|crushed|grated|ground|whole|frozen|canned|organic|raw|cooked|boneless|skinless)\b', 
-        '', name.lower()
-    ).strip()
+    name_for_category = _CATEGORY_DESCRIPTOR_PATTERN.sub('', name.lower()).strip()
     
     # Preserve original case for display
     # Try to find the name portion in the original line for proper casing
@@ -240,27 +306,105 @@ def parse_ingredient(line: str) -> Dict[str, any]:
     if name_start >= 0:
         name = original[name_start:name_start + len(name)]
     
+    return ParsedIngredient(quantity, unit, name.strip(), name_for_category, original)
+
+
+def parse_cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    Hit/miss statistics of the ingredient memo caches.
+    
+    Returns:
+        dict mapping cache name (parse, food_name) to its hits, misses,
+        maxsize and currsize
+    """
     return {
-        'quantity': quantity,
-        'unit': unit,
-        'name': name.strip(),
-        'name_for_category': name_for_category,
-        'original': original
+        name: cached.cache_info()._asdict()
+        for name, cached in (('parse', _parse_ingredient_cached), ('food_name', _clean_food_name))
     }
 
 
-def categorize_ingredient(ingredient_name: str) -> str:
-    """Categorize an ingredient based on its name."""
-    ingredient_name = ingredient_name.lower()
+def clear_parse_cache() -> None:
+    """Empty the ingredient memo caches."""
+    _parse_ingredient_cached.cache_clear()
+    _clean_food_name.cache_clear()
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over category keywords.
     
-    for category, keywords in INGREDIENT_CATEGORIES.items():
-        if category == 'Other':
-            continue
-        for keyword in keywords:
-            if keyword in ingredient_name:
-                return category
+    Finds every keyword occurring as a substring of a name in one pass,
+    so matching costs O(len(name)) however many keywords there are.
+    
+    Precedence between hits is deterministic: the longest keyword wins
+    (so "sweet potato" beats "potato", "ground beef" beats "beef"); among
+    equally long keywords the one listed first in the dictionary wins.
+    
+    Args:
+        categories: Dict mapping category name to its keywords, in
+            precedence order
+    """
     
-    return 'Other'
+    def __init__(self, categories: Dict[str, List[str]]):
+        # Trie: one transition dict per state; state 0 is the root
+        self._goto = [{}]
+        # Best (length, -rank, category) keyword ending at each state
+        self._best = [None]
+        
+        rank = 0
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                state = 0
+                for char in keyword:
+                    if char not in self._goto[state]:
+                        self._goto.append({})
+                        self._best.append(None)
+                        self._goto[state][char] = len(self._goto) - 1
+                    state = self._goto[state][char]
+                # Keep the first category that lists this keyword
+                if self._best[state] is None:
+                    self._best[state] = (len(keyword), -rank, category)
+                rank += 1
+        
+        # Failure links (breadth-first), folding each state's fallback
+        # matches into its best hit so scanning never walks the fail chain
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                inherited = self._best[self._fail[child]]
+                if inherited and (self._best[child] is None or inherited > self._best[child]):
+                    self._best[child] = inherited
+                queue.append(child)
+    
+    def match(self, text: str) -> Optional[str]:
+        """Return the category of the best keyword found in ``text`` (or None)."""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            hit = best_at[state]
+            if hit and (best is None or hit > best):
+                best = hit
+        return best[2] if best else None
+
+
+_CATEGORY_MATCHER = KeywordMatcher(INGREDIENT_CATEGORIES)
+
+
+def categorize_ingredient(ingredient_name: str) -> str:
+    """Categorize an ingredient by the best keyword hit in its name (see KeywordMatcher)."""
+    return _CATEGORY_MATCHER.match(ingredient_name.lower()) or 'Other'
 
 
 def normalize_unit(unit: str) -> Tuple[str, str]:
@@ -270,98 +414,158 @@ def normalize_unit(unit: str) -> Tuple[str, str]:
     """
     unit = unit.lower().strip()
     
-    # Volume units
-    volume_units = ['cup', 'cups', 'c', 'tablespoon', 'tablespoons', 'tbsp', 'tb',
-                   'teaspoon', 'teaspoons', 'tsp', 't', 'fluid ounce', 'fluid ounces',
-                   'fl oz', 'floz', 'pint', 'pints', 'pt', 'quart', 'quarts', 'qt',
-                   'gallon', 'gallons', 'gal', 'liter', 'liters', 'l', 'milliliter',
-                   'milliliters', 'ml']
-    
-    # Weight units
-    weight_units = ['pound', 'pounds', 'lb', 'lbs', 'ounce', 'ounces', 'oz',
-                   'gram', 'grams', 'g', 'kilogram', 'kilograms', 'kg']
-    
-    # Count units
-    count_units = ['piece', 'pieces', 'pc', 'whole', 'item', 'items', 'clove', 'cloves',
-                  'slice', 'slices', 'can', 'cans', 'package', 'packages', 'pkg',
-                  'bunch', 'bunches']
-    
-    if unit in volume_units:
+    if unit in _VOLUME_UNITS:
         return (unit, 'volume')
-    elif unit in weight_units:
+    elif unit in _WEIGHT_UNITS:
         return (unit, 'weight')
-    elif unit in count_units:
+    elif unit in _COUNT_UNITS or unit in _PACKAGING_UNITS:
         return (unit, 'count')
     else:
         return (unit, 'other')
 
 
-def can_aggregate(item1: Dict, item2: Dict) -> bool:
-    """Check if two ingredient items can be aggregated."""
-    # Must have same base ingredient name (case insensitive)
-    if item1['name'].lower() != item2['name'].lower():
-        return False
+# Items are summed in a canonical base unit per dimension: millilitres for
+# volume, grams for weight and a plain count for countable items (including
+# size descriptors - "3 large eggs" and "2 eggs" are 5 eggs). Packaging
+# units (clove, slice, can, ...) are each their own family, and anything
+# unrecognized only aggregates with the exact same unit.
+_VOLUME_UNITS = ('cup', 'cups', 'c', 'tablespoon', 'tablespoons', 'tbsp', 'tb',
+                 'teaspoon', 'teaspoons', 'tsp', 't', 'fluid ounce', 'fluid ounces',
+                 'fl oz', 'floz', 'pint', 'pints', 'pt', 'quart', 'quarts', 'qt',
+                 'gallon', 'gallons', 'gal', 'liter', 'liters', 'l', 'milliliter',
+                 'milliliters', 'ml')
+_WEIGHT_UNITS = ('pound', 'pounds', 'lb', 'lbs', 'ounce', 'ounces', 'oz',
+                 'gram', 'grams', 'g', 'kilogram', 'kilograms', 'kg')
+_COUNT_UNITS = ('piece', 'pieces', 'pc', 'whole', 'item', 'items')
+_PACKAGING_UNITS = {
+    'clove': 'clove', 'cloves': 'clove', 'slice': 'slice', 'slices': 'slice',
+    'can': 'can', 'cans': 'can', 'package': 'package', 'packages': 'package',
+    'pkg': 'package', 'bunch': 'bunch', 'bunches': 'bunch'
+}
+
+# unit -> (canonical unit, factor to the canonical unit)
+_CANONICAL_UNITS = {}
+_CANONICAL_UNITS.update({unit: ('ml', float(UNIT_TO_GRAMS[unit])) for unit in _VOLUME_UNITS})
+_CANONICAL_UNITS.update({unit: ('g', float(UNIT_TO_GRAMS[unit])) for unit in _WEIGHT_UNITS})
+_CANONICAL_UNITS.update({unit: ('count', 1.0) for unit in ('',) + _COUNT_UNITS + tuple(SIZE_DESCRIPTORS)})
+_CANONICAL_UNITS.update({unit: (family, 1.0) for unit, family in _PACKAGING_UNITS.items()})
+
+_METRIC_UNITS = {'ml', 'milliliter', 'milliliters', 'l', 'liter', 'liters',
+                 'g', 'gram', 'grams', 'kg', 'kilogram', 'kilograms'}
+
+# Display units per canonical unit and measuring system, smallest first:
+# (singular, plural, size in the canonical unit)
+_DISPLAY_LADDERS = {
+    ('ml', 'us'): [('tsp', 'tsp', 5), ('tbsp', 'tbsp', 15), ('cup', 'cups', 240),
+                   ('quart', 'quarts', 960), ('gallon', 'gallons', 3840)],
+    ('ml', 'metric'): [('ml', 'ml', 1), ('l', 'l', 1000)],
+    ('g', 'us'): [('oz', 'oz', 28), ('lb', 'lb', 454)],
+    ('g', 'metric'): [('g', 'g', 1), ('kg', 'kg', 1000)],
+}
+
+
+def to_canonical_unit(unit: str) -> Tuple[str, float]:
+    """
+    Map a unit to the canonical unit its quantities are summed in.
     
-    # Get unit types
-    _, type1 = normalize_unit(item1['unit'])
-    _, type2 = normalize_unit(item2['unit'])
+    Returns:
+        (canonical_unit, factor) such that quantity * factor is the amount
+        in canonical_unit: 'ml', 'g', 'count', a packaging family such as
+        'clove', or - for unrecognized units - the unit itself (factor 1.0)
+    """
+    unit = unit.lower().strip()
+    return _CANONICAL_UNITS.get(unit, (unit, 1.0))
+
+
+def canonical_ingredient_name(name: str) -> str:
+    """Name used to decide whether two items are the same ingredient."""
+    return name.lower().strip()
+
+
+def display_quantity(canonical_quantity: float, canonical_unit: str,
+                     first_unit: str, single_unit: bool) -> Tuple[float, str]:
+    """
+    Render a canonical total back into a unit for display.
     
-    # Can aggregate if:
-    # 1. Both have no units
-    # 2. Both have same unit type (volume, weight, or count)
-    if not item1['unit'] and not item2['unit']:
-        return True
+    When every aggregated item used the same unit, that unit is kept.
+    Otherwise volumes and weights use the largest unit of the first item's
+    measuring system (US or metric) that gives a quantity of at least 1,
+    and mixed counts drop their size descriptor.
     
-    if type1 == type2 and type1 != 'other':
-        return True
+    Args:
+        canonical_quantity: Total in canonical_unit
+        canonical_unit: Canonical unit from to_canonical_unit()
+        first_unit: Unit of the first aggregated item
+        single_unit: Whether all aggregated items used first_unit
     
-    return False
+    Returns:
+        (quantity, unit)
+    """
+    first_unit = first_unit.lower().strip()
+    _, factor = to_canonical_unit(first_unit)
+    if single_unit:
+        return canonical_quantity / factor, first_unit
+    
+    system = 'metric' if first_unit in _METRIC_UNITS else 'us'
+    ladder = _DISPLAY_LADDERS.get((canonical_unit, system))
+    if ladder:
+        singular, plural, size = ladder[0]
+        for candidate in ladder:
+            if canonical_quantity >= candidate[2]:
+                singular, plural, size = candidate
+        quantity = canonical_quantity / size
+        return quantity, (plural if quantity > 1 else singular)
+    if canonical_unit == 'count':
+        return canonical_quantity, ''
+    return canonical_quantity / factor, first_unit
+
 
+def can_aggregate(item1: ParsedIngredient, item2: ParsedIngredient) -> bool:
+    """Check if two ingredient items can be aggregated (same name and canonical unit)."""
+    return (canonical_ingredient_name(item1.name) == canonical_ingredient_name(item2.name)
+            and to_canonical_unit(item1.unit)[0] == to_canonical_unit(item2.unit)[0])
 
-def aggregate_ingredients(ingredients: List[Dict]) -> List[Dict]:
+
+def aggregate_ingredients(ingredients: List[ParsedIngredient]) -> List[Dict]:
     """
     Aggregate identical ingredients by combining quantities.
     
+    A single pass groups items by (canonical name, canonical unit), summing
+    their quantities converted to the canonical unit; each group is then
+    rendered with display_quantity(). Cost is linear in the number of items.
+    
     Args:
-        ingredients: List of parsed ingredient dicts
+        ingredients: List of ParsedIngredient (None entries are skipped)
         
     Returns:
-        List of aggregated ingredient dicts
+        List of aggregated ingredient dicts (fields of the first item of
+        each group, with the total quantity, display unit and category)
     """
-    aggregated = {}
+    groups = {}
     
     for ing in ingredients:
         if not ing:
             continue
         
-        # Create a key for aggregation (lowercase name + unit type)
-        _, unit_type = normalize_unit(ing['unit'])
-        key = f"{ing['name'].lower()}_{unit_type}"
-        
-        if key in aggregated:
-            # Check if we can aggregate
-            if can_aggregate(aggregated[key], ing):
-                # Try to convert to common unit
-                unit1 = ing['unit'].lower()
-                unit2 = aggregated[key]['unit'].lower()
-                
-                if unit1 in UNIT_CONVERSIONS and unit2 in UNIT_CONVERSIONS:
-                    # Convert both to base unit and add
-                    base1 = ing['quantity'] * UNIT_CONVERSIONS[unit1]
-                    base2 = aggregated[key]['quantity'] * UNIT_CONVERSIONS[unit2]
-                    total_base = base1 + base2
-                    
-                    # Use the more common unit (the one already aggregated)
-                    aggregated[key]['quantity'] = total_base / UNIT_CONVERSIONS[unit2]
-                else:
-                    # Can't convert, just add quantities with note
-                    aggregated[key]['quantity'] += ing['quantity']
-        else:
-            # First occurrence of this ingredient
-            aggregated[key] = ing.copy()
-            aggregated[key]['category'] = categorize_ingredient(ing['name_for_category'])
-    
-    return list(aggregated.values())
+        canonical_unit, factor = to_canonical_unit(ing.unit)
+        key = (canonical_ingredient_name(ing.name), canonical_unit)
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = {'first': ing, 'total': 0.0, 'single_unit': True}
+        elif ing.unit.lower() != group['first'].unit.lower():
+            group['single_unit'] = False
+        group['total'] += ing.quantity * factor
+    
+    aggregated = []
+    for (_, canonical_unit), group in groups.items():
+        first = group['first']
+        quantity, unit = display_quantity(group['total'], canonical_unit,
+                                          first.unit, group['single_unit'])
+        item = first._replace(quantity=quantity, unit=unit).to_dict()
+        item['category'] = categorize_ingredient(first.name_for_category)
+        aggregated.append(item)
+    
+    return aggregated
 
 
 def format_quantity(quantity: float) -> str:
@@ -389,45 +593,17 @@ def format_quantity(quantity: float) -> str:
     return f"{quantity:.2f}".rstrip('0').rstrip('.')
 
 
-# Unit to grams conversion (approximate) - for calorie calculations
-UNIT_TO_GRAMS = {
-    # Volume
-    'cup': 240, 'cups': 240, 'c': 240,
-    'tablespoon': 15, 'tablespoons': 15, 'tbsp': 15, 'tb': 15,
-    'teaspoon': 5, 'teaspoons': 5, 'tsp': 5, 't': 5,
-    'fluid ounce': 30, 'fluid ounces': 30, 'fl oz': 30, 'floz': 30,
-    'pint': 480, 'pints': 480, 'pt': 480,
-    'quart': 960, 'quarts': 960, 'qt': 960,
-    'gallon': 3840, 'gallons': 3840, 'gal': 3840,
-    'liter': 1000, 'liters': 1000, 'l': 1000,
-    'milliliter': 1, 'milliliters': 1, 'ml': 1,
-    
-    # Weight
-    'pound': 454, 'pounds': 454, 'lb': 454, 'lbs': 454,
-    'ounce': 28, 'ounces': 28, 'oz': 28,
-    'gram': 1, 'grams': 1, 'g': 1,
-    'kilogram': 1000, 'kilograms': 1000, 'kg': 1000,
-    
-    # Count (approximate estimates)
-    'piece': 50, 'pieces': 50, 'pc': 50,
-    'whole': 100, 'item': 50, 'items': 50,
-    'clove': 5, 'cloves': 5,
-    'slice': 30, 'slices': 30,
-    'can': 400, 'cans': 400,
-    'package': 250, 'packages': 250, 'pkg': 250,
-    'bunch': 100, 'bunches': 100,
-    
-    # Size descriptors
-    'small': 50, 'medium': 100, 'large': 150, 'extra-large': 200, 'xl': 200
-}
+# Largest gram estimate; direct weights above it (e.g. "99999999999 g") are
+# capped so estimates always fit recipe_ingredients.grams (an INTEGER column)
+MAX_ESTIMATED_GRAMS = 2**31 - 1
 
 
-def estimate_grams(parsed_ingredient: Dict) -> int:
+def estimate_grams(parsed_ingredient: Optional[ParsedIngredient]) -> int:
     """
     Estimate grams for a parsed ingredient (useful for calorie calculations).
     
     Args:
-        parsed_ingredient: Dict from parse_ingredient()
+        parsed_ingredient: ParsedIngredient from parse_ingredient()
         
     Returns:
         Estimated grams as integer
@@ -435,18 +611,18 @@ def estimate_grams(parsed_ingredient: Dict) -> int:
     if not parsed_ingredient:
         return 100  # Default
     
-    quantity = parsed_ingredient.get('quantity', 1.0)
-    unit = parsed_ingredient.get('unit', '').lower()
+    quantity = parsed_ingredient.quantity
+    unit = parsed_ingredient.unit.lower()
     
-    # Direct weight units - easy conversion
+    # Direct weight units - easy conversion (only capped to MAX_ESTIMATED_GRAMS)
     if unit in ['g', 'gram', 'grams']:
-        return int(quantity)
+        return int(min(quantity, MAX_ESTIMATED_GRAMS))
     if unit in ['kg', 'kilogram', 'kilograms']:
-        return int(quantity * 1000)
+        return int(min(quantity * 1000, MAX_ESTIMATED_GRAMS))
     if unit in ['oz', 'ounce', 'ounces']:
-        return int(quantity * 28)
+        return int(min(quantity * 28, MAX_ESTIMATED_GRAMS))
     if unit in ['lb', 'lbs', 'pound', 'pounds']:
-        return int(quantity * 454)
+        return int(min(quantity * 454, MAX_ESTIMATED_GRAMS))
     
     # Get unit multiplier
     if unit and unit in UNIT_TO_GRAMS:
@@ -464,12 +640,19 @@ def estimate_grams(parsed_ingredient: Dict) -> int:
     return int(grams)
 
 
-def extract_food_name(parsed_ingredient: Dict) -> str:
+_FOOD_NAME_DESCRIPTOR_PATTERN = re.compile(
+    r'\b(fresh|dried|frozen|canned|chopped|diced|minced|sliced|grated|shredded|organic|raw|cooked)\b'
+)
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def extract_food_name(parsed_ingredient: Optional[ParsedIngredient]) -> str:
     """
     Extract clean food name for API lookups (e.g., USDA FoodData).
     
     Args:
-        parsed_ingredient: Dict from parse_ingredient()
+        parsed_ingredient: ParsedIngredient from parse_ingredient()
         
     Returns:
         Clean food name string
@@ -477,10 +660,126 @@ def extract_food_name(parsed_ingredient: Dict) -> str:
     if not parsed_ingredient:
         return ''
     
-    name = parsed_ingredient.get('name_for_category', parsed_ingredient.get('name', ''))
-    
+    return _clean_food_name(parsed_ingredient.name_for_category)
+
+
+@lru_cache(maxsize=Config.INGREDIENT_CACHE_SIZE)
+def _clean_food_name(name: str) -> str:
+    """Strip preparation descriptors and extra whitespace from a food name."""
     # Additional cleaning for API lookups
-    name = re.sub(r'\b(fresh|dried|frozen|canned|chopped|diced|minced|sliced|grated|shredded|organic|raw|cooked)\b', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = _FOOD_NAME_DESCRIPTOR_PATTERN.sub('', name)
+    name = _WHITESPACE_PATTERN.sub(' ', name).strip()
     
     return name
+
+
+# Unit codes for columnar results: index in this tuple (0 = no unit)
+UNIT_CODES = ('',) + tuple(dict.fromkeys(ALL_UNITS))
+_UNIT_CODE_INDEX = {unit: code for code, unit in enumerate(UNIT_CODES)}
+
+# Maximum number of lines accepted by parse_ingredients_batch()
+MAX_BATCH_LINES = Config.PARSE_BATCH_MAX_LINES
+
+# Weight units estimate_grams() converts exactly (no 5g-2000g cap)
+_DIRECT_WEIGHT_GRAMS = {
+    'g': 1, 'gram': 1, 'grams': 1, 'kg': 1000, 'kilogram': 1000, 'kilograms': 1000,
+    'oz': 28, 'ounce': 28, 'ounces': 28, 'lb': 454, 'lbs': 454, 'pound': 454, 'pounds': 454
+}
+
+# Per unit code: grams per unit for direct weights ...
+_DIRECT_GRAMS = np.array([_DIRECT_WEIGHT_GRAMS.get(unit, np.nan) for unit in UNIT_CODES])
+# ... and approximate grams per unit for everything else (capped)
+_UNIT_GRAMS = np.array([UNIT_TO_GRAMS.get(unit, np.nan) if unit else np.nan for unit in UNIT_CODES])
+
+
+def estimate_grams_array(quantities: np.ndarray, unit_codes: np.ndarray) -> np.ndarray:
+    """
+    Vectorized estimate_grams() over columns of quantities and unit codes.
+    
+    Returns:
+        int64 array of gram estimates, equal element-wise to estimate_grams()
+        (direct weights are capped to MAX_ESTIMATED_GRAMS before the cast, so
+        huge quantities cannot wrap around)
+    """
+    direct = _DIRECT_GRAMS[unit_codes]
+    per_unit = _UNIT_GRAMS[unit_codes]
+    # Products that overflow to inf are capped below
+    with np.errstate(over='ignore'):
+        no_unit = np.where((quantities > 0) & (quantities != 1), quantities * 100, 100.0)
+        estimated = np.clip(np.where(np.isnan(per_unit), no_unit, quantities * per_unit), 5, 2000)
+        grams = np.where(np.isnan(direct), estimated, np.minimum(quantities * direct, MAX_ESTIMATED_GRAMS))
+    return np.trunc(grams).astype(np.int64)
+
+
+def parse_ingredients_batch(lines: List[str], scale=1.0) -> Dict[str, any]:
+    """
+    Parse many ingredient lines into columnar results.
+    
+    Lines are parsed with the memoized parse_ingredient(); serving scaling
+    and gram estimation then run over whole NumPy columns.
+    
+    Args:
+        lines: Ingredient lines (at most MAX_BATCH_LINES)
+        scale: Factor applied to every quantity - a number, or one factor per
+            input line (e.g. planned servings / recipe servings)
+    
+    Returns:
+        dict of equally long columns, one entry per parsed line (blank and
+        unparseable lines, and lines whose scaled quantity overflows, are
+        skipped):
+            index: int64 array - position of the line in ``lines``
+            quantity: float64 array - scaled quantity
+            unit_code: int16 array - index into UNIT_CODES
+            grams: int64 array - estimate_grams() of the scaled quantity
+            original, name, food_name: lists of str
+    
+    Raises:
+        ValueError: If there are more than MAX_BATCH_LINES lines, or the
+            number of scale factors does not match the number of lines
+    """
+    if len(lines) > MAX_BATCH_LINES:
+        raise ValueError(f'At most {MAX_BATCH_LINES} lines can be parsed per batch')
+    scale = np.asarray(scale, dtype=np.float64)
+    if scale.ndim and scale.shape != (len(lines),):
+        raise ValueError('scale must be a number or have one factor per line')
+    
+    index, quantities, unit_codes = [], [], []
+    original, names, food_names = [], [], []
+    for position, line in enumerate(lines):
+        try:
+            parsed = parse_ingredient(line)
+        except (ValueError, ZeroDivisionError):
+            continue
+        if not parsed:
+            continue
+        index.append(position)
+        quantities.append(parsed.quantity)
+        unit_codes.append(_UNIT_CODE_INDEX.get(parsed.unit, 0))
+        original.append(parsed.original)
+        names.append(parsed.name)
+        food_names.append(extract_food_name(parsed))
+    
+    index = np.array(index, dtype=np.int64)
+    with np.errstate(over='ignore'):
+        quantities = np.array(quantities, dtype=np.float64) * (scale[index] if scale.ndim else scale)
+    unit_codes = np.array(unit_codes, dtype=np.int16)
+    
+    # Quantities too large for a float (parsed or after scaling) are not
+    # representable in JSON; skip those lines like unparseable ones
+    finite = np.isfinite(quantities)
+    if not finite.all():
+        index, quantities, unit_codes = index[finite], quantities[finite], unit_codes[finite]
+        keep = finite.tolist()
+        original, names, food_names = (
+            [value for value, kept in zip(column, keep) if kept]
+            for column in (original, names, food_names))
+    
+    return {
+        'index': index,
+        'quantity': quantities,
+        'unit_code': unit_codes,
+        'grams': estimate_grams_array(quantities, unit_codes),
+        'original': original,
+        'name': names,
+        'food_name': food_names
+    }
@@ -0,0 +1,718 @@
+"""
+Meal Slots - Planned meals from the weekly calendar.
+
+The calendar UI stores one JSONB document per user-week in
+weekly_calendar_data, keyed by "<dayIndex>-<mealType>" (dayIndex
+0=Sunday ... 6=Saturday). Each slot holds either a list of meals or, in
+the old format, a single meal object:
+    {"3-dinner": [{"recipeId": 12, "recipeName": "...", "servings": 1.5}]}
+
+Every write to a week's document is mirrored into the normalized
+meal_slots table (one row per planned meal), and all read paths query
+that table by (user_id, date) instead of parsing JSON in Python.
+
+Planned kcal and macros per user and day are rolled up into
+daily_nutrition, refreshed for the touched days whenever meal_slots or a
+planned recipe's nutrition changes, so day-range views read one row per
+day.
+
+This module handles:
+    - Week start / day index arithmetic (Sunday-based weeks)
+    - Syncing meal_slots from the calendar documents (dual-write, backfill)
+    - Maintaining the daily_nutrition rollup
+    - Atomic in-place edits of a single slot (remove a meal, set servings)
+    - Batched slot operations for PATCH requests (add, remove, set servings, move)
+    - Fetching planned meals joined to their recipes and nutrition
+    - Fetching many recipes in a single query
+    - Planned calories and macros per day (from the rollup)
+"""
+
+import re
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.extras import Json
+
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
+
+# Columns fetched for planned meals' recipes unless the caller asks for others
+DEFAULT_RECIPE_COLUMNS = ('id', 'title', 'calories_per_serving', 'image_url')
+
+DEFAULT_RECIPE_IMAGE = '/static/images/default-recipe.svg'
+
+
+def get_day_index(day: date) -> int:
+    """Convert a date to the calendar's day index (0=Sunday, 6=Saturday)."""
+    # Python weekday(): 0=Monday, 6=Sunday
+    return (day.weekday() + 1) % 7
+
+
+def get_week_start(day: date) -> date:
+    """Get the Sunday that starts the calendar week containing ``day``."""
+    return day - timedelta(days=get_day_index(day))
+
+
+def get_week_slot(day: date, meal_type: str) -> Tuple[date, str]:
+    """
+    Resolve a date and meal type to its calendar week and slot key.
+
+    Returns:
+        Tuple of (week_start, slot_key), e.g. (date(2024, 3, 3), "2-dinner")
+    """
+    return get_week_start(day), f"{get_day_index(day)}-{meal_type}"
+
+
+def _to_date(value) -> date:
+    """Normalize a date or ISO date string to a date."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _to_recipe_id(value) -> Optional[int]:
+    """Normalize a recipe ID to an int (or None)."""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+# ==================== SYNC FROM CALENDAR DOCUMENTS ====================
+
+# Expands weekly_calendar_data.meals into one row per planned meal.
+# Old single-object slots are wrapped in an array; malformed slot keys,
+# recipe IDs and servings are skipped (or defaulted) rather than failing
+# the cast, and meals whose recipe no longer exists are dropped.
+_EXPAND_MEALS_SQL = r'''
+    SELECT w.user_id,
+           w.week_start_date + split_part(slot.key, '-', 1)::int AS date,
+           split_part(slot.key, '-', 2) AS meal_type,
+           (meal.ordinality - 1)::int AS position,
+           r.id AS recipe_id,
+           CASE WHEN meal.value->>'servings' ~ '^\d{1,4}(\.\d+)?$'
+                THEN (meal.value->>'servings')::numeric ELSE 1 END AS servings
+    FROM weekly_calendar_data w
+    CROSS JOIN LATERAL jsonb_each(w.meals) AS slot
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE jsonb_typeof(slot.value)
+            WHEN 'array' THEN slot.value
+            WHEN 'object' THEN jsonb_build_array(slot.value)
+            ELSE '[]'::jsonb
+        END
+    ) WITH ORDINALITY AS meal(value, ordinality)
+    JOIN recipes r ON r.id = CASE WHEN meal.value->>'recipeId' ~ '^\d{1,9}$'
+                                  THEN (meal.value->>'recipeId')::int END
+    WHERE slot.key ~ '^[0-6]-(breakfast|lunch|dinner|snack)$'
+'''
+
+_INSERT_SLOTS_SQL = '''
+    INSERT INTO meal_slots (user_id, date, meal_type, position, recipe_id, servings)
+'''
+
+
+def sync_week_slots(cur, user_id: int, week_start) -> None:
+    """
+    Rebuild the meal_slots rows of one week from its calendar document.
+
+    Call this in the same transaction as every write to
+    weekly_calendar_data so both representations stay consistent.
+    """
+    sync_weeks_slots(cur, [(user_id, week_start)])
+
+
+def sync_weeks_slots(cur, weeks: Iterable[Tuple[int, date]]) -> None:
+    """
+    Rebuild the meal_slots rows of many weeks with two statements.
+
+    Args:
+        cur: Database cursor
+        weeks: (user_id, week_start) pairs
+    """
+    weeks = list(weeks)
+    if not weeks:
+        return
+    user_ids = [user_id for user_id, _ in weeks]
+    week_starts = [week_start for _, week_start in weeks]
+    cur.execute('''
+        DELETE FROM meal_slots s
+        USING unnest(%s::int[], %s::date[]) AS wk(user_id, week_start)
+        WHERE s.user_id = wk.user_id
+          AND s.date BETWEEN wk.week_start AND wk.week_start + 6
+    ''', (user_ids, week_starts))
+    cur.execute(_INSERT_SLOTS_SQL + _EXPAND_MEALS_SQL + '''
+        AND (w.user_id, w.week_start_date) IN (
+            SELECT * FROM unnest(%s::int[], %s::date[])
+        )
+        ON CONFLICT (user_id, date, meal_type, position) DO NOTHING
+    ''', (user_ids, week_starts))
+    refresh_daily_nutrition(cur, [(user_id, _to_date(week_start) + timedelta(days=day))
+                                  for user_id, week_start in weeks for day in range(7)])
+
+
+def backfill_meal_slots(cur) -> int:
+    """
+    Rebuild the whole meal_slots table (and daily_nutrition) from weekly_calendar_data.
+
+    Returns:
+        Number of meal rows written
+    """
+    cur.execute('TRUNCATE meal_slots')
+    cur.execute(_INSERT_SLOTS_SQL + _EXPAND_MEALS_SQL + '''
+        ON CONFLICT (user_id, date, meal_type, position) DO NOTHING
+    ''')
+    rows = cur.rowcount
+    backfill_daily_nutrition(cur)
+    return rows
+
+
+# ==================== DAILY NUTRITION ROLLUP ====================
+
+# Per-serving nutrition of recipe r from its precomputed recipe_nutrition
+# row n (LEFT JOINed); recipes without one fall back to calories_per_serving
+NUTRITION_SELECT_SQL = '''
+    COALESCE(n.kcal_per_serving, r.calories_per_serving, 0)::float AS nutrition_kcal,
+    COALESCE(n.protein_per_serving, 0)::float AS nutrition_protein,
+    COALESCE(n.carbs_per_serving, 0)::float AS nutrition_carbs,
+    COALESCE(n.fat_per_serving, 0)::float AS nutrition_fat
+'''
+
+NUTRIENTS = ('kcal', 'protein', 'carbs', 'fat')
+
+# Rolls meal_slots rows s (joined by the caller) up into daily_nutrition rows
+_INSERT_DAILY_NUTRITION_SQL = f'''
+    INSERT INTO daily_nutrition (user_id, day, kcal, protein, carbs, fat, meal_count)
+    SELECT user_id, day, SUM(nutrition_kcal * servings), SUM(nutrition_protein * servings),
+           SUM(nutrition_carbs * servings), SUM(nutrition_fat * servings), COUNT(*)
+    FROM (
+        SELECT s.user_id, s.date AS day, s.servings::float AS servings, {NUTRITION_SELECT_SQL}
+        FROM meal_slots s
+        JOIN recipes r ON r.id = s.recipe_id
+        LEFT JOIN recipe_nutrition n ON n.recipe_id = s.recipe_id
+        {{where}}
+    ) planned
+    GROUP BY user_id, day
+'''
+
+
+def refresh_daily_nutrition(cur, days: Iterable[Tuple[int, date]]) -> None:
+    """
+    Recompute the daily_nutrition rows of the given days from meal_slots.
+
+    Days without planned meals lose their row. Call this in the same
+    transaction as the meal_slots or recipe_nutrition change.
+
+    Args:
+        cur: Database cursor
+        days: (user_id, date) pairs to refresh
+    """
+    days = list(set(days))
+    if not days:
+        return
+    params = ([user_id for user_id, _ in days], [day for _, day in days])
+    cur.execute('''
+        DELETE FROM daily_nutrition d
+        USING unnest(%s::int[], %s::date[]) AS t(user_id, day)
+        WHERE d.user_id = t.user_id AND d.day = t.day
+    ''', params)
+    cur.execute(_INSERT_DAILY_NUTRITION_SQL.format(where='''
+        JOIN unnest(%s::int[], %s::date[]) AS t(user_id, day)
+          ON s.user_id = t.user_id AND s.date = t.day
+    '''), params)
+
+
+def fetch_recipe_days(cur, recipe_ids: Iterable[int]) -> List[Tuple[int, date]]:
+    """
+    Get the (user_id, date) pairs on which any of the recipes is planned.
+
+    Collect these before deleting recipes (their meal_slots rows cascade
+    away) and refresh them afterwards.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    cur.execute('''
+        SELECT DISTINCT user_id, date FROM meal_slots WHERE recipe_id = ANY(%s)
+    ''', (recipe_ids,))
+    return [(row['user_id'], row['date']) for row in cur.fetchall()]
+
+
+def refresh_recipe_days(cur, recipe_ids: Iterable[int]) -> None:
+    """Refresh daily_nutrition for every day the recipes are planned (after a nutrition change)."""
+    refresh_daily_nutrition(cur, fetch_recipe_days(cur, recipe_ids))
+
+
+def backfill_daily_nutrition(cur) -> int:
+    """
+    Rebuild the whole daily_nutrition table from meal_slots.
+
+    Returns:
+        Number of days written
+    """
+    cur.execute('TRUNCATE daily_nutrition')
+    cur.execute(_INSERT_DAILY_NUTRITION_SQL.format(where=''))
+    return cur.rowcount
+
+
+# ==================== SLOT EDITS ====================
+
+# Meals of one slot of the row being updated, with their array ordinality.
+# Old single-object slots are treated as a one-element array.
+# Expects a %(slot)s parameter.
+_SLOT_MEALS_SQL = '''
+    jsonb_array_elements(
+        CASE jsonb_typeof(meals->%(slot)s)
+            WHEN 'array' THEN meals->%(slot)s
+            WHEN 'object' THEN jsonb_build_array(meals->%(slot)s)
+            ELSE '[]'::jsonb
+        END
+    ) WITH ORDINALITY AS meal(value, ordinality)
+'''
+
+
+def remove_meal_from_slot(cur, user_id: int, day: date, meal_type: str, recipe_id) -> bool:
+    """
+    Remove every occurrence of a recipe from one calendar slot.
+
+    The week row is found with a point lookup on (user_id, week_start_date)
+    and edited in a single UPDATE, so concurrent edits to other slots of
+    the same week are not lost. A slot left empty is deleted from the
+    document.
+
+    Args:
+        cur: Database cursor
+        user_id: Owner of the calendar
+        day: Date of the slot
+        meal_type: breakfast, lunch, dinner or snack
+        recipe_id: Recipe to remove (compared as stored in the JSON)
+
+    Returns:
+        True if anything was removed
+    """
+    week_start, slot_key = get_week_slot(day, meal_type)
+    params = {'user_id': user_id, 'week_start': week_start,
+              'slot': slot_key, 'recipe': Json(recipe_id)}
+    cur.execute(f'''
+        UPDATE weekly_calendar_data
+        SET meals = COALESCE(
+                jsonb_set(meals, ARRAY[%(slot)s], (
+                    SELECT jsonb_agg(meal.value ORDER BY meal.ordinality)
+                    FROM {_SLOT_MEALS_SQL}
+                    WHERE meal.value->'recipeId' IS DISTINCT FROM %(recipe)s::jsonb
+                )),
+                meals - %(slot)s
+            ),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = %(user_id)s AND week_start_date = %(week_start)s
+          AND jsonb_typeof(meals->%(slot)s) = 'array'
+          AND EXISTS (
+              SELECT 1 FROM {_SLOT_MEALS_SQL}
+              WHERE meal.value->'recipeId' = %(recipe)s::jsonb
+          )
+    ''', params)
+    if cur.rowcount == 0:
+        return False
+    sync_week_slots(cur, user_id, week_start)
+    return True
+
+
+def set_meal_servings(cur, user_id: int, day: date, meal_type: str, recipe_id, servings: float) -> bool:
+    """
+    Set the servings of the first occurrence of a recipe in a calendar slot.
+
+    Only the ``servings`` path of that one meal is rewritten (jsonb_set),
+    in a single UPDATE on the week row.
+
+    Returns:
+        True if the recipe was found in the slot and updated
+    """
+    week_start, slot_key = get_week_slot(day, meal_type)
+    params = {'user_id': user_id, 'week_start': week_start, 'slot': slot_key,
+              'recipe': Json(recipe_id), 'servings': Json(servings)}
+    cur.execute(f'''
+        UPDATE weekly_calendar_data
+        SET meals = jsonb_set(meals, (
+                SELECT CASE jsonb_typeof(meals->%(slot)s)
+                           WHEN 'array' THEN ARRAY[%(slot)s, (MIN(meal.ordinality) - 1)::text, 'servings']
+                           ELSE ARRAY[%(slot)s, 'servings']
+                       END
+                FROM {_SLOT_MEALS_SQL}
+                WHERE meal.value->'recipeId' = %(recipe)s::jsonb
+            ), %(servings)s::jsonb),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE user_id = %(user_id)s AND week_start_date = %(week_start)s
+          AND EXISTS (
+              SELECT 1 FROM {_SLOT_MEALS_SQL}
+              WHERE meal.value->'recipeId' = %(recipe)s::jsonb
+          )
+    ''', params)
+    if cur.rowcount == 0:
+        return False
+    sync_week_slots(cur, user_id, week_start)
+    return True
+
+
+# ==================== SLOT OPERATIONS (PATCH) ====================
+
+SLOT_OPERATIONS = ('add', 'remove', 'set_servings', 'move')
+
+# Upper bound on operations applied in one PATCH statement
+MAX_SLOT_OPERATIONS = 50
+
+_SLOT_KEY_PATTERN = re.compile(r'^[0-6]-(breakfast|lunch|dinner|snack)$')
+
+# SQL templates for one step of the operation chain. {m} is the document
+# produced by the previous step; the other fields are named parameters.
+_SLOT_ARRAY_SQL = '''CASE jsonb_typeof({m}->{slot})
+            WHEN 'array' THEN {m}->{slot}
+            WHEN 'object' THEN jsonb_build_array({m}->{slot})
+            ELSE '[]'::jsonb
+        END'''
+
+# Ordinality of the first meal in a slot with the given recipeId
+_FIRST_MATCH_SQL = '''(
+        SELECT MIN(hit.ordinality)
+        FROM jsonb_array_elements(''' + _SLOT_ARRAY_SQL + ''') WITH ORDINALITY AS hit(value, ordinality)
+        WHERE hit.value->'recipeId' = {recipe}::jsonb
+    )'''
+
+_MAP_SLOT_SQL = '''(
+        SELECT jsonb_agg({value} ORDER BY meal.ordinality)
+        FROM jsonb_array_elements(''' + _SLOT_ARRAY_SQL + ''') WITH ORDINALITY AS meal(value, ordinality)
+        {where}
+    )'''
+
+
+def _validate_slot_key(value) -> str:
+    if not isinstance(value, str) or not _SLOT_KEY_PATTERN.match(value):
+        raise ValueError(f'Invalid slot key: {value!r}')
+    return value
+
+
+def _validate_recipe_id(value):
+    if value is None or isinstance(value, (dict, list, bool)):
+        raise ValueError('recipe_id is required')
+    return value
+
+
+def _validate_servings(value) -> float:
+    try:
+        servings = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid servings: {value!r}')
+    if not 0 < servings <= 1000:
+        raise ValueError(f'Invalid servings: {value!r}')
+    return servings
+
+
+def parse_slot_operations(operations) -> List[Dict]:
+    """
+    Validate the operations of a calendar PATCH request.
+
+    Supported operations (meals are identified by recipe_id; when a slot
+    holds the same recipe more than once the first one is used):
+        {"op": "add", "slot": "2-dinner", "meal": {"recipeId": 12, ...}}
+        {"op": "remove", "slot": "2-dinner", "recipe_id": 12}
+        {"op": "set_servings", "slot": "2-dinner", "recipe_id": 12, "servings": 1.5}
+        {"op": "move", "from_slot": "2-dinner", "to_slot": "3-lunch", "recipe_id": 12}
+
+    Raises:
+        ValueError: If the list or any operation is malformed
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_SLOT_OPERATIONS:
+        raise ValueError(f'At most {MAX_SLOT_OPERATIONS} operations per request')
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in SLOT_OPERATIONS:
+            raise ValueError(f'Unknown operation: {operation!r}')
+        op = operation['op']
+        if op == 'add':
+            meal = operation.get('meal')
+            if not isinstance(meal, dict):
+                raise ValueError('add requires a meal object')
+            _validate_recipe_id(meal.get('recipeId'))
+            parsed.append({'op': op, 'slot': _validate_slot_key(operation.get('slot')), 'meal': meal})
+        elif op == 'move':
+            parsed.append({
+                'op': op,
+                'from_slot': _validate_slot_key(operation.get('from_slot')),
+                'to_slot': _validate_slot_key(operation.get('to_slot')),
+                'recipe_id': _validate_recipe_id(operation.get('recipe_id'))
+            })
+        else:
+            step = {
+                'op': op,
+                'slot': _validate_slot_key(operation.get('slot')),
+                'recipe_id': _validate_recipe_id(operation.get('recipe_id'))
+            }
+            if op == 'set_servings':
+                step['servings'] = _validate_servings(operation.get('servings'))
+            parsed.append(step)
+    return parsed
+
+
+def _remove_first_sql(m: str, slot: str, recipe: str) -> str:
+    """Document ``m`` without the first meal matching ``recipe`` in ``slot``."""
+    first = _FIRST_MATCH_SQL.format(m=m, slot=slot, recipe=recipe)
+    kept = _MAP_SLOT_SQL.format(m=m, slot=slot, value='meal.value',
+                                where=f'WHERE meal.ordinality IS DISTINCT FROM {first}')
+    # jsonb_set is strict: an emptied slot yields NULL and the key is dropped
+    return f'COALESCE(jsonb_set({m}, ARRAY[{slot}], {kept}), {m} - {slot})'
+
+
+def _slot_operation_steps(index: int, operation: Dict) -> Tuple[List[str], Dict]:
+    """
+    Build the SELECT list(s) of the CTE step(s) for one operation.
+
+    Each step selects from the previous one, whose document column is
+    ``m``. Returns the step expressions and their named parameters.
+    """
+    p = f'op{index}_'
+    params = {}
+    op = operation['op']
+
+    if op == 'add':
+        slot = f'%({p}slot)s'
+        params.update({f'{p}slot': operation['slot'], f'{p}meal': Json(operation['meal'])})
+        slot_array = _SLOT_ARRAY_SQL.format(m='m', slot=slot)
+        return [f'jsonb_set(m, ARRAY[{slot}], {slot_array} || jsonb_build_array(%({p}meal)s::jsonb)) AS m'], params
+
+    if op == 'remove':
+        slot, recipe = f'%({p}slot)s', f'%({p}recipe)s'
+        params.update({f'{p}slot': operation['slot'], f'{p}recipe': Json(operation['recipe_id'])})
+        return [f'{_remove_first_sql("m", slot, recipe)} AS m'], params
+
+    if op == 'set_servings':
+        slot, recipe = f'%({p}slot)s', f'%({p}recipe)s'
+        params.update({f'{p}slot': operation['slot'], f'{p}recipe': Json(operation['recipe_id']),
+                       f'{p}servings': Json(operation['servings'])})
+        first = _FIRST_MATCH_SQL.format(m='m', slot=slot, recipe=recipe)
+        updated = _MAP_SLOT_SQL.format(
+            m='m', slot=slot, where='',
+            value=f'''CASE WHEN meal.ordinality = {first}
+                           THEN meal.value || jsonb_build_object('servings', %({p}servings)s::jsonb)
+                           ELSE meal.value END''')
+        return [f'COALESCE(jsonb_set(m, ARRAY[{slot}], {updated}), m) AS m'], params
+
+    # move: take the meal out of the source slot, then append it to the target
+    source, target, recipe = f'%({p}from)s', f'%({p}to)s', f'%({p}recipe)s'
+    params.update({f'{p}from': operation['from_slot'], f'{p}to': operation['to_slot'],
+                   f'{p}recipe': Json(operation['recipe_id'])})
+    first = _FIRST_MATCH_SQL.format(m='m', slot=source, recipe=recipe)
+    moved = _MAP_SLOT_SQL.format(m='m', slot=source, value='meal.value',
+                                 where=f'WHERE meal.ordinality = {first}')
+    slot_array = _SLOT_ARRAY_SQL.format(m='m', slot=target)
+    return [
+        f'{_remove_first_sql("m", source, recipe)} AS m, {moved} AS moved',
+        f'CASE WHEN moved IS NULL THEN m ELSE jsonb_set(m, ARRAY[{target}], {slot_array} || moved) END AS m'
+    ], params
+
+
+def apply_slot_operations(cur, user_id: int, week_start, operations: List[Dict],
+                          expected_updated_at=None) -> Optional[Dict]:
+    """
+    Apply slot-level operations to a week's calendar document in one UPDATE.
+
+    The operations are chained as CTE steps over the locked row, so the
+    whole patch is atomic and only the touched slots change. When
+    ``expected_updated_at`` is given the patch only applies if the row
+    was not modified since (optimistic concurrency).
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        user_id: Owner of the calendar
+        week_start: Sunday of the week
+        operations: Operations returned by parse_slot_operations()
+        expected_updated_at: updated_at the client last saw, or None
+
+    Returns:
+        The updated row (week_start_date, updated_at), or None if the week
+        does not exist or was modified concurrently
+    """
+    params = {'user_id': user_id, 'week_start': week_start, 'expected': expected_updated_at}
+    steps = []
+    for index, operation in enumerate(operations):
+        op_steps, op_params = _slot_operation_steps(index, operation)
+        steps.extend(op_steps)
+        params.update(op_params)
+
+    ctes = [f'''step0 AS (
+            SELECT meals AS m FROM weekly_calendar_data
+            WHERE user_id = %(user_id)s AND week_start_date = %(week_start)s
+              AND (%(expected)s::timestamp IS NULL OR updated_at = %(expected)s::timestamp)
+            FOR UPDATE
+        )''']
+    for number, select in enumerate(steps, start=1):
+        # MATERIALIZED keeps each step a separate plan node; inlined, every
+        # step would repeat the previous one's expression several times
+        ctes.append(f'step{number} AS MATERIALIZED (SELECT {select} FROM step{number - 1})')
+
+    cur.execute(f'''
+        WITH {', '.join(ctes)}
+        UPDATE weekly_calendar_data
+        SET meals = step{len(steps)}.m, updated_at = CURRENT_TIMESTAMP
+        FROM step{len(steps)}
+        WHERE user_id = %(user_id)s AND week_start_date = %(week_start)s
+        RETURNING week_start_date, updated_at
+    ''', params)
+    row = cur.fetchone()
+    if row:
+        sync_week_slots(cur, user_id, week_start)
+    return row
+
+
+# ==================== READS ====================
+
+def fetch_planned_meals(cur, user_id: int, start_date: date, end_date: date,
+                        meal_types: Iterable[str] = MEAL_TYPES,
+                        columns: Iterable[str] = DEFAULT_RECIPE_COLUMNS) -> List[Dict]:
+    """
+    Fetch the meals planned between two dates (inclusive) with their recipes.
+
+    A single indexed range scan on meal_slots joined to recipes.
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        user_id: Owner of the calendar
+        start_date, end_date: Date range to fetch
+        meal_types: Meal types to include, in output order
+        columns: Recipe columns to load
+
+    Returns:
+        List of dicts with keys: date, day, meal_type, position, recipe_id,
+        servings, recipe, nutrition (kcal, protein, carbs, fat per serving)
+        - ordered by date, meal type and position.
+    """
+    meal_types = list(meal_types)
+    columns = list(dict.fromkeys(['id', *columns]))
+    recipe_columns = ', '.join(f'r.{column}' for column in columns)
+    cur.execute(f'''
+        SELECT s.date AS slot_date, s.meal_type AS slot_meal_type,
+               s.position AS slot_position, s.servings::float AS slot_servings,
+               {recipe_columns}, {NUTRITION_SELECT_SQL}
+        FROM meal_slots s
+        JOIN recipes r ON r.id = s.recipe_id
+        LEFT JOIN recipe_nutrition n ON n.recipe_id = s.recipe_id
+        WHERE s.user_id = %s AND s.date BETWEEN %s AND %s
+          AND s.meal_type = ANY(%s)
+        ORDER BY s.date, array_position(%s::varchar[], s.meal_type), s.position
+    ''', (user_id, start_date, end_date, meal_types, meal_types))
+
+    meals = []
+    for row in cur.fetchall():
+        meals.append({
+            'date': row['slot_date'],
+            'day': get_day_index(row['slot_date']),
+            'meal_type': row['slot_meal_type'],
+            'position': row['slot_position'],
+            'recipe_id': row['id'],
+            'servings': row['slot_servings'],
+            'recipe': {column: row[column] for column in columns},
+            'nutrition': {nutrient: row[f'nutrition_{nutrient}'] for nutrient in NUTRIENTS}
+        })
+    return meals
+
+
+def meal_calories(planned_meal: Dict) -> float:
+    """Calories for a planned meal (kcal per serving x planned servings)."""
+    return planned_meal['nutrition']['kcal'] * planned_meal['servings']
+
+
+def meal_nutrition(planned_meal: Dict) -> Dict[str, float]:
+    """kcal, protein, carbs and fat for a planned meal (per serving x planned servings)."""
+    return {nutrient: value * planned_meal['servings']
+            for nutrient, value in planned_meal['nutrition'].items()}
+
+
+def fetch_recipes_by_id(cur, recipe_ids: Iterable, columns: Iterable[str] = DEFAULT_RECIPE_COLUMNS) -> Dict[int, Dict]:
+    """
+    Fetch many recipes in one ``WHERE id = ANY(%s)`` query.
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        recipe_ids: Recipe IDs; duplicates and invalid values are ignored
+        columns: Recipe columns to select ('id' is always included)
+
+    Returns:
+        Dict mapping recipe id to its row
+    """
+    ids = sorted({rid for rid in map(_to_recipe_id, recipe_ids) if rid is not None})
+    if not ids:
+        return {}
+    columns = list(dict.fromkeys(['id', *columns]))
+    cur.execute(f'''
+        SELECT {', '.join(columns)}
+        FROM recipes
+        WHERE id = ANY(%s)
+    ''', (ids,))
+    return {row['id']: row for row in cur.fetchall()}
+
+
+# Planned calories and macros per date: one primary key range scan of
+# the daily_nutrition rollup.
+# Expects %(user_id)s, %(start)s and %(end)s parameters.
+DAILY_NUTRITION_SQL = '''
+    SELECT day, kcal AS calories, protein, carbs, fat, meal_count
+    FROM daily_nutrition
+    WHERE user_id = %(user_id)s
+      AND day BETWEEN %(start)s::date AND %(end)s::date
+'''
+
+
+def fetch_daily_nutrition(cur, user_id: int, start_date: date, end_date: date) -> Dict[date, Dict[str, float]]:
+    """
+    Planned kcal, protein, carbs and fat per date between two dates (inclusive).
+
+    Returns:
+        Dict mapping each date that has planned meals to a dict with keys
+        kcal, protein, carbs, fat, meal_count
+    """
+    cur.execute(DAILY_NUTRITION_SQL + ' ORDER BY day',
+                {'user_id': user_id, 'start': start_date, 'end': end_date})
+    return {row['day']: {'kcal': row['calories'], 'protein': row['protein'],
+                         'carbs': row['carbs'], 'fat': row['fat'],
+                         'meal_count': row['meal_count']}
+            for row in cur.fetchall()}
+
+
+def fetch_calorie_adherence(cur, user_id: int, end_date: date, days: int, calorie_limit: float) -> Dict:
+    """
+    Compute calorie budget adherence and the current streak in one query.
+
+    Each day in the window ``[end_date - days + 1, end_date]`` is generated
+    with generate_series and joined to the planned calories for that day,
+    so the cost does not grow with one query per day or per week.
+
+    A day counts as within budget when it has planned calories and they do
+    not exceed ``calorie_limit``.
+
+    Returns:
+        dict with keys: days_within_budget, current_streak (consecutive days
+        within budget ending at end_date), days_with_meals
+    """
+    start_date = end_date - timedelta(days=days - 1)
+    cur.execute(f'''
+        WITH daily AS ({DAILY_NUTRITION_SQL}),
+        window_days AS (
+            SELECT d::date AS day, COALESCE(daily.calories, 0) AS calories
+            FROM generate_series(%(start)s::date, %(end)s::date, interval '1 day') AS d
+            LEFT JOIN daily ON daily.day = d::date
+        ),
+        marked AS (
+            SELECT day, calories > 0 AS has_meals,
+                   calories > 0 AND calories <= %(limit)s AS within_budget
+            FROM window_days
+        )
+        SELECT COUNT(*) FILTER (WHERE within_budget) AS days_within_budget,
+               COUNT(*) FILTER (WHERE has_meals) AS days_with_meals,
+               COALESCE(%(end)s::date - MAX(day) FILTER (WHERE NOT within_budget), %(days)s) AS current_streak
+        FROM marked
+    ''', {'user_id': user_id, 'start': start_date, 'end': end_date,
+          'limit': calorie_limit, 'days': days})
+    row = cur.fetchone()
+    return {
+        'days_within_budget': row['days_within_budget'],
+        'current_streak': row['current_streak'],
+        'days_with_meals': row['days_with_meals']
+    }
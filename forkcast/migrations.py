@@ -0,0 +1,548 @@
+"""
+Schema Migrations - Versioned, deploy-time schema changes.
+
+The schema is defined by an ordered list of migrations. Each one is
+applied once, in its own transaction, by `flask migrate` and recorded in
+schema_migrations with a checksum of its SQL. Migrations that cannot run
+in a transaction (CREATE INDEX CONCURRENTLY, which builds an index
+without blocking writes to the table) are marked transactional=False:
+their statements run one by one in autocommit mode, so a failed run may
+leave part of them applied and must be re-runnable (IF NOT EXISTS). Request handlers never run
+DDL; instead create_app() verifies at startup that the database is at
+exactly the code's schema version and refuses to start otherwise.
+
+Migrations are append-only: never edit or reorder a migration that has
+been deployed (its checksum would no longer match) - add a new one.
+
+Migration 1 is the schema previously created by init_tables(). It only
+uses IF NOT EXISTS statements, so databases created before migrations
+existed adopt it without changes.
+
+Data migrations (backfills of derived tables) run a Python function with
+the migration's cursor after its SQL; the function's name is part of the
+checksum, its body is not, so it may evolve with the code it calls.
+
+This module handles:
+    - The ordered list of migrations
+    - Applying pending migrations (serialized with an advisory lock)
+    - Detecting schema drift (pending, unknown or modified migrations,
+      missing tables)
+"""
+
+import hashlib
+from typing import Callable, List, NamedTuple, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from .models import get_db_connection, get_db_cursor
+from .meal_slots import backfill_meal_slots
+from .recipe_ingredients import backfill_recipe_ingredients
+from .recipe_nutrition import backfill_recipe_nutrition
+
+
+class Migration(NamedTuple):
+    """A schema change, identified by its version."""
+    version: int
+    name: str
+    sql: str
+    run: Optional[Callable] = None  # Data migration step, called with the cursor after sql
+    transactional: bool = True  # False: run each statement of sql in autocommit mode (no run step)
+
+    @property
+    def checksum(self) -> str:
+        """SHA-256 of the migration's SQL (and the name of its data migration step)."""
+        source = self.sql
+        if self.run is not None:
+            source += f'\n-- run: {self.run.__module__}.{self.run.__qualname__}'
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class SchemaDriftError(RuntimeError):
+    """The database schema does not match the migrations of this code."""
+
+
+def _backfill_recipe_ingredients_and_nutrition(cur) -> None:
+    """Parse every recipe's ingredients, then compute its nutrition and the daily_nutrition rollup."""
+    backfill_recipe_ingredients(cur)
+    backfill_recipe_nutrition(cur)
+
+
+MIGRATIONS = [
+    Migration(1, 'baseline schema', '''
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(50) UNIQUE NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            full_name VARCHAR(100),
+            bio TEXT,
+            profile_image VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_image VARCHAR(255);
+
+        CREATE TABLE IF NOT EXISTS recipes (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            title VARCHAR(200) NOT NULL,
+            description TEXT,
+            ingredients TEXT NOT NULL,
+            instructions TEXT NOT NULL,
+            prep_time INTEGER,
+            cook_time INTEGER,
+            servings INTEGER,
+            calories_per_serving INTEGER,
+            category VARCHAR(50),
+            cuisine VARCHAR(50),
+            difficulty VARCHAR(20),
+            tags VARCHAR(500),
+            image_url VARCHAR(255),
+            is_public BOOLEAN DEFAULT true,
+            is_favorite BOOLEAN DEFAULT false,
+            forked_from_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
+            original_author_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE recipes
+            ADD COLUMN IF NOT EXISTS forked_from_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
+            ADD COLUMN IF NOT EXISTS original_author_id INTEGER REFERENCES users(id) ON DELETE SET NULL;
+
+        CREATE TABLE IF NOT EXISTS recipe_ratings (
+            id SERIAL PRIMARY KEY,
+            recipe_id INTEGER REFERENCES recipes(id) ON DELETE CASCADE,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            rating INTEGER CHECK (rating >= 1 AND rating <= 5),
+            review TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(recipe_id, user_id)
+        );
+
+        -- Saved meal plan templates
+        CREATE TABLE IF NOT EXISTS meal_plans (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            name VARCHAR(200) NOT NULL,
+            description TEXT,
+            week_start_date DATE,
+            meals JSONB NOT NULL DEFAULT '{}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Parsed lines of recipes.ingredients, rewritten whenever a recipe
+        -- is created, updated or forked
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            quantity DOUBLE PRECISION NOT NULL,
+            unit VARCHAR(20) NOT NULL DEFAULT '',
+            canonical_unit VARCHAR(20) NOT NULL DEFAULT '',
+            canonical_quantity DOUBLE PRECISION NOT NULL,
+            name TEXT NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            grams INTEGER NOT NULL,
+            PRIMARY KEY (recipe_id, position)
+        );
+
+        -- Nutrition facts computed from recipe_ingredients whenever a
+        -- recipe is created, updated or forked
+        CREATE TABLE IF NOT EXISTS recipe_nutrition (
+            recipe_id INTEGER PRIMARY KEY REFERENCES recipes(id) ON DELETE CASCADE,
+            kcal_per_serving DOUBLE PRECISION NOT NULL,
+            protein_per_serving DOUBLE PRECISION NOT NULL,
+            carbs_per_serving DOUBLE PRECISION NOT NULL,
+            fat_per_serving DOUBLE PRECISION NOT NULL,
+            kcal_per_100g DOUBLE PRECISION,
+            protein_per_100g DOUBLE PRECISION,
+            carbs_per_100g DOUBLE PRECISION,
+            fat_per_100g DOUBLE PRECISION,
+            total_grams INTEGER NOT NULL DEFAULT 0,
+            matched_grams INTEGER NOT NULL DEFAULT 0,
+            source VARCHAR(20) NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Auto-saved calendar meals, one document per user-week
+        CREATE TABLE IF NOT EXISTS weekly_calendar_data (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            week_start_date DATE NOT NULL,
+            meals JSONB NOT NULL DEFAULT '{}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, week_start_date)
+        );
+
+        -- Normalized copy of weekly_calendar_data.meals (one row per
+        -- planned meal), kept in sync on every calendar write
+        CREATE TABLE IF NOT EXISTS meal_slots (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            date DATE NOT NULL,
+            meal_type VARCHAR(20) NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+            servings NUMERIC(6,2) NOT NULL DEFAULT 1,
+            UNIQUE(user_id, date, meal_type, position)
+        );
+
+        -- The UNIQUE index serves (user_id, date) range scans; recipe_id is
+        -- indexed for joins and ON DELETE CASCADE from recipes
+        CREATE INDEX IF NOT EXISTS idx_meal_slots_recipe_id ON meal_slots (recipe_id);
+
+        -- Planned kcal and macros per user and day rolled up from
+        -- meal_slots, refreshed for the days a write touches
+        CREATE TABLE IF NOT EXISTS daily_nutrition (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            kcal DOUBLE PRECISION NOT NULL DEFAULT 0,
+            protein DOUBLE PRECISION NOT NULL DEFAULT 0,
+            carbs DOUBLE PRECISION NOT NULL DEFAULT 0,
+            fat DOUBLE PRECISION NOT NULL DEFAULT 0,
+            meal_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        );
+
+        CREATE TABLE IF NOT EXISTS user_nutrition_goals (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE UNIQUE,
+            calorie_goal INTEGER DEFAULT 2000,
+            protein_goal INTEGER DEFAULT 150,
+            carbs_goal INTEGER DEFAULT 200,
+            fats_goal INTEGER DEFAULT 67,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS calorie_logs (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
+            log_date DATE DEFAULT CURRENT_DATE,
+            calories INTEGER,
+            servings DECIMAL(4,2) DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS notifications (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            title VARCHAR(255) NOT NULL,
+            message TEXT,
+            type VARCHAR(50) DEFAULT 'info',
+            is_read BOOLEAN DEFAULT false,
+            action_url VARCHAR(500),
+            action_data JSONB,
+            related_id INTEGER,
+            from_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE notifications
+            ADD COLUMN IF NOT EXISTS action_url VARCHAR(500),
+            ADD COLUMN IF NOT EXISTS action_data JSONB,
+            ADD COLUMN IF NOT EXISTS related_id INTEGER,
+            ADD COLUMN IF NOT EXISTS from_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL;
+
+        CREATE TABLE IF NOT EXISTS meal_reminder_settings (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE UNIQUE,
+            reminders_enabled BOOLEAN DEFAULT true,
+            breakfast_time TIME DEFAULT '08:00',
+            lunch_time TIME DEFAULT '12:00',
+            dinner_time TIME DEFAULT '18:00',
+            snack_time TIME DEFAULT '15:00',
+            breakfast_reminder_minutes INTEGER DEFAULT 30,
+            lunch_reminder_minutes INTEGER DEFAULT 30,
+            dinner_reminder_minutes INTEGER DEFAULT 30,
+            snack_reminder_minutes INTEGER DEFAULT 30,
+            notify_weekly_plan BOOLEAN DEFAULT true,
+            notify_shopping_list BOOLEAN DEFAULT true,
+            notify_new_recipes BOOLEAN DEFAULT true,
+            notify_calorie_goal BOOLEAN DEFAULT true,
+            sound_enabled BOOLEAN DEFAULT true,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS shopping_list (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            item_name VARCHAR(255) NOT NULL,
+            quantity VARCHAR(100),
+            unit VARCHAR(50),
+            category VARCHAR(100),
+            is_checked BOOLEAN DEFAULT false,
+            source VARCHAR(50) DEFAULT 'manual',
+            recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE shopping_list
+            ADD COLUMN IF NOT EXISTS source VARCHAR(50) DEFAULT 'manual',
+            ADD COLUMN IF NOT EXISTS recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL;
+    '''),
+    # Secondary indexes for the hot query shapes of the blueprints; each
+    # one is checked by `flask check-query-plans` (see query_plans.py)
+    # Built concurrently, so deploying it does not block writes to these tables
+    Migration(2, 'hot query indexes', '''
+        -- My recipes (newest first), per-user counts, fork lookups
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipes_user_id_created_at
+            ON recipes (user_id, created_at DESC, id DESC);
+
+        -- Public recipe feed (newest first); only public rows are indexed
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipes_public_created_at
+            ON recipes (created_at DESC, id DESC) WHERE is_public;
+
+        -- "Already forked?" lookups and ON DELETE SET NULL of forks
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipes_forked_from_id
+            ON recipes (forked_from_id) WHERE forked_from_id IS NOT NULL;
+
+        -- UNIQUE (recipe_id, user_id) serves rating aggregates; reviews are
+        -- listed newest first, and account deletion filters by user_id
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipe_ratings_recipe_id_created_at
+            ON recipe_ratings (recipe_id, created_at DESC);
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipe_ratings_user_id
+            ON recipe_ratings (user_id);
+
+        -- Notification list (newest first); unread counts and mark-all-read
+        -- only touch the (small) unread part
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_user_id_created_at
+            ON notifications (user_id, created_at DESC);
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_unread
+            ON notifications (user_id, created_at DESC) WHERE NOT is_read;
+
+        -- Shopping list in display order (unchecked first, newest first),
+        -- clear-checked; auto-generated items are replaced by source
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shopping_list_user_id_checked
+            ON shopping_list (user_id, is_checked, created_at DESC);
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shopping_list_user_id_source
+            ON shopping_list (user_id, source);
+
+        -- Calorie logs per user and day (newest first)
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calorie_logs_user_id_log_date
+            ON calorie_logs (user_id, log_date DESC);
+
+        -- Saved meal plans (most recently updated first)
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_meal_plans_user_id_updated_at
+            ON meal_plans (user_id, updated_at DESC);
+
+        -- ON DELETE SET NULL from recipes would otherwise scan these tables
+        -- on every recipe deletion
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calorie_logs_recipe_id
+            ON calorie_logs (recipe_id) WHERE recipe_id IS NOT NULL;
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_shopping_list_recipe_id
+            ON shopping_list (recipe_id) WHERE recipe_id IS NOT NULL;
+    ''', transactional=False),
+    # Rating aggregates maintained by recipe_ratings.save_recipe_rating()
+    Migration(3, 'recipe rating aggregates', '''
+        ALTER TABLE recipes
+            ADD COLUMN IF NOT EXISTS rating_sum INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS rating_count INTEGER NOT NULL DEFAULT 0;
+
+        UPDATE recipes r
+        SET rating_sum = stats.rating_sum,
+            rating_count = stats.rating_count
+        FROM (
+            SELECT recipe_id, COALESCE(SUM(rating), 0) AS rating_sum, COUNT(*) AS rating_count
+            FROM recipe_ratings
+            GROUP BY recipe_id
+        ) stats
+        WHERE r.id = stats.recipe_id;
+    '''),
+    # The feed paginates on (created_at, id) (see recipe_feed.py), which
+    # needs created_at on every row
+    Migration(4, 'recipes.created_at not null', '''
+        UPDATE recipes SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+        WHERE created_at IS NULL;
+        ALTER TABLE recipes ALTER COLUMN created_at SET NOT NULL;
+    '''),
+    # Planned meals are read from meal_slots (see meal_slots.py); weeks
+    # saved before the dual-write existed only live in weekly_calendar_data
+    Migration(5, 'backfill meal_slots', '', backfill_meal_slots),
+    # A recipe's gram estimates are each capped to the INTEGER range
+    # (ingredient_parser.MAX_ESTIMATED_GRAMS), but their sum is not
+    Migration(6, 'recipe_nutrition gram totals bigint', '''
+        ALTER TABLE recipe_nutrition
+            ALTER COLUMN total_grams TYPE BIGINT,
+            ALTER COLUMN matched_grams TYPE BIGINT;
+    '''),
+    # Shopping lists, nutrition and the dashboard read recipe_ingredients,
+    # recipe_nutrition and daily_nutrition, which are only written when a
+    # recipe is saved; fill them for recipes saved before they existed.
+    # Ingredient lines are parsed by ingredient_parser, hence Python rather
+    # than INSERT ... SELECT.
+    Migration(7, 'backfill recipe ingredients and nutrition', '',
+              _backfill_recipe_ingredients_and_nutrition),
+    # Public feed, most popular first (see recipe_feed.py)
+    Migration(8, 'popular feed index', '''
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipes_public_rating_sum
+            ON recipes (rating_sum DESC, id DESC) WHERE is_public;
+    ''', transactional=False),
+]
+
+# Tables the application expects; checked at startup along with the versions
+TABLES = (
+    'users', 'recipes', 'recipe_ratings', 'meal_plans', 'recipe_ingredients',
+    'recipe_nutrition', 'weekly_calendar_data', 'meal_slots', 'daily_nutrition',
+    'user_nutrition_goals', 'calorie_logs', 'notifications', 'meal_reminder_settings',
+    'shopping_list'
+)
+
+# pg_advisory_xact_lock key serializing concurrent `flask migrate` runs
+_MIGRATION_LOCK_KEY = 0x666b6d67
+
+_CREATE_MIGRATIONS_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def schema_version() -> int:
+    """Version of the newest migration, i.e. the schema this code expects."""
+    return MIGRATIONS[-1].version
+
+
+def _applied_migrations(cur) -> dict:
+    """Applied migrations as version -> row (empty if none were ever applied)."""
+    cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS present")
+    if not cur.fetchone()['present']:
+        return {}
+    cur.execute('SELECT version, name, checksum FROM schema_migrations ORDER BY version')
+    return {row['version']: row for row in cur.fetchall()}
+
+
+def _version_problems(applied: dict) -> List[str]:
+    """Describe applied migrations unknown to or modified since this code."""
+    known = {migration.version: migration for migration in MIGRATIONS}
+    problems = []
+    for version, row in applied.items():
+        migration = known.get(version)
+        if migration is None:
+            problems.append(f'migration {version} ({row["name"]}) is applied but unknown to this code')
+        elif row['checksum'] != migration.checksum:
+            problems.append(f'migration {version} ({migration.name}) was modified after it was applied')
+    return problems
+
+
+def _apply_without_transaction(migration: Migration, progress=None) -> bool:
+    """
+    Apply a transactional=False migration, one statement at a time in
+    autocommit mode, under a session-level advisory lock.
+
+    Comment lines are dropped and statements split on ';', so the SQL of
+    such migrations must not contain semicolons in literals.
+
+    Returns:
+        False if the migration was already applied
+    """
+    with get_db_connection() as conn:
+        conn.autocommit = True
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute('SELECT pg_advisory_lock(%s)', (_MIGRATION_LOCK_KEY,))
+            try:
+                cur.execute('SELECT 1 FROM schema_migrations WHERE version = %s', (migration.version,))
+                if cur.fetchone():
+                    return False
+                if progress:
+                    progress(migration)
+                code = '\n'.join(line for line in migration.sql.splitlines()
+                                  if not line.lstrip().startswith('--'))
+                for statement in code.split(';'):
+                    if statement.strip():
+                        cur.execute(statement)
+                cur.execute('''
+                    INSERT INTO schema_migrations (version, name, checksum)
+                    VALUES (%s, %s, %s)
+                ''', (migration.version, migration.name, migration.checksum))
+                return True
+            finally:
+                cur.execute('SELECT pg_advisory_unlock(%s)', (_MIGRATION_LOCK_KEY,))
+        finally:
+            cur.close()
+            conn.autocommit = False
+
+
+def apply_migrations(progress=None) -> List[Migration]:
+    """
+    Apply all pending migrations, each in its own transaction (or, for
+    transactional=False migrations, statement by statement).
+
+    Concurrent runs are serialized with an advisory lock, and each
+    migration is re-checked under the lock, so a migration is never
+    applied twice.
+
+    Args:
+        progress: Optional callback receiving each migration before it runs
+
+    Returns:
+        The migrations applied by this call
+
+    Raises:
+        SchemaDriftError: If an applied migration is unknown to or was
+            modified since this code
+    """
+    with get_db_cursor(commit=True) as cur:
+        cur.execute('SELECT pg_advisory_xact_lock(%s)', (_MIGRATION_LOCK_KEY,))
+        cur.execute(_CREATE_MIGRATIONS_TABLE_SQL)
+        problems = _version_problems(_applied_migrations(cur))
+    if problems:
+        raise SchemaDriftError('; '.join(problems))
+
+    applied = []
+    for migration in MIGRATIONS:
+        if not migration.transactional:
+            if _apply_without_transaction(migration, progress):
+                applied.append(migration)
+            continue
+        with get_db_cursor(commit=True) as cur:
+            cur.execute('SELECT pg_advisory_xact_lock(%s)', (_MIGRATION_LOCK_KEY,))
+            cur.execute('SELECT 1 FROM schema_migrations WHERE version = %s', (migration.version,))
+            if cur.fetchone():
+                continue
+            if progress:
+                progress(migration)
+            if migration.sql.strip():
+                cur.execute(migration.sql)
+            if migration.run is not None:
+                migration.run(cur)
+            cur.execute('''
+                INSERT INTO schema_migrations (version, name, checksum)
+                VALUES (%s, %s, %s)
+            ''', (migration.version, migration.name, migration.checksum))
+        applied.append(migration)
+    return applied
+
+
+def check_schema() -> None:
+    """
+    Verify the database is at exactly this code's schema version.
+
+    Raises:
+        SchemaDriftError: If migrations are pending, unknown or modified,
+            or an expected table is missing
+    """
+    with get_db_cursor() as cur:
+        applied = _applied_migrations(cur)
+        cur.execute('''
+            SELECT name FROM unnest(%s::text[]) AS name
+            WHERE to_regclass(name) IS NULL
+        ''', (list(TABLES),))
+        missing_tables = [row['name'] for row in cur.fetchall()]
+
+    problems = _version_problems(applied)
+    pending = [str(migration.version) for migration in MIGRATIONS if migration.version not in applied]
+    if pending:
+        problems.append(f"migration(s) {', '.join(pending)} not applied "
+                        f"(run `flask --app app migrate`)")
+    if missing_tables:
+        problems.append(f"missing table(s): {', '.join(missing_tables)}")
+    if problems:
+        raise SchemaDriftError(
+            f"Database schema does not match version {schema_version()}: {'; '.join(problems)}")
@@ -2,32 +2,252 @@
 Database models and utilities for Forkcast application.
 """
 
+import os
+import threading
+import time
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
 from contextlib import contextmanager
+from flask import g, has_app_context
 
 from .config import Config
 
 
+class _PooledConnection(extensions.connection):
+    """psycopg2 connection that remembers when it was opened (for recycling)."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool.
+    
+    Provides:
+        - Up to ``maxconn`` connections, ``minconn`` of them opened up front;
+          returned connections stay open and idle until reused
+        - Blocking checkout with a timeout when all connections are in use
+        - Health checks (cheap ``SELECT 1``) before handing out a connection
+        - Recycling of connections older than ``recycle`` seconds
+        - Rollback of any open transaction when a connection is returned
+    """
+    
+    def __init__(self, minconn, maxconn, timeout=10, recycle=1800, pre_ping=True, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect_kwargs = connect_kwargs
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+        # Idle connections; a connection is only opened when none is idle,
+        # so idle + checked out never exceeds maxconn
+        self._idle = [self._connect() for _ in range(minconn)]
+    
+    def _connect(self):
+        """Open a new connection."""
+        return psycopg2.connect(connection_factory=_PooledConnection, **self._connect_kwargs)
+    
+    def _is_stale(self, conn):
+        """Check whether a connection is closed or past its recycle age."""
+        if conn.closed:
+            return True
+        return self.recycle > 0 and time.monotonic() - conn.created_at > self.recycle
+    
+    def _is_healthy(self, conn):
+        """Ping the server to make sure the connection is still usable."""
+        if not self.pre_ping:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _discard(self, conn):
+        """Close a connection that is not going back to the pool."""
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+    
+    def getconn(self):
+        """
+        Check out a connection, waiting up to ``timeout`` seconds for a free slot.
+        
+        Raises:
+            PoolError: If no connection becomes available in time.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(f'No database connection available after {self.timeout}s')
+        try:
+            # Retry once per pooled connection so a batch of dead
+            # connections (e.g. after a server restart) is flushed out.
+            for _ in range(self.maxconn + 1):
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                if self._is_stale(conn) or not self._is_healthy(conn):
+                    self._discard(conn)
+                    continue
+                return conn
+            raise PoolError('Unable to obtain a healthy database connection')
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def putconn(self, conn):
+        """Return a connection to the pool, resetting any open transaction."""
+        try:
+            close = conn.closed != 0
+            if not close and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            if close:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+    
+    def closeall(self):
+        """Close every idle connection held by the pool."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Get the process-wide connection pool, creating it on first use.
+    
+    The pool is rebuilt after a fork so worker processes never share
+    sockets inherited from their parent.
+    """
+    global _pool
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(
+                    Config.DB_POOL_MIN,
+                    Config.DB_POOL_MAX,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                    dbname=Config.DB_NAME,
+                    user=Config.DB_USER,
+                    password=Config.DB_PASSWORD,
+                    host=Config.DB_HOST,
+                    port=Config.DB_PORT,
+                    connect_timeout=Config.DB_CONNECT_TIMEOUT
+                )
+    return _pool
+
+
+def close_pool():
+    """Close all pooled connections (e.g. on shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+def _checkout_request_connection():
+    """Get the connection bound to the current app context, checking one out if needed."""
+    if '_db_conn' not in g:
+        g._db_conn = get_pool().getconn()
+    return g._db_conn
+
+
+def release_db_connection(exc=None):
+    """
+    Return the request-scoped connection to the pool.
+    
+    Registered with ``teardown_appcontext``; any uncommitted work is
+    rolled back by the pool.
+    """
+    conn = g.pop('_db_conn', None)
+    g.pop('_db_tx_depth', None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
 @contextmanager
 def get_db_connection():
     """
     Context manager for database connections.
-    Automatically handles connection cleanup.
+    
+    Inside a Flask app context every caller shares one connection bound
+    to ``g``, which is returned to the pool at teardown. Outside an app
+    context (scripts, shells) a connection is checked out of the pool
+    for the duration of the block.
     """
-    conn = None
+    if has_app_context():
+        yield _checkout_request_connection()
+        return
+    
+    pool = get_pool()
+    conn = pool.getconn()
     try:
-        conn = psycopg2.connect(
-            dbname=Config.DB_NAME,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            host=Config.DB_HOST,
-            port=Config.DB_PORT
-        )
         yield conn
     finally:
-        if conn is not None:
-            conn.close()
+        pool.putconn(conn)
+
+
+def _in_transaction():
+    """Check whether a db_transaction() block is active for this app context."""
+    return has_app_context() and g.get('_db_tx_depth', 0) > 0
+
+
+@contextmanager
+def db_transaction():
+    """
+    Opt-in transaction scope for the current request.
+    
+    Cursors opened inside the block share one transaction: their
+    individual ``commit=True`` flags are deferred and the whole block is
+    committed on success or rolled back on error. Blocks may be nested;
+    only the outermost one commits.
+    
+    Example:
+        with db_transaction():
+            with get_db_cursor(commit=True) as cur:
+                cur.execute(...)
+            with get_db_cursor(commit=True) as cur:
+                cur.execute(...)
+    """
+    with get_db_connection() as conn:
+        depth = g.get('_db_tx_depth', 0)
+        g._db_tx_depth = depth + 1
+        try:
+            yield conn
+            if depth == 0:
+                conn.commit()
+        except Exception:
+            if depth == 0:
+                conn.rollback()
+            raise
+        finally:
+            g._db_tx_depth = depth
 
 
 @contextmanager
@@ -37,252 +257,18 @@ def get_db_cursor(commit=False):
     
     Args:
         commit: If True, commits the transaction after successful execution.
+                Inside a db_transaction() block the commit is deferred to
+                the end of that block.
     """
     with get_db_connection() as conn:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         try:
             yield cur
-            if commit:
+            if commit and not _in_transaction():
                 conn.commit()
         except Exception:
-            conn.rollback()
+            if not _in_transaction():
+                conn.rollback()
             raise
         finally:
             cur.close()
-
-
-def init_tables():
-    """Initialize database tables."""
-    with get_db_cursor(commit=True) as cur:
-        # Create users table
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                full_name VARCHAR(100),
-                bio TEXT,
-                profile_image VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add profile_image column if it doesn't exist (for existing databases)
-        cur.execute('''
-            DO $$ 
-            BEGIN 
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='users' AND column_name='profile_image') THEN
-                    ALTER TABLE users ADD COLUMN profile_image VARCHAR(255);
-                END IF;
-            END $$;
-        ''')
-        
-        # Create recipes table
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS recipes (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                title VARCHAR(200) NOT NULL,
-                description TEXT,
-                ingredients TEXT NOT NULL,
-                instructions TEXT NOT NULL,
-                prep_time INTEGER,
-                cook_time INTEGER,
-                servings INTEGER,
-                calories_per_serving INTEGER,
-                category VARCHAR(50),
-                cuisine VARCHAR(50),
-                difficulty VARCHAR(20),
-                tags VARCHAR(500),
-                image_url VARCHAR(255),
-                is_public BOOLEAN DEFAULT true,
-                is_favorite BOOLEAN DEFAULT false,
-                forked_from_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
-                original_author_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add fork columns if they don't exist (for existing databases)
-        cur.execute('''
-            DO $$ 
-            BEGIN 
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='recipes' AND column_name='forked_from_id') THEN
-                    ALTER TABLE recipes ADD COLUMN forked_from_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL;
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='recipes' AND column_name='original_author_id') THEN
-                    ALTER TABLE recipes ADD COLUMN original_author_id INTEGER REFERENCES users(id) ON DELETE SET NULL;
-                END IF;
-            END $$;
-        ''')
-        
-        # Create recipe ratings table
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS recipe_ratings (
-                id SERIAL PRIMARY KEY,
-                recipe_id INTEGER REFERENCES recipes(id) ON DELETE CASCADE,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                rating INTEGER CHECK (rating >= 1 AND rating <= 5),
-                review TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(recipe_id, user_id)
-            )
-        ''')
-        
-        # Create meal_plans table for saving meal plan templates
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS meal_plans (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                name VARCHAR(200) NOT NULL,
-                description TEXT,
-                week_start_date DATE,
-                meals JSONB NOT NULL DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create weekly_calendar_data table for auto-saving calendar meals per week
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS weekly_calendar_data (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                week_start_date DATE NOT NULL,
-                meals JSONB NOT NULL DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, week_start_date)
-            )
-        ''')
-        
-        # Create user_nutrition_goals table for calorie/macro tracking
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS user_nutrition_goals (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE UNIQUE,
-                calorie_goal INTEGER DEFAULT 2000,
-                protein_goal INTEGER DEFAULT 150,
-                carbs_goal INTEGER DEFAULT 200,
-                fats_goal INTEGER DEFAULT 67,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create calorie_logs table for tracking daily calorie intake
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS calorie_logs (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
-                log_date DATE DEFAULT CURRENT_DATE,
-                calories INTEGER,
-                servings DECIMAL(4,2) DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create notifications table with extended fields for navigation
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                title VARCHAR(255) NOT NULL,
-                message TEXT,
-                type VARCHAR(50) DEFAULT 'info',
-                is_read BOOLEAN DEFAULT false,
-                action_url VARCHAR(500),
-                action_data JSONB,
-                related_id INTEGER,
-                from_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add new columns to notifications if they don't exist
-        cur.execute('''
-            DO $$ 
-            BEGIN 
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='notifications' AND column_name='action_url') THEN
-                    ALTER TABLE notifications ADD COLUMN action_url VARCHAR(500);
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='notifications' AND column_name='action_data') THEN
-                    ALTER TABLE notifications ADD COLUMN action_data JSONB;
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='notifications' AND column_name='related_id') THEN
-                    ALTER TABLE notifications ADD COLUMN related_id INTEGER;
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='notifications' AND column_name='from_user_id') THEN
-                    ALTER TABLE notifications ADD COLUMN from_user_id INTEGER REFERENCES users(id) ON DELETE SET NULL;
-                END IF;
-            END $$;
-        ''')
-        
-        # Create meal_reminder_settings table for user notification preferences
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS meal_reminder_settings (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE UNIQUE,
-                reminders_enabled BOOLEAN DEFAULT true,
-                breakfast_time TIME DEFAULT '08:00',
-                lunch_time TIME DEFAULT '12:00',
-                dinner_time TIME DEFAULT '18:00',
-                snack_time TIME DEFAULT '15:00',
-                breakfast_reminder_minutes INTEGER DEFAULT 30,
-                lunch_reminder_minutes INTEGER DEFAULT 30,
-                dinner_reminder_minutes INTEGER DEFAULT 30,
-                snack_reminder_minutes INTEGER DEFAULT 30,
-                notify_weekly_plan BOOLEAN DEFAULT true,
-                notify_shopping_list BOOLEAN DEFAULT true,
-                notify_new_recipes BOOLEAN DEFAULT true,
-                notify_calorie_goal BOOLEAN DEFAULT true,
-                sound_enabled BOOLEAN DEFAULT true,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create shopping_list table
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS shopping_list (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-                item_name VARCHAR(255) NOT NULL,
-                quantity VARCHAR(100),
-                unit VARCHAR(50),
-                category VARCHAR(100),
-                is_checked BOOLEAN DEFAULT false,
-                source VARCHAR(50) DEFAULT 'manual',
-                recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Add source and recipe_id columns if they don't exist (for existing databases)
-        cur.execute('''
-            DO $$ 
-            BEGIN 
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='shopping_list' AND column_name='source') THEN
-                    ALTER TABLE shopping_list ADD COLUMN source VARCHAR(50) DEFAULT 'manual';
-                END IF;
-                IF NOT EXISTS (SELECT 1 FROM information_schema.columns 
-                               WHERE table_name='shopping_list' AND column_name='recipe_id') THEN
-                    ALTER TABLE shopping_list ADD COLUMN recipe_id INTEGER REFERENCES recipes(id) ON DELETE SET NULL;
-                END IF;
-            END $$;
-        ''')
-        
-    print("Database tables initialized successfully.")
@@ -0,0 +1,261 @@
+"""
+Nutrient Database - Offline, memory-mapped nutrient lookup by food name.
+
+A nutrient dataset (CSV, values per 100 g) is imported once into a
+compact binary file; at runtime the file is memory-mapped read-only, so
+lookups need no network calls and every worker process shares the same
+page-cache pages instead of holding its own copy.
+
+File layout (little-endian):
+    header   magic, record count, slot count, size of the names blob
+    slots    uint32[slot_count] open-addressing hash table (crc32 of the
+             normalized name, linear probing); record index + 1, 0 = empty
+    records  (name offset, name length, kcal, protein, carbs, fat per gram)
+    names    UTF-8 normalized names, referenced by the records
+
+This module handles:
+    - Normalizing food names into lookup keys
+    - Importing a nutrient CSV into the binary format
+    - O(1) lookups of kcal/protein/carbs/fat per gram
+"""
+
+import csv
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import zlib
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from .config import Config
+
+
+MAGIC = b'FKNUTR01'
+_HEADER = struct.Struct('<8sIII4x')
+_SLOT = struct.Struct('<I')
+_RECORD = struct.Struct('<IH2xffff')
+
+# CSV columns (values per 100 g, as in USDA FoodData Central)
+CSV_COLUMNS = ('name', 'kcal', 'protein', 'carbs', 'fat')
+
+_NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+class Nutrients(NamedTuple):
+    """Nutrient content per gram of a food."""
+    kcal: float
+    protein: float
+    carbs: float
+    fat: float
+
+
+def normalize_food_name(name: str) -> str:
+    """Lookup key of a food name: lowercase words separated by single spaces."""
+    return _NON_ALNUM_PATTERN.sub(' ', name.lower()).strip()
+
+
+def _singular(key: str) -> Optional[str]:
+    """Naive singular of the last word ("tomatoes" -> "tomato"), or None."""
+    if key.endswith('ies'):
+        return key[:-3] + 'y'
+    if key.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return key[:-2]
+    if key.endswith('s') and not key.endswith('ss'):
+        return key[:-1]
+    return None
+
+
+def _lookup_keys(name: str) -> Iterator[str]:
+    """
+    Candidate keys for a food name, most specific first.
+
+    Tries the name and its singular, then drops leading words one at a
+    time, since the head noun comes last ("extra virgin olive oil" ->
+    "virgin olive oil" -> "olive oil" -> "oil").
+    """
+    words = normalize_food_name(name).split()
+    for start in range(len(words)):
+        key = ' '.join(words[start:])
+        yield key
+        singular = _singular(key)
+        if singular:
+            yield singular
+
+
+class NutrientDB:
+    """
+    Read-only view of a nutrient database file.
+
+    Args:
+        path: File written by import_nutrient_dataset()
+
+    Raises:
+        ValueError: If the file is not a nutrient database
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.record_count, self.slot_count, names_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f'{path} is not a nutrient database')
+        self._mask = self.slot_count - 1
+        self._records_offset = _HEADER.size + self.slot_count * _SLOT.size
+        self._names_offset = self._records_offset + self.record_count * _RECORD.size
+        if self._names_offset + names_size > len(self._mm):
+            self._mm.close()
+            raise ValueError(f'{path} is truncated')
+
+    def __len__(self) -> int:
+        return self.record_count
+
+    def _get(self, key: str) -> Optional[Nutrients]:
+        """Probe the hash table for an exact normalized key."""
+        encoded = key.encode('utf-8')
+        slot = zlib.crc32(encoded) & self._mask
+        mm = self._mm
+        while True:
+            (entry,) = _SLOT.unpack_from(mm, _HEADER.size + slot * _SLOT.size)
+            if not entry:
+                return None
+            offset, length, kcal, protein, carbs, fat = _RECORD.unpack_from(
+                mm, self._records_offset + (entry - 1) * _RECORD.size)
+            start = self._names_offset + offset
+            if mm[start:start + length] == encoded:
+                return Nutrients(kcal, protein, carbs, fat)
+            slot = (slot + 1) & self._mask
+
+    def lookup(self, food_name: str) -> Optional[Nutrients]:
+        """
+        Look up the nutrients per gram of a food.
+
+        Args:
+            food_name: Food name, e.g. from ingredient_parser.extract_food_name()
+
+        Returns:
+            Nutrients per gram, or None if no candidate key is in the database
+        """
+        for key in _lookup_keys(food_name):
+            nutrients = self._get(key)
+            if nutrients is not None:
+                return nutrients
+        return None
+
+    def is_current(self) -> bool:
+        """Whether the file on disk is still the one that is mapped (not re-imported)."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def _read_dataset(source_path: str) -> Dict[str, Nutrients]:
+    """
+    Read a nutrient CSV into normalized name -> nutrients per gram.
+
+    Rows with a missing (or over-long) name or non-numeric values are
+    skipped; the first row of a duplicated name wins.
+    """
+    foods = {}
+    with open(source_path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Missing column(s) in {source_path}: {', '.join(missing)}")
+        for row in reader:
+            key = normalize_food_name(row['name'] or '')
+            if not key or key in foods or len(key.encode('utf-8')) > 0xFFFF:
+                continue
+            try:
+                values = [float(row[column]) / 100 for column in CSV_COLUMNS[1:]]
+            except (TypeError, ValueError):
+                continue
+            foods[key] = Nutrients(*values)
+    return foods
+
+
+def import_nutrient_dataset(source_path: str, output_path: str) -> int:
+    """
+    Import a nutrient CSV into a memory-mappable database file.
+
+    The CSV needs the columns name, kcal, protein, carbs and fat, with
+    values per 100 g. The file is written next to output_path and renamed
+    into place, so processes that have the old file mapped keep a
+    consistent view.
+
+    Args:
+        source_path: CSV dataset to import
+        output_path: Database file to (re)write
+
+    Returns:
+        Number of foods imported
+    """
+    foods = _read_dataset(source_path)
+
+    # Keep the table at most half full so probe sequences stay short
+    slot_count = 1
+    while slot_count < 2 * len(foods):
+        slot_count *= 2
+
+    slots = [0] * slot_count
+    records = bytearray()
+    names = bytearray()
+    for index, (key, nutrients) in enumerate(foods.items()):
+        encoded = key.encode('utf-8')
+        slot = zlib.crc32(encoded) & (slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = index + 1
+        records += _RECORD.pack(len(names), len(encoded), *nutrients)
+        names += encoded
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(foods), slot_count, len(names)))
+            f.write(struct.pack(f'<{slot_count}I', *slots))
+            f.write(records)
+            f.write(names)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return len(foods)
+
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_nutrient_db() -> Optional[NutrientDB]:
+    """
+    Get the process-wide nutrient database (None if none has been imported).
+
+    The file is mapped on first use and remapped after a re-import. Open
+    it before forking workers (e.g. with a preloading server) and they
+    share the parent's mapping.
+    """
+    global _db
+    if _db is not None and _db.is_current():
+        return _db
+    with _db_lock:
+        if _db is None or not _db.is_current():
+            try:
+                _db = NutrientDB(Config.NUTRIENT_DB_PATH)
+            except (OSError, ValueError) as e:
+                if not isinstance(e, FileNotFoundError):
+                    print(f"Error opening nutrient database: {e}")
+                _db = None
+    return _db
@@ -0,0 +1,173 @@
+"""
+Parser Benchmark - Before/after throughput of the ingredient parser.
+
+parse_ingredient used to try up to five patterns per line, rebuilding the
+unit alternation and going through re's pattern cache for each of them.
+That implementation is kept here, unchanged, as the baseline that
+`flask benchmark-parser` measures the current parser against: both parse
+the same corpus line by line without memoization, and the memoized
+parse_ingredient is measured on top.
+
+This module handles:
+    - The previous (per-pattern) parser, as a reference
+    - Timing the reference and current parsers on a corpus
+    - Checking both parsers agree on the corpus
+"""
+
+import re
+import time
+from fractions import Fraction
+from typing import Callable, Dict, List, Optional
+
+from .ingredient_parser import (
+    ALL_UNITS, ParsedIngredient, parse_ingredient, clear_parse_cache, _parse_ingredient_cached
+)
+
+
+def reference_parse_ingredient(line: str) -> Optional[ParsedIngredient]:
+    """The parser before the precompiled INGREDIENT_PATTERN (baseline; do not optimize)."""
+    line = line.strip()
+    if not line:
+        return None
+
+    original = line
+    text = line.lower()
+
+    quantity = 1.0
+    unit = ''
+    name = ''
+
+    # Build unit pattern for regex
+    unit_pattern = '|'.join(sorted(ALL_UNITS, key=len, reverse=True))
+
+    # Pattern 1: Direct weight/volume attached to number (e.g., "100g", "250ml")
+    direct_match = re.match(r'^(\d+\.?\d*)\s*(g|gram|grams|kg|ml|l|oz|lb|lbs)\b\s*(.*)$', text, re.IGNORECASE)
+    if direct_match:
+        quantity = float(direct_match.group(1))
+        unit = direct_match.group(2).lower()
+        name = direct_match.group(3).strip()
+        if name.startswith('of '):
+            name = name[3:]
+
+    # Pattern 2: Range with unit (e.g., "2-3 cups flour")
+    elif re.match(r'^\d+\.?\d*\s*-\s*\d+\.?\d*', text):
+        range_match = re.match(r'^(\d+\.?\d*)\s*-\s*(\d+\.?\d*)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
+        if range_match:
+            # Use average of range
+            low = float(range_match.group(1))
+            high = float(range_match.group(2))
+            quantity = (low + high) / 2
+            unit = (range_match.group(3) or '').lower()
+            name = (range_match.group(4) or '').strip()
+
+    # Pattern 3: Mixed number with unit (e.g., "1 1/2 cups flour")
+    elif re.match(r'^\d+\s+\d+/\d+', text):
+        mixed_match = re.match(r'^(\d+)\s+(\d+/\d+)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
+        if mixed_match:
+            whole = float(mixed_match.group(1))
+            frac = float(Fraction(mixed_match.group(2)))
+            quantity = whole + frac
+            unit = (mixed_match.group(3) or '').lower()
+            name = (mixed_match.group(4) or '').strip()
+
+    # Pattern 4: Fraction with unit (e.g., "1/2 cup flour")
+    elif re.match(r'^\d+/\d+', text):
+        frac_match = re.match(r'^(\d+/\d+)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
+        if frac_match:
+            quantity = float(Fraction(frac_match.group(1)))
+            unit = (frac_match.group(2) or '').lower()
+            name = (frac_match.group(3) or '').strip()
+
+    # Pattern 5: Number with unit (e.g., "2 cups flour", "3 large eggs")
+    elif re.match(r'^\d+\.?\d*', text):
+        num_match = re.match(r'^(\d+\.?\d*)\s*(' + unit_pattern + r')?\s*(.*)$', text, re.IGNORECASE)
+        if num_match:
+            quantity = float(num_match.group(1))
+            unit = (num_match.group(2) or '').lower()
+            name = (num_match.group(3) or '').strip()
+
+    # Pattern 6: No quantity (e.g., "salt to taste", "fresh basil")
+    else:
+        name = text
+
+    # Clean up the ingredient name
+    if not name:
+        name = text
+
+    # Remove "of" prefix (e.g., "of flour" -> "flour")
+    if name.startswith('of '):
+        name = name[3:]
+
+    # Remove trailing commas and everything after (recipe notes)
+    if ',' in name:
+        name = name.split(',')[0].strip()
+
+    # Remove parenthetical notes
+    name = re.sub(r'\([^)]*\)', '', name).strip()
+
+    # Clean ingredient name for categorization (remove descriptors)
+    name_for_category = re.sub(
+        r'\b(fresh|dried|chopped|diced|minced|sliced|crushed|grated|ground|whole|frozen|canned|organic|raw|cooked|boneless|skinless)\b',
+        '', name.lower()
+    ).strip()
+
+    # Preserve original case for display
+    # Try to find the name portion in the original line for proper casing
+    name_start = original.lower().find(name.split()[0] if name.split() else name)
+    if name_start >= 0:
+        name = original[name_start:name_start + len(name)]
+
+    return ParsedIngredient(quantity, unit, name.strip(), name_for_category, original)
+
+
+def _current_parse_uncached(line: str) -> Optional[ParsedIngredient]:
+    """The current parser without its memo cache (same per-line work as the reference)."""
+    line = line.strip()
+    if not line:
+        return None
+    return _parse_ingredient_cached.__wrapped__(line)
+
+
+def _outcome(parse: Callable, line: str):
+    """Result of parsing a line, or the exception type it raised."""
+    try:
+        return parse(line)
+    except Exception as e:
+        return type(e)
+
+
+def _lines_per_sec(parse: Callable, corpus: List[str], repeats: int) -> float:
+    """Throughput of a parser over the corpus, repeated; exceptions count as parsed lines."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for line in corpus:
+            try:
+                parse(line)
+            except (ValueError, ZeroDivisionError):
+                pass
+    return repeats * len(corpus) / max(time.perf_counter() - start, 1e-9)
+
+
+def benchmark_parsers(corpus: List[str], repeats: int) -> Dict:
+    """
+    Time the reference and current parsers on the same corpus.
+
+    Args:
+        corpus: Ingredient lines
+        repeats: Times the corpus is parsed by each parser
+
+    Returns:
+        dict with keys: lines (parsed per parser), reference, current,
+        current_cached (lines/sec; the cached run starts from an empty
+        cache), mismatches (corpus lines the two parsers disagree on)
+    """
+    mismatches = sum(1 for line in set(corpus)
+                     if _outcome(reference_parse_ingredient, line) != _outcome(_current_parse_uncached, line))
+    clear_parse_cache()
+    return {
+        'lines': repeats * len(corpus),
+        'reference': _lines_per_sec(reference_parse_ingredient, corpus, repeats),
+        'current': _lines_per_sec(_current_parse_uncached, corpus, repeats),
+        'current_cached': _lines_per_sec(parse_ingredient, corpus, repeats),
+        'mismatches': mismatches
+    }
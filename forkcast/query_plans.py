@@ -0,0 +1,219 @@
+"""
+Query Plans - EXPLAIN checks of the hot query shapes.
+
+The blueprints' most frequent queries are listed here (the handlers'
+SQL constants, which use named parameters) so their plans can be checked
+against a realistically sized dataset: `flask check-query-plans` seeds
+users, recipes, ratings, notifications, shopping lists, calorie logs and
+meal plans inside a transaction, ANALYZEs them, EXPLAINs every query and
+rolls everything back. A query fails the check when its plan contains a
+sequential scan, i.e. when no index (see migrations.py) serves it.
+
+Run it against a development or CI database: the seeded rows are rolled
+back, but the planner statistics of the seeded tables are only refreshed
+by the next (auto-)ANALYZE.
+
+When adding a hot query to a blueprint, make its SQL a module constant
+and add an entry here.
+
+This module handles:
+    - The list of hot queries
+    - Seeding a throwaway dataset at a given scale
+    - Finding sequential scans in EXPLAIN plans
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, NamedTuple
+
+from .recipe_fields import CARD_FIELDS, DETAIL_FIELDS, recipe_select_sql
+from .recipe_feed import public_feed_sql
+from .recipe_ratings import USER_RATING_SQL, RECIPE_REVIEWS_SQL, MY_RECIPE_REVIEWS_SQL
+from .blueprints.api import EXISTING_FORK_SQL
+from .blueprints.calendar import MEAL_PLANS_SQL
+from .blueprints.calorie_tracker import CALORIE_LOGS_SQL, CALORIE_LOGS_DAY_SQL, CALORIE_LOGS_ORDER_SQL
+from .blueprints.dashboard import RECIPE_COUNTS_SQL
+from .blueprints.notifications import (
+    NOTIFICATION_LIST_SQL, NOTIFICATION_LIST_UNREAD_SQL, NOTIFICATION_LIST_PAGE_SQL, UNREAD_COUNT_SQL,
+    TODAY_MEAL_REMINDERS_SQL, MARK_ALL_READ_SQL
+)
+from .blueprints.shopping_list import SHOPPING_LIST_SQL, CLEAR_CHECKED_SQL, CLEAR_GENERATED_SQL
+
+
+class HotQuery(NamedTuple):
+    """A query shape from a request handler."""
+    name: str
+    sql: str
+
+
+HOT_QUERIES = [
+    HotQuery('my recipes (recipes.my_recipes, api.get_recipes?type=my)', recipe_select_sql(CARD_FIELDS) + '''
+        WHERE r.user_id = %(user_id)s
+        ORDER BY r.created_at DESC
+    '''),
+    HotQuery('recipe detail (api.get_recipe)', recipe_select_sql(DETAIL_FIELDS) + '''
+        WHERE r.id = %(recipe_id)s
+    '''),
+    HotQuery('public feed, first page (recipe_feed.fetch_public_feed)', public_feed_sql(CARD_FIELDS)),
+    HotQuery('public feed, later page (recipe_feed.fetch_public_feed)',
+             public_feed_sql(CARD_FIELDS, after=True)),
+    HotQuery('popular feed, later page (recipe_feed.fetch_public_feed?sort=popular)',
+             public_feed_sql(CARD_FIELDS, 'popular', after=True)),
+    HotQuery("user's rating (api.get_recipe, recipe_ratings.save_recipe_rating)", USER_RATING_SQL),
+    HotQuery('recipe reviews (api.get_recipe_reviews)', RECIPE_REVIEWS_SQL),
+    HotQuery('reviews of my recipes (api.get_my_recipe_reviews)', MY_RECIPE_REVIEWS_SQL),
+    HotQuery('existing fork (api.fork_recipe)', EXISTING_FORK_SQL),
+    HotQuery('recipe counts (dashboard)', RECIPE_COUNTS_SQL),
+    HotQuery('notification list (notifications.get_notifications)',
+             NOTIFICATION_LIST_SQL + NOTIFICATION_LIST_PAGE_SQL),
+    HotQuery('unread notification list (notifications.get_notifications?unread=true)',
+             NOTIFICATION_LIST_SQL + NOTIFICATION_LIST_UNREAD_SQL + NOTIFICATION_LIST_PAGE_SQL),
+    HotQuery('unread count (notifications.get_unread_count)', UNREAD_COUNT_SQL),
+    HotQuery("today's meal reminders (notifications.get_notification_stats)", TODAY_MEAL_REMINDERS_SQL),
+    HotQuery('mark all read (notifications.mark_all_notifications_read)', MARK_ALL_READ_SQL),
+    HotQuery('shopping list (shopping_list.get_shopping_list)', SHOPPING_LIST_SQL),
+    HotQuery('clear checked items (shopping_list.clear_checked_items)', CLEAR_CHECKED_SQL),
+    HotQuery('replace generated items (shopping_list.generate_from_meal_plan)', CLEAR_GENERATED_SQL),
+    HotQuery('calorie logs of a day (calorie_tracker.get_calorie_logs)',
+             CALORIE_LOGS_SQL + CALORIE_LOGS_DAY_SQL + CALORIE_LOGS_ORDER_SQL),
+    HotQuery('meal plans (calendar.get_meal_plans)', MEAL_PLANS_SQL),
+]
+
+# Users seeded by default; smaller datasets get sequential scans on users
+DEFAULT_PLAN_CHECK_USERS = 10000
+
+# Rows seeded per user by seed_plan_dataset()
+_RECIPES_PER_USER = 20
+_RATINGS_PER_RECIPE = 3
+_NOTIFICATIONS_PER_USER = 50
+_SHOPPING_ITEMS_PER_USER = 30
+_CALORIE_LOGS_PER_USER = 60
+_MEAL_PLANS_PER_USER = 5
+
+
+def seed_plan_dataset(cur, users: int) -> Dict:
+    """
+    Insert a synthetic dataset for plan checks (call inside a transaction
+    that is rolled back afterwards).
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        users: Number of users to create; every other table is sized per user
+
+    Returns:
+        Query parameters (user_id, recipe_id, today, ...) pointing at
+        seeded rows
+    """
+    cur.execute('''
+        INSERT INTO users (username, email, password_hash)
+        SELECT '_plan_check_' || g, '_plan_check_' || g || '@example.invalid', ''
+        FROM generate_series(1, %s) g
+        RETURNING id
+    ''', (users,))
+    user_ids = [row['id'] for row in cur.fetchall()]
+    first_user, last_user = min(user_ids), max(user_ids)
+
+    cur.execute('''
+        INSERT INTO recipes (user_id, title, ingredients, instructions, is_public, created_at,
+                             category, prep_time, cook_time)
+        SELECT u, 'Recipe ' || g, '1 cup flour', 'Mix.', g %% 5 <> 0,
+               now() - (g * %s + u) * interval '1 minute',
+               (ARRAY['breakfast', 'lunch', 'dinner', 'dessert', 'snack'])[1 + (u + g) %% 5],
+               5 * (1 + g %% 6), 10 * ((u + g) %% 4)
+        FROM generate_series(%s, %s) u, generate_series(1, %s) g
+    ''', (users, first_user, last_user, _RECIPES_PER_USER))
+    cur.execute('''
+        INSERT INTO recipe_ratings (recipe_id, user_id, rating, review)
+        SELECT r.id, %s + (r.id + k * 7) %% %s, 1 + (r.id + k) %% 5, 'Nice'
+        FROM recipes r, generate_series(1, %s) k
+        WHERE r.user_id BETWEEN %s AND %s
+    ''', (first_user, users, _RATINGS_PER_RECIPE, first_user, last_user))
+    cur.execute('''
+        UPDATE recipes r
+        SET rating_sum = stats.rating_sum, rating_count = stats.rating_count
+        FROM (
+            SELECT recipe_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+            FROM recipe_ratings
+            GROUP BY recipe_id
+        ) stats
+        WHERE r.id = stats.recipe_id AND r.user_id BETWEEN %s AND %s
+    ''', (first_user, last_user))
+    cur.execute('''
+        INSERT INTO notifications (user_id, title, type, is_read, from_user_id, created_at)
+        SELECT u, 'Notification ' || g, CASE WHEN g %% 3 = 0 THEN 'meal' ELSE 'review' END,
+               g > 5, CASE WHEN g %% 3 = 0 THEN NULL ELSE %s + (u + g) %% %s END,
+               now() - g * interval '1 hour'
+        FROM generate_series(%s, %s) u, generate_series(1, %s) g
+    ''', (first_user, users, first_user, last_user, _NOTIFICATIONS_PER_USER))
+    cur.execute('''
+        INSERT INTO shopping_list (user_id, item_name, is_checked, source, created_at)
+        SELECT u, 'Item ' || g, g %% 3 = 0, CASE WHEN g %% 2 = 0 THEN 'auto' ELSE 'manual' END,
+               now() - g * interval '1 minute'
+        FROM generate_series(%s, %s) u, generate_series(1, %s) g
+    ''', (first_user, last_user, _SHOPPING_ITEMS_PER_USER))
+    cur.execute('''
+        INSERT INTO calorie_logs (user_id, log_date, calories)
+        SELECT u, CURRENT_DATE - g, 500
+        FROM generate_series(%s, %s) u, generate_series(0, %s - 1) g
+    ''', (first_user, last_user, _CALORIE_LOGS_PER_USER))
+    cur.execute('''
+        INSERT INTO meal_plans (user_id, name, updated_at)
+        SELECT u, 'Plan ' || g, now() - g * interval '1 day'
+        FROM generate_series(%s, %s) u, generate_series(1, %s) g
+    ''', (first_user, last_user, _MEAL_PLANS_PER_USER))
+
+    for table in ('users', 'recipes', 'recipe_ratings', 'notifications',
+                  'shopping_list', 'calorie_logs', 'meal_plans'):
+        cur.execute(f'ANALYZE {table}')
+
+    user_id = first_user + users // 2
+    cur.execute('''
+        SELECT id, created_at, rating_sum FROM recipes WHERE user_id = %s ORDER BY id LIMIT 1
+    ''', (user_id,))
+    recipe = cur.fetchone()
+    today = date.today()
+    return {
+        'user_id': user_id,
+        'recipe_id': recipe['id'],
+        'after_id': recipe['id'],
+        'after_created_at': recipe['created_at'],
+        'after_rating_sum': recipe['rating_sum'],
+        'today': today,
+        'tomorrow': today + timedelta(days=1),
+        'month_start': today.replace(day=1),
+        'date': today,
+        'limit': 25,
+        'offset': 0
+    }
+
+
+def _seq_scans(plan: Dict) -> Iterator[str]:
+    """Relations read with a sequential scan anywhere in an EXPLAIN (FORMAT JSON) plan."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from _seq_scans(child)
+
+
+def explain_hot_queries(cur, params: Dict) -> List[Dict]:
+    """
+    EXPLAIN every hot query.
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        params: Query parameters, e.g. from seed_plan_dataset()
+
+    Returns:
+        List of dicts with keys: name, seq_scans (relation names, empty
+        when the query is fully index-driven), plan (EXPLAIN text)
+    """
+    results = []
+    for query in HOT_QUERIES:
+        cur.execute('EXPLAIN (FORMAT JSON) ' + query.sql, params)
+        plan = cur.fetchone()['QUERY PLAN'][0]['Plan']
+        cur.execute('EXPLAIN ' + query.sql, params)
+        results.append({
+            'name': query.name,
+            'seq_scans': sorted(set(_seq_scans(plan))),
+            'plan': '\n'.join(row['QUERY PLAN'] for row in cur.fetchall())
+        })
+    return results
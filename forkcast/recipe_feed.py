@@ -0,0 +1,219 @@
+"""
+Recipe Feed - Keyset-paginated public recipe feed.
+
+The feed lists public recipes newest first, or most popular first
+(highest rating_sum, i.e. average rating times number of ratings). Pages
+are cut by keyset pagination on (sort key, id) instead of OFFSET, so
+every page is one range scan of a partial index on public recipes
+(idx_recipes_public_created_at, idx_recipes_public_rating_sum) and costs
+the same no matter how deep the reader has scrolled or how large the
+catalogue is. Recipes created while a reader scrolls never shift later
+pages.
+
+Search and filters (category, cuisine, difficulty, total time) are WHERE
+clauses of the same query, so every page holds up to limit matching
+recipes from the whole catalogue, not from the pages already loaded.
+Filtered pages walk the same index and skip non-matching rows; for
+selective filters the planner may scan the public recipes instead,
+which is still one query per page.
+
+Clients get an opaque cursor with every page (None on the last page)
+and pass it back, with the same sort and filters, to get the next one.
+
+This module handles:
+    - Encoding / decoding feed cursors
+    - Clamping the requested page size
+    - Parsing the feed's search, filter and sort parameters
+    - Building and fetching one page of the public feed (card fields by default)
+"""
+
+import base64
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .config import Config
+from .recipe_fields import CARD_FIELDS, recipe_select_sql
+
+
+# Feed orders: ?sort= value -> (recipe field the pages are cut on, parser of its cursor value)
+FEED_SORTS = {
+    'recent': ('created_at', datetime.fromisoformat),
+    'popular': ('rating_sum', int)
+}
+
+
+class FeedFilters(NamedTuple):
+    """Search and filters of the public feed (empty / 0 for none)."""
+    search: str = ''
+    category: str = ''
+    cuisine: str = ''
+    difficulty: str = ''
+    max_time: int = 0  # Prep + cook time in minutes
+
+
+def encode_feed_cursor(key, recipe_id: int) -> str:
+    """Opaque cursor pointing just past the recipe (key, recipe_id); key is the sort field's value."""
+    key = key.isoformat() if isinstance(key, datetime) else key
+    raw = f'{key}|{recipe_id}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_feed_cursor(cursor: str, sort: str = 'recent') -> Tuple:
+    """
+    Decode a cursor from encode_feed_cursor().
+
+    Returns:
+        Tuple of (key, recipe_id)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        key, recipe_id = raw.split('|')
+        return FEED_SORTS[sort][1](key), int(recipe_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor') from None
+
+
+def feed_page_size(requested: Optional[str]) -> int:
+    """Page size for a requested ?limit= value, defaulted and capped to the configured bounds."""
+    try:
+        size = int(requested) if requested else Config.RECIPE_FEED_PAGE_SIZE
+    except ValueError:
+        size = Config.RECIPE_FEED_PAGE_SIZE
+    return max(1, min(size, Config.RECIPE_FEED_MAX_PAGE_SIZE))
+
+
+def parse_feed_sort(requested: Optional[str]) -> str:
+    """
+    Feed order for a ?sort= value ('recent' when empty).
+
+    Raises:
+        ValueError: If the order is unknown
+    """
+    sort = requested or 'recent'
+    if sort not in FEED_SORTS:
+        raise ValueError(f'Unknown sort: {sort}')
+    return sort
+
+
+def parse_feed_filters(args) -> FeedFilters:
+    """
+    Feed search and filters from request arguments.
+
+    Args:
+        args: Mapping with optional keys q, category, cuisine, difficulty,
+            max_time (e.g. request.args)
+
+    Raises:
+        ValueError: If max_time is not a non-negative integer
+    """
+    try:
+        max_time = int(args.get('max_time') or 0)
+    except ValueError:
+        max_time = -1
+    if max_time < 0:
+        raise ValueError('max_time must be a non-negative number of minutes')
+    return FeedFilters(
+        search=(args.get('q') or '').strip().lower(),
+        category=(args.get('category') or '').strip().lower(),
+        cuisine=(args.get('cuisine') or '').strip().lower(),
+        difficulty=(args.get('difficulty') or '').strip().lower(),
+        max_time=max_time
+    )
+
+
+def _filter_sql(filters: FeedFilters) -> str:
+    """WHERE conditions (each starting with AND) of the active filters, with named parameters."""
+    sql = ''
+    if filters.search:
+        # Matches the title, description, ingredients, tags or author
+        sql += '''
+            AND (r.title ILIKE %(search)s OR r.description ILIKE %(search)s
+                 OR r.ingredients ILIKE %(search)s OR r.tags ILIKE %(search)s
+                 OR r.user_id IN (SELECT id FROM users
+                                  WHERE username ILIKE %(search)s OR full_name ILIKE %(search)s))
+        '''
+    for column in ('category', 'cuisine', 'difficulty'):
+        if getattr(filters, column):
+            sql += f' AND LOWER(r.{column}) = %({column})s'
+    if filters.max_time:
+        sql += ' AND COALESCE(r.prep_time, 0) + COALESCE(r.cook_time, 0) BETWEEN 1 AND %(max_time)s'
+    return sql
+
+
+def public_feed_sql(fields: Sequence[str], sort: str = 'recent', filters: FeedFilters = FeedFilters(),
+                    after: bool = False) -> str:
+    """
+    Query of one public feed page, with named parameters: the filters'
+    (see feed_filter_params()), limit and, for later pages (after=True),
+    the cursor's after_<sort field> (e.g. after_created_at) and after_id.
+
+    Args:
+        fields: Fields of the returned recipes; must include the sort's field
+        sort: Feed order (see FEED_SORTS)
+        filters: Active search and filters
+        after: Whether the page continues after a cursor
+    """
+    key = FEED_SORTS[sort][0]
+    sql = recipe_select_sql(fields) + '''
+            WHERE r.is_public = true''' + _filter_sql(filters)
+    if after:
+        sql += f'''
+            AND (r.{key}, r.id) < (%(after_{key})s, %(after_id)s)'''
+    return sql + f'''
+            ORDER BY r.{key} DESC, r.id DESC
+            LIMIT %(limit)s
+        '''
+
+
+def feed_filter_params(filters: FeedFilters) -> Dict:
+    """Query parameters of public_feed_sql() for the filters."""
+    params = filters._asdict()
+    # The search term is matched anywhere, as typed (LIKE wildcards escaped)
+    search = filters.search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    params['search'] = f'%{search}%'
+    return params
+
+
+def fetch_public_feed(cur, limit: int, cursor: Optional[str] = None,
+                      fields: Sequence[str] = CARD_FIELDS, sort: str = 'recent',
+                      filters: FeedFilters = FeedFilters()) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of public recipes matching the filters, in the given order.
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        limit: Page size (see feed_page_size())
+        cursor: Cursor returned with the previous page (None for the first page)
+        fields: Fields of the returned recipes (see recipe_fields.py)
+        sort: Feed order (see parse_feed_sort())
+        filters: Search and filters (see parse_feed_filters())
+
+    Returns:
+        Tuple of (recipes, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    # The next cursor is built from the sort field, so select it even when not requested
+    key = FEED_SORTS[sort][0]
+    params = feed_filter_params(filters)
+    params['limit'] = limit + 1
+    if cursor:
+        params[f'after_{key}'], params['after_id'] = decode_feed_cursor(cursor, sort)
+    cur.execute(public_feed_sql(fields if key in fields else [*fields, key], sort, filters, bool(cursor)),
+                params)
+    recipes = cur.fetchall()
+
+    # One extra row tells whether there is a next page
+    next_cursor = None
+    if len(recipes) > limit:
+        recipes = recipes[:limit]
+        next_cursor = encode_feed_cursor(recipes[-1][key], recipes[-1]['id'])
+
+    if key not in fields:
+        for recipe in recipes:
+            del recipe[key]
+    return recipes, next_cursor
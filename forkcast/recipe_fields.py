@@ -0,0 +1,139 @@
+"""
+Recipe Fields - Column projection for recipe queries.
+
+Recipe rows carry large text columns (ingredients, instructions,
+description) that list views do not show; cards show the first
+characters of the description (summary). Instead of selecting
+r.*, recipe queries select a projection: a list of field names, built
+from the predefined shapes below and/or requested by API clients with
+?fields=, e.g. ?fields=card, ?fields=id,title,calories or
+?fields=card,ingredients.
+
+Each field maps to one select-list expression; the joins a projection
+needs (author, original recipe, original author) are added only when
+one of its fields comes from them.
+
+This module handles:
+    - The selectable recipe fields and the joins they need
+    - The predefined "card" and "detail" shapes
+    - Parsing ?fields= values
+    - Building the SELECT ... FROM clause of a projection
+"""
+
+from typing import List, Optional, Sequence
+
+from .recipe_ratings import AVG_RATING_SQL
+
+
+# Joins of the recipe queries, in the order they are added (recipes are aliased as r)
+_JOINS = {
+    'author': 'JOIN users u ON r.user_id = u.id',
+    'original': 'LEFT JOIN recipes orig ON r.forked_from_id = orig.id',
+    'original_author': 'LEFT JOIN users orig_user ON r.original_author_id = orig_user.id'
+}
+
+# Characters of the description shown on cards (clamped to a few lines by CSS)
+SUMMARY_LENGTH = 200
+
+# Field name -> (select-list expression, join it needs or None)
+RECIPE_FIELDS = {
+    'id': ('r.id', None),
+    'user_id': ('r.user_id', None),
+    'title': ('r.title', None),
+    'description': ('r.description', None),
+    'summary': (f'substr(r.description, 1, {SUMMARY_LENGTH}) as summary', None),
+    'ingredients': ('r.ingredients', None),
+    'instructions': ('r.instructions', None),
+    'prep_time': ('r.prep_time', None),
+    'cook_time': ('r.cook_time', None),
+    'servings': ('r.servings', None),
+    'calories_per_serving': ('r.calories_per_serving', None),
+    'calories': ('r.calories_per_serving as calories', None),
+    'category': ('r.category', None),
+    'cuisine': ('r.cuisine', None),
+    'difficulty': ('r.difficulty', None),
+    'tags': ('r.tags', None),
+    'image_url': ('r.image_url', None),
+    'is_public': ('r.is_public', None),
+    'is_favorite': ('r.is_favorite', None),
+    'forked_from_id': ('r.forked_from_id', None),
+    'original_author_id': ('r.original_author_id', None),
+    'created_at': ('r.created_at', None),
+    'updated_at': ('r.updated_at', None),
+    'avg_rating': (f'{AVG_RATING_SQL} as avg_rating', None),
+    'rating_count': ('r.rating_count', None),
+    'rating_sum': ('r.rating_sum', None),
+    'username': ('u.username', 'author'),
+    'full_name': ('u.full_name', 'author'),
+    'profile_image': ('u.profile_image', 'author'),
+    'original_title': ('orig.title as original_title', 'original'),
+    'original_is_public': ('orig.is_public as original_is_public', 'original'),
+    'original_author_username': ('orig_user.username as original_author_username', 'original_author'),
+    'original_author_name': ('orig_user.full_name as original_author_name', 'original_author')
+}
+
+# What the recipe cards render (recipe_feed_cards.html, my_recipes.html)
+CARD_FIELDS = (
+    'id', 'user_id', 'title', 'summary', 'prep_time', 'cook_time', 'servings',
+    'calories_per_serving', 'tags', 'image_url', 'is_public', 'forked_from_id',
+    'avg_rating', 'rating_count', 'username', 'full_name', 'profile_image',
+    'original_title', 'original_is_public', 'original_author_username', 'original_author_name'
+)
+
+# Everything but the summary (recipe view, edit form)
+DETAIL_FIELDS = tuple(name for name in RECIPE_FIELDS if name != 'summary')
+
+SHAPES = {
+    'card': CARD_FIELDS,
+    'detail': DETAIL_FIELDS
+}
+
+
+def parse_fields(requested: Optional[str], default: Sequence[str]) -> List[str]:
+    """
+    Parse a ?fields= value into a list of field names.
+
+    Args:
+        requested: Comma-separated shape and/or field names (None or empty for the default)
+        default: Fields to use when nothing is requested
+
+    Returns:
+        List of field names, without duplicates; always includes id
+
+    Raises:
+        ValueError: If a name is neither a shape nor a field
+    """
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else []
+    if not names:
+        names = list(default)
+
+    fields = ['id']
+    for name in names:
+        if name in SHAPES:
+            expanded = SHAPES[name]
+        elif name in RECIPE_FIELDS:
+            expanded = (name,)
+        else:
+            raise ValueError(f'Unknown field: {name}')
+        fields.extend(field for field in expanded if field not in fields)
+    return fields
+
+
+def recipe_select_sql(fields: Sequence[str]) -> str:
+    """
+    SELECT ... FROM clause of a recipe query returning the given fields.
+
+    Append the WHERE / ORDER BY clauses; recipes are aliased as r.
+
+    Args:
+        fields: Field names (see RECIPE_FIELDS), e.g. from parse_fields()
+    """
+    columns = [RECIPE_FIELDS[field][0] for field in fields]
+    needed = {RECIPE_FIELDS[field][1] for field in fields}
+    joins = [sql for join, sql in _JOINS.items() if join in needed]
+    return '\n'.join([
+        '    SELECT ' + ',\n           '.join(columns),
+        '    FROM recipes r',
+        *('    ' + join for join in joins),
+        ''
+    ])
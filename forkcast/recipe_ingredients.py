@@ -0,0 +1,282 @@
+"""
+Recipe Ingredients - Pre-parsed ingredient rows of recipes.
+
+recipes.ingredients is free text, one ingredient per line. Whenever a
+recipe is written, its lines are parsed once with parse_ingredient and
+stored in recipe_ingredients (one row per line), so consumers such as the
+shopping list aggregate rows in SQL instead of re-parsing text on every
+request.
+
+Each row also carries its quantity in a canonical unit per unit type
+(see ingredient_parser.to_canonical_unit) so rows in different but
+convertible units can be summed directly.
+
+This module handles:
+    - Parsing a recipe's ingredient text into rows (create, update)
+    - Copying rows to a forked recipe
+    - Re-parsing every recipe in parallel (backfills, parser upgrades),
+      recomputing its nutrition
+    - Aggregating the ingredients of planned meals for the shopping list
+"""
+
+import csv
+import io
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from .models import get_pool, get_db_cursor
+from .ingredient_parser import (
+    parse_ingredient, categorize_ingredient, estimate_grams, to_canonical_unit, display_quantity
+)
+from .recipe_nutrition import save_recipes_nutrition
+
+
+def parse_ingredient_rows(ingredients_text: str) -> List[Tuple]:
+    """
+    Parse ingredient text into recipe_ingredients column values.
+
+    Lines that are blank or cannot be parsed (e.g. "1/0 cup", or a quantity
+    too large for a float) are skipped; position is the line's index in the
+    text. Gram estimates are capped to fit the INTEGER grams column (see
+    ingredient_parser.MAX_ESTIMATED_GRAMS).
+
+    Returns:
+        List of (position, quantity, unit, canonical_unit, canonical_quantity,
+        name, category, grams) tuples
+    """
+    rows = []
+    for position, line in enumerate((ingredients_text or '').split('\n')):
+        try:
+            parsed = parse_ingredient(line)
+        except (ValueError, ZeroDivisionError):
+            continue
+        if not parsed or not math.isfinite(parsed.quantity):
+            continue
+        canonical_unit, factor = to_canonical_unit(parsed.unit)
+        rows.append((
+            position,
+            parsed.quantity,
+            parsed.unit,
+            canonical_unit,
+            parsed.quantity * factor,
+            parsed.name,
+            categorize_ingredient(parsed.name_for_category),
+            estimate_grams(parsed)
+        ))
+    return rows
+
+
+def save_recipe_ingredients(cur, recipe_id: int, ingredients_text: str) -> None:
+    """
+    Replace a recipe's recipe_ingredients rows with its parsed text.
+
+    Call this in the same transaction as the INSERT/UPDATE of the recipe.
+    """
+    _replace_recipe_rows(cur, [(recipe_id, parse_ingredient_rows(ingredients_text))])
+
+
+def _replace_recipe_rows(cur, parsed_recipes: List[Tuple[int, List[Tuple]]]) -> None:
+    """
+    Replace the recipe_ingredients rows of several recipes.
+
+    Rows are streamed with COPY (CSV, strings quoted so '' stays an empty
+    string and only missing values become NULL), which avoids building
+    an INSERT statement per batch.
+    """
+    cur.execute('DELETE FROM recipe_ingredients WHERE recipe_id = ANY(%s)',
+                ([recipe_id for recipe_id, _ in parsed_recipes],))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+    for recipe_id, rows in parsed_recipes:
+        writer.writerows((recipe_id, *row) for row in rows)
+    if buffer.tell():
+        buffer.seek(0)
+        cur.copy_expert('''
+            COPY recipe_ingredients (recipe_id, position, quantity, unit, canonical_unit,
+                                     canonical_quantity, name, category, grams)
+            FROM STDIN WITH (FORMAT csv)
+        ''', buffer)
+
+
+def copy_recipe_ingredients(cur, source_recipe_id: int, target_recipe_id: int) -> None:
+    """Copy a recipe's parsed ingredients to another recipe (forks share the text)."""
+    cur.execute('''
+        INSERT INTO recipe_ingredients (recipe_id, position, quantity, unit, canonical_unit,
+                                        canonical_quantity, name, category, grams)
+        SELECT %s, position, quantity, unit, canonical_unit,
+               canonical_quantity, name, category, grams
+        FROM recipe_ingredients
+        WHERE recipe_id = %s
+    ''', (target_recipe_id, source_recipe_id))
+
+
+def _parse_recipe_chunk(recipes: List[Tuple[int, str]]) -> Tuple[List[Tuple[int, List[Tuple]]], int]:
+    """
+    Parse a chunk of (recipe_id, ingredients_text) pairs (runs in a worker process).
+
+    Returns:
+        Tuple of ([(recipe_id, rows), ...], number of non-blank lines parsed)
+    """
+    lines = sum(1 for _, text in recipes for line in (text or '').split('\n') if line.strip())
+    return [(recipe_id, parse_ingredient_rows(text)) for recipe_id, text in recipes], lines
+
+
+def _stream_recipe_chunks(chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Yield (recipe_id, ingredients_text) chunks from a server-side cursor.
+
+    The read runs on its own pooled connection so the writer can commit
+    each batch without closing the cursor.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn.cursor(name='reparse_recipe_ingredients', cursor_factory=RealDictCursor) as cur:
+            cur.itersize = chunk_size
+            cur.execute('SELECT id, ingredients FROM recipes ORDER BY id')
+            chunk = []
+            for recipe in cur:
+                chunk.append((recipe['id'], recipe['ingredients']))
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+    finally:
+        pool.putconn(conn)
+
+
+def backfill_recipe_ingredients(cur, chunk_size: int = 500) -> int:
+    """
+    Re-parse every recipe's ingredient text into recipe_ingredients within
+    the caller's transaction (e.g. a migration), in this process.
+
+    Recipes are read in id order, chunk_size at a time, so memory stays
+    flat. Nutrition is not recomputed; see recipe_nutrition.backfill_recipe_nutrition.
+
+    Returns:
+        Number of recipes parsed
+    """
+    recipes = 0
+    last_id = 0
+    while True:
+        cur.execute('''
+            SELECT id, ingredients FROM recipes
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        ''', (last_id, chunk_size))
+        chunk = [(row['id'], row['ingredients']) for row in cur.fetchall()]
+        if not chunk:
+            return recipes
+        _replace_recipe_rows(cur, _parse_recipe_chunk(chunk)[0])
+        recipes += len(chunk)
+        last_id = chunk[-1][0]
+
+
+def reparse_recipe_ingredients(workers: int = 1, chunk_size: int = 500,
+                               progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Re-parse every recipe's ingredient text into recipe_ingredients.
+
+    Recipes are streamed with a server-side cursor in chunks of chunk_size;
+    each chunk is parsed in a worker process and written back (and
+    committed) as one batch, together with the batch's recomputed
+    recipe_nutrition, so an interrupted run keeps its progress and can
+    simply be restarted. At most 2 * workers chunks are in flight.
+
+    Args:
+        workers: Number of parser processes (1 parses in this process)
+        chunk_size: Recipes per parse chunk and write batch
+        progress: Optional callback receiving the running stats after
+            every written batch
+
+    Returns:
+        dict with keys: recipes, total, lines, elapsed (seconds)
+    """
+    with get_db_cursor() as cur:
+        cur.execute('SELECT COUNT(*) AS total FROM recipes')
+        stats = {'recipes': 0, 'total': cur.fetchone()['total'], 'lines': 0, 'elapsed': 0.0}
+    start = time.perf_counter()
+
+    def write(result):
+        parsed_recipes, lines = result
+        with get_db_cursor(commit=True) as cur:
+            _replace_recipe_rows(cur, parsed_recipes)
+            save_recipes_nutrition(cur, [recipe_id for recipe_id, _ in parsed_recipes])
+        stats['recipes'] += len(parsed_recipes)
+        stats['lines'] += lines
+        stats['elapsed'] = time.perf_counter() - start
+        if progress:
+            progress(stats)
+
+    chunks = _stream_recipe_chunks(chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            write(_parse_recipe_chunk(chunk))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Bounded submission keeps memory flat (Executor.map would read
+        # the whole table up front)
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(_parse_recipe_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+    return stats
+
+
+def fetch_aggregated_ingredients(cur, recipe_servings: Dict[int, float]) -> List[Dict]:
+    """
+    Sum the ingredients needed for the given recipes and servings in SQL.
+
+    Each recipe's quantities are scaled by planned servings / recipe
+    servings. Rows are grouped by ingredient name (case-insensitive) and
+    canonical unit; each group keeps the spelling and category of its
+    first row (by recipe id, then line position) and is rendered in a
+    display unit by ingredient_parser.display_quantity().
+
+    Args:
+        cur: Database cursor (RealDictCursor)
+        recipe_servings: Dict mapping recipe id to total planned servings
+
+    Returns:
+        List of dicts with keys: name, quantity, unit, category
+    """
+    if not recipe_servings:
+        return []
+    recipe_ids = list(recipe_servings)
+    cur.execute('''
+        SELECT (array_agg(ri.name ORDER BY ri.recipe_id, ri.position))[1] AS name,
+               (array_agg(ri.unit ORDER BY ri.recipe_id, ri.position))[1] AS unit,
+               (array_agg(ri.category ORDER BY ri.recipe_id, ri.position))[1] AS category,
+               ri.canonical_unit,
+               COUNT(DISTINCT lower(ri.unit)) = 1 AS single_unit,
+               SUM(ri.canonical_quantity * planned.servings
+                   / COALESCE(NULLIF(r.servings, 0), 1)) AS canonical_quantity
+        FROM unnest(%s::int[], %s::float8[]) AS planned(recipe_id, servings)
+        JOIN recipes r ON r.id = planned.recipe_id
+        JOIN recipe_ingredients ri ON ri.recipe_id = planned.recipe_id
+        GROUP BY lower(ri.name), ri.canonical_unit
+        ORDER BY MIN(ri.recipe_id), MIN(ri.position)
+    ''', (recipe_ids, [recipe_servings[recipe_id] for recipe_id in recipe_ids]))
+
+    ingredients = []
+    for row in cur.fetchall():
+        quantity, unit = display_quantity(row['canonical_quantity'], row['canonical_unit'],
+                                          row['unit'], row['single_unit'])
+        ingredients.append({
+            'name': row['name'],
+            'quantity': quantity,
+            'unit': unit,
+            'category': row['category']
+        })
+    return ingredients
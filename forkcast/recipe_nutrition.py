@@ -0,0 +1,175 @@
+"""
+Recipe Nutrition - Precomputed nutrition facts of recipes.
+
+Whenever a recipe is written (after its recipe_ingredients rows), its
+nutrition is computed once from the ingredients' gram estimates and the
+offline nutrient database (see nutrient_db) and stored in
+recipe_nutrition, so nutrition endpoints read stored numbers instead of
+estimating them on every request.
+
+Nutrition is only derived from ingredients when the ingredients found in
+the nutrient database make up at least NUTRITION_MIN_MATCHED_RATIO of the
+recipe's estimated weight; summing the few matched items of a mostly
+unmatched recipe would report macros (and kcal) for a fraction of it.
+
+kcal per serving is the hand-entered calories_per_serving when there is
+one, otherwise the ingredient total (0 when too little matched). Macros
+are summed over the matched ingredients; when too little matched they
+fall back to a 30/40/30 split of the calories (see estimate_macros).
+
+This module handles:
+    - Computing a recipe's nutrition facts (create, update, fork, re-parse)
+    - Backfilling every recipe (e.g. after importing a nutrient dataset)
+    - Refreshing the daily_nutrition rollup of the days a recipe is planned
+    - Estimating macros from calories
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
+from .config import Config
+from .nutrient_db import NutrientDB, get_nutrient_db
+from .meal_slots import refresh_recipe_days, backfill_daily_nutrition
+
+
+# Columns of recipe_nutrition written by this module, in order
+NUTRITION_COLUMNS = (
+    'kcal_per_serving', 'protein_per_serving', 'carbs_per_serving', 'fat_per_serving',
+    'kcal_per_100g', 'protein_per_100g', 'carbs_per_100g', 'fat_per_100g',
+    'total_grams', 'matched_grams', 'source'
+)
+
+_UPSERT_NUTRITION_SQL = f'''
+    INSERT INTO recipe_nutrition (recipe_id, {', '.join(NUTRITION_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (recipe_id) DO UPDATE SET
+        {', '.join(f'{column} = EXCLUDED.{column}' for column in NUTRITION_COLUMNS)},
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# One row per recipe: servings, calories and its ingredient names / grams
+_RECIPE_INGREDIENTS_SQL = '''
+    SELECT r.id, r.servings, r.calories_per_serving,
+           COALESCE(array_agg(ri.name ORDER BY ri.position)
+                    FILTER (WHERE ri.recipe_id IS NOT NULL), '{}') AS names,
+           COALESCE(array_agg(ri.grams ORDER BY ri.position)
+                    FILTER (WHERE ri.recipe_id IS NOT NULL), '{}') AS grams
+    FROM recipes r
+    LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+'''
+
+
+def estimate_macros(calories: float) -> Tuple[float, float, float]:
+    """
+    Estimate (protein, carbs, fat) grams from calories (rough estimation).
+    Uses 30% protein, 40% carbs, 30% fat at 4/4/9 cal per gram.
+    """
+    return calories * 0.30 / 4, calories * 0.40 / 4, calories * 0.30 / 9
+
+
+def compute_nutrition(ingredients: Iterable[Tuple[str, int]], servings: Optional[float],
+                      calories_per_serving: Optional[float],
+                      db: Optional[NutrientDB]) -> Dict:
+    """
+    Compute a recipe's nutrition facts.
+
+    Args:
+        ingredients: (name, grams estimate) of each parsed ingredient line
+        servings: Servings the recipe makes (missing or 0 counts as 1)
+        calories_per_serving: Hand-entered calories, if any
+        db: Nutrient database (None if no dataset has been imported)
+
+    Returns:
+        dict with the NUTRITION_COLUMNS as keys; the per-100 g values are
+        None when the recipe's weight is unknown. source is 'ingredients'
+        when the macros were summed from ingredients (enough of the weight
+        matched, see NUTRITION_MIN_MATCHED_RATIO), else 'estimate'.
+    """
+    servings = float(servings or 1)
+    kcal = protein = carbs = fat = 0.0
+    total_grams = matched_grams = 0
+    for name, grams in ingredients:
+        total_grams += grams
+        nutrients = db.lookup(name) if db is not None else None
+        if nutrients is None:
+            continue
+        matched_grams += grams
+        kcal += nutrients.kcal * grams
+        protein += nutrients.protein * grams
+        carbs += nutrients.carbs * grams
+        fat += nutrients.fat * grams
+
+    # When too little of the weight matched, the sums only cover part of the recipe
+    derived = bool(matched_grams) and matched_grams >= Config.NUTRITION_MIN_MATCHED_RATIO * total_grams
+    if not derived:
+        kcal = 0.0
+    if calories_per_serving:
+        kcal = float(calories_per_serving) * servings
+    if derived:
+        source = 'ingredients'
+    else:
+        source = 'estimate'
+        protein, carbs, fat = estimate_macros(kcal)
+
+    totals = (kcal, protein, carbs, fat)
+    per_100g = [value * 100 / total_grams if total_grams else None for value in totals]
+    return dict(zip(NUTRITION_COLUMNS, [
+        *(value / servings for value in totals), *per_100g, total_grams, matched_grams, source
+    ]))
+
+
+def _nutrition_values(recipe: Dict, db: Optional[NutrientDB]) -> Tuple:
+    """recipe_nutrition row values for a row of _RECIPE_INGREDIENTS_SQL."""
+    nutrition = compute_nutrition(zip(recipe['names'], recipe['grams']), recipe['servings'],
+                                  recipe['calories_per_serving'], db)
+    return (recipe['id'], *(nutrition[column] for column in NUTRITION_COLUMNS))
+
+
+def save_recipe_nutrition(cur, recipe_id: int) -> None:
+    """
+    Recompute a recipe's recipe_nutrition row.
+
+    Call this in the same transaction as the INSERT/UPDATE of the recipe,
+    after its recipe_ingredients rows have been written. The days on
+    which the recipe is planned get their daily_nutrition refreshed.
+    """
+    save_recipes_nutrition(cur, [recipe_id])
+
+
+def save_recipes_nutrition(cur, recipe_ids: Iterable[int]) -> None:
+    """
+    Recompute the recipe_nutrition rows of several recipes (e.g. a batch of
+    re-parsed recipes) and refresh the daily_nutrition days they are planned on.
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    cur.execute(_RECIPE_INGREDIENTS_SQL + '''
+        WHERE r.id = ANY(%s)
+        GROUP BY r.id
+    ''', (recipe_ids,))
+    db = get_nutrient_db()
+    rows = [_nutrition_values(recipe, db) for recipe in cur.fetchall()]
+    if rows:
+        execute_values(cur, _UPSERT_NUTRITION_SQL, rows, page_size=1000)
+        refresh_recipe_days(cur, [row[0] for row in rows])
+
+
+def backfill_recipe_nutrition(cur) -> int:
+    """
+    Recompute recipe_nutrition for every recipe (and rebuild daily_nutrition).
+
+    Returns:
+        Number of recipes processed
+    """
+    cur.execute(_RECIPE_INGREDIENTS_SQL + '''
+        GROUP BY r.id
+        ORDER BY r.id
+    ''')
+    db = get_nutrient_db()
+    rows = [_nutrition_values(recipe, db) for recipe in cur.fetchall()]
+    if rows:
+        execute_values(cur, _UPSERT_NUTRITION_SQL, rows, page_size=1000)
+    backfill_daily_nutrition(cur)
+    return len(rows)
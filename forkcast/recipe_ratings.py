@@ -0,0 +1,142 @@
+"""
+Recipe Ratings - Ratings and their per-recipe aggregates.
+
+Every recipe carries rating_sum and rating_count, updated in the same
+transaction as the recipe_ratings row they summarize, so feeds read a
+recipe's average rating from the row itself instead of joining and
+aggregating recipe_ratings for every listed recipe.
+
+Writes apply deltas (a changed rating adjusts the sum only), so
+concurrent ratings of the same recipe never overwrite each other's
+contribution. reconcile_rating_stats() recomputes the columns from
+recipe_ratings and repairs any drift (e.g. rows deleted by hand).
+
+This module handles:
+    - Rating a recipe (insert or change) and updating its aggregates
+    - Removing a user's ratings from the aggregates (account deletion)
+    - Reconciling the aggregates with recipe_ratings
+"""
+
+from typing import Dict
+
+
+# A recipe's average rating (0 when unrated), for queries aliasing recipes as r
+AVG_RATING_SQL = 'COALESCE(r.rating_sum::float / NULLIF(r.rating_count, 0), 0)'
+
+# Select-list columns of a recipe's rating, for queries aliasing recipes as r
+RATING_SELECT_SQL = f'''
+    {AVG_RATING_SQL} as avg_rating,
+    r.rating_count
+'''
+
+# A user's rating of a recipe (named parameters, like the reviews queries
+# below; shared with query_plans.HOT_QUERIES)
+USER_RATING_SQL = '''
+    SELECT rating, review FROM recipe_ratings
+    WHERE recipe_id = %(recipe_id)s AND user_id = %(user_id)s
+'''
+
+# Reviews of a recipe, newest first
+RECIPE_REVIEWS_SQL = '''
+    SELECT rr.id, rr.rating, rr.review, rr.created_at, rr.updated_at,
+           u.id as user_id, u.username, u.full_name, u.profile_image
+    FROM recipe_ratings rr
+    JOIN users u ON rr.user_id = u.id
+    WHERE rr.recipe_id = %(recipe_id)s
+    ORDER BY rr.created_at DESC
+'''
+
+# Reviews of all of a user's recipes, newest first
+MY_RECIPE_REVIEWS_SQL = '''
+    SELECT rr.id, rr.rating, rr.review, rr.created_at, rr.updated_at,
+           rr.recipe_id,
+           r.title as recipe_title, r.image_url as recipe_image,
+           u.id as reviewer_id, u.username as reviewer_username, 
+           u.full_name as reviewer_name, u.profile_image as reviewer_image
+    FROM recipe_ratings rr
+    JOIN recipes r ON rr.recipe_id = r.id
+    JOIN users u ON rr.user_id = u.id
+    WHERE r.user_id = %(user_id)s
+    ORDER BY rr.created_at DESC
+'''
+
+
+def save_recipe_rating(cur, recipe_id: int, user_id: int, rating: int, review: str) -> Dict:
+    """
+    Insert or change a user's rating of a recipe and update the recipe's aggregates.
+
+    The recipe row is locked first, so the previous rating read below is
+    the committed one even when the same user rates concurrently.
+
+    Returns:
+        dict with keys: avg_rating, rating_count (after this rating)
+    """
+    cur.execute('SELECT id FROM recipes WHERE id = %s FOR UPDATE', (recipe_id,))
+    cur.execute(USER_RATING_SQL, {'recipe_id': recipe_id, 'user_id': user_id})
+    previous = cur.fetchone()
+
+    cur.execute('''
+        INSERT INTO recipe_ratings (recipe_id, user_id, rating, review)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (recipe_id, user_id)
+        DO UPDATE SET rating = EXCLUDED.rating,
+                      review = EXCLUDED.review,
+                      updated_at = CURRENT_TIMESTAMP
+    ''', (recipe_id, user_id, rating, review))
+
+    cur.execute(f'''
+        UPDATE recipes r
+        SET rating_sum = r.rating_sum + %s,
+            rating_count = r.rating_count + %s
+        WHERE r.id = %s
+        RETURNING {RATING_SELECT_SQL}
+    ''', (rating - ((previous['rating'] or 0) if previous else 0),
+          0 if previous else 1, recipe_id))
+    return cur.fetchone()
+
+
+def delete_user_ratings(cur, user_id: int) -> None:
+    """Delete all ratings by a user and subtract them from the rated recipes' aggregates."""
+    cur.execute('''
+        WITH deleted AS (
+            DELETE FROM recipe_ratings
+            WHERE user_id = %s
+            RETURNING recipe_id, rating
+        )
+        UPDATE recipes r
+        SET rating_sum = r.rating_sum - d.rating_sum,
+            rating_count = r.rating_count - d.rating_count
+        FROM (
+            SELECT recipe_id, COALESCE(SUM(rating), 0) AS rating_sum, COUNT(*) AS rating_count
+            FROM deleted
+            GROUP BY recipe_id
+        ) d
+        WHERE r.id = d.recipe_id
+    ''', (user_id,))
+
+
+def reconcile_rating_stats(cur) -> int:
+    """
+    Recompute rating_sum / rating_count of every recipe from recipe_ratings.
+
+    Only recipes whose aggregates differ are written.
+
+    Returns:
+        Number of recipes that were out of date
+    """
+    cur.execute('''
+        UPDATE recipes r
+        SET rating_sum = actual.rating_sum,
+            rating_count = actual.rating_count
+        FROM (
+            SELECT r.id,
+                   COALESCE(SUM(rr.rating), 0) AS rating_sum,
+                   COUNT(rr.recipe_id) AS rating_count
+            FROM recipes r
+            LEFT JOIN recipe_ratings rr ON rr.recipe_id = r.id
+            GROUP BY r.id
+        ) actual
+        WHERE r.id = actual.id
+          AND (r.rating_sum, r.rating_count) IS DISTINCT FROM (actual.rating_sum, actual.rating_count)
+    ''')
+    return cur.rowcount